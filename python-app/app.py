@@ -40,6 +40,7 @@ def show_menu():
     console.print("[7] CSV 임포트")
     console.print("[8] CSV 내보내기")
     console.print("[9] DB 통계")
+    console.print("[10] 쿼리 플랜 진단 (EXPLAIN QUERY PLAN)")
     console.print("[0] 종료")
     console.print()
 
@@ -111,12 +112,19 @@ def show_coverage_matrix():
 
 
 def run_validation():
-    rows = db.get_all_texts()
-    if not rows:
+    if not db.get_text_count():
         console.print("[yellow]데이터가 없습니다.[/yellow]")
         return
 
-    results = val.validate_all(rows)
+    run = val.validate_incremental()
+    results = run["results"]
+    scope = "전체 재검증" if run["full"] else "변경분 검증"
+    console.print(f"[dim]{scope}: {run['validated']}건 검증, {run['cached']}건 캐시 사용[/dim]")
+    if run["validated"]:
+        timing = ", ".join(
+            f"{name} {seconds * 1000:.1f}ms" for name, seconds, _ in run["plan"].report()[:3]
+        )
+        console.print(f"[dim]규칙별 소요 시간 (상위 3): {timing}[/dim]")
     if not results:
         console.print("[bold green]검증 완료: 오류 없음![/bold green]")
         return
@@ -127,18 +135,28 @@ def run_validation():
     for text_id, errors in results.items():
         console.print(f"\n[bold]{text_id}[/bold]:")
         for err in errors:
-            console.print(f"  [red]- [{err['type']}] {err['message']}[/red]")
+            color = "yellow" if val.severity_of(err["type"]) == "warning" else "red"
+            console.print(f"  [{color}]- [{err['type']}] {err['message']}[/{color}]")
 
 
 def search_texts():
     console.print("[bold]필터 옵션:[/bold]")
     band = Prompt.ask("Lexile Band (예: 700-900, Enter=전체)", default="")
     genre = Prompt.ask("Genre (예: Narrative, Enter=전체)", default="")
-
-    rows = db.get_all_texts(
-        band_filter=band if band else None,
-        genre_filter=genre if genre else None,
-    )
+    keyword = Prompt.ask('키워드 ("구문", 접두어*, Enter=없음)', default="")
+
+    if keyword:
+        rows = db.fulltext_search(
+            keyword,
+            band=band or None,
+            genre=genre or None,
+            snippet_markers=("[bold yellow]", "[/bold yellow]"),
+        )
+    else:
+        rows = db.get_all_texts(
+            band_filter=band if band else None,
+            genre_filter=genre if genre else None,
+        )
 
     if not rows:
         console.print("[yellow]결과가 없습니다.[/yellow]")
@@ -161,12 +179,15 @@ def search_texts():
     console.print(table)
     console.print(f"[dim]{len(rows)}개 결과[/dim]")
 
+    if keyword:
+        for r in rows[:5]:
+            if r["snippet"]:
+                console.print(f"[cyan]{r['text_id']}[/cyan] {r['snippet']}")
+
 
 def show_text_detail():
     text_id = Prompt.ask("text_id 입력")
-    conn = db.get_connection()
-    row = conn.execute("SELECT * FROM reading_text WHERE text_id = ?", (text_id,)).fetchone()
-    conn.close()
+    row = db.get_text(text_id)
 
     if not row:
         console.print(f"[red]{text_id}를 찾을 수 없습니다.[/red]")
@@ -226,28 +247,15 @@ def ai_generate():
     console.print(f"Words: {result['word_count']} | Sentences: {result['sentence_count']}")
 
     if Confirm.ask("DB에 저장하시겠습니까?"):
-        # Find lexile_score midpoint
-        lo, hi = band.split("-")
-        mid_score = (int(lo) + int(hi)) // 2
-        if result.get("lexile_estimate"):
-            mid_score = result["lexile_estimate"]
-
-        data = {
+        slot = {
             "lexile_band": band,
-            "lexile_score": mid_score,
-            "age_group": age_group,
             "genre": genre,
-            "topic": topic or gen.get_default_topic(genre, age_group),
-            "word_count": result["word_count"],
             "length_type": length_type,
-            "text_body": result["text_body"],
-            "sentence_count": result["sentence_count"],
-            "avg_sentence_length": round(result["word_count"] / max(result["sentence_count"], 1), 1),
+            "topic": topic,
+            "age_group": age_group,
             "vocabulary_band": vocab,
-            "intended_use": "수업",
         }
-
-        text_id = db.insert_text(data)
+        text_id = db.insert_text(gen.build_text_record(slot, result))
         console.print(f"[green]저장 완료: {text_id}[/green]")
 
 
@@ -257,13 +265,34 @@ def import_csv():
         console.print(f"[red]파일을 찾을 수 없습니다: {path}[/red]")
         return
 
-    count = db.import_csv(path)
-    console.print(f"[green]{count}개 텍스트를 임포트했습니다.[/green]")
+    mode = Prompt.ask("중복 지문 처리", choices=["reject", "flag", "off"], default="reject")
+    duplicates = None if mode == "off" else mode
+
+    stats = db.bulk_import_csv(path, duplicates=duplicates)
+    console.print(
+        f"[green]추가 {stats['inserted']} / 갱신 {stats['updated']} / 변경 없음 {stats['skipped']}[/green] "
+        f"[dim]({stats['elapsed']:.2f}s, {stats['rows_per_sec']:.0f} rows/s)[/dim]"
+    )
+    if stats.get("duplicates"):
+        action = "제외" if duplicates == "reject" else "표시"
+        console.print(f"[yellow]중복 지문 {stats['duplicates']}개를 {action}했습니다.[/yellow]")
+    if stats["failed"]:
+        console.print(f"[red]실패 {stats['failed']}행[/red]")
+    for err in stats["errors"]:
+        where = f"chunk {err['chunk']}" + (f" {err['row']}번째 행" if "row" in err else f" ({err['rows']}행)")
+        console.print(f"[red]- {where}: {err['message']}[/red]")
 
 
 def export_csv():
-    path = Prompt.ask("저장 경로", default="export_reading_text.csv")
-    count = db.export_csv(path)
+    path = Prompt.ask("저장 경로 (.gz / .zst 압축 지원)", default="export_reading_text.csv")
+    columns = None
+    if not Confirm.ask("본문(text_body) 포함?", default=True):
+        columns = [c for c in db.TEXT_COLUMNS if c != "text_body"]
+    try:
+        count = db.export_csv(path, columns=columns)
+    except RuntimeError as e:
+        console.print(f"[red]{e}[/red]")
+        return
     if count:
         console.print(f"[green]{count}개 텍스트를 {path}에 내보냈습니다.[/green]")
     else:
@@ -271,19 +300,13 @@ def export_csv():
 
 
 def show_stats():
-    conn = db.get_connection()
-
-    total = conn.execute("SELECT COUNT(*) FROM reading_text").fetchone()[0]
-    with_text = conn.execute("SELECT COUNT(*) FROM reading_text WHERE text_body IS NOT NULL AND text_body != ''").fetchone()[0]
-    bands = conn.execute("SELECT lexile_band, COUNT(*) as cnt FROM reading_text GROUP BY lexile_band ORDER BY lexile_band").fetchall()
-    genres = conn.execute("SELECT genre, COUNT(*) as cnt FROM reading_text GROUP BY genre ORDER BY cnt DESC").fetchall()
-
-    conn.close()
+    summary = db.get_coverage_summary()
+    bands, genres = summary["bands"], summary["genres"]
 
     console.print(Panel(
-        f"[bold]총 텍스트 수:[/bold] {total}\n"
-        f"[bold]본문 포함:[/bold] {with_text}\n"
-        f"[bold]본문 미작성:[/bold] {total - with_text}",
+        f"[bold]총 텍스트 수:[/bold] {summary['total']}\n"
+        f"[bold]본문 포함:[/bold] {summary['with_body']}\n"
+        f"[bold]본문 미작성:[/bold] {summary['empty']}",
         title="DB Statistics",
         box=box.ROUNDED,
     ))
@@ -292,18 +315,44 @@ def show_stats():
         table = Table(title="Band별 현황", box=box.SIMPLE)
         table.add_column("Lexile Band", width=12)
         table.add_column("Count", justify="right", width=8)
-        for b in bands:
-            table.add_row(b["lexile_band"], str(b["cnt"]))
+        for band, cnt in bands:
+            table.add_row(band, str(cnt))
         console.print(table)
 
     if genres:
         table = Table(title="Genre별 현황", box=box.SIMPLE)
         table.add_column("Genre", width=16)
         table.add_column("Count", justify="right", width=8)
-        for g in genres:
-            table.add_row(g["genre"], str(g["cnt"]))
+        for genre, cnt in genres:
+            table.add_row(genre, str(cnt))
         console.print(table)
 
+    pool = db.get_pool_stats()
+    console.print(
+        f"[dim]DB 커넥션: opened {pool['opened']} / reused {pool['reused']} "
+        f"(max idle {pool['max_idle']}, idle {pool['idle']})[/dim]"
+    )
+
+
+def show_query_plans():
+    report = db.query_plan_report()
+
+    table = Table(title="Query Plan Report", box=box.SIMPLE)
+    table.add_column("Helper", width=40)
+    table.add_column("Plan", width=60)
+    table.add_column("", width=10)
+
+    for r in report:
+        status = "[red]FULL SCAN[/red]" if r["full_scan"] else "[green]OK[/green]"
+        table.add_row(r["name"], "\n".join(r["plan"]), status)
+
+    console.print(table)
+    flagged = sum(1 for r in report if r["full_scan"])
+    if flagged:
+        console.print(f"[bold red]{flagged}개 쿼리가 전체 테이블 스캔 중입니다.[/bold red]")
+    else:
+        console.print("[bold green]모든 쿼리가 인덱스를 사용합니다.[/bold green]")
+
 
 def main():
     # Initialize DB
@@ -323,6 +372,7 @@ def main():
         "7": import_csv,
         "8": export_csv,
         "9": show_stats,
+        "10": show_query_plans,
     }
 
     while True:
@@ -0,0 +1,260 @@
+"""
+Resumable Batch Generation Jobs
+배치 생성 작업을 DB(generation_jobs / generation_job_slots)에 기록하여
+중단되더라도 마지막 완료 슬롯부터 재개·재시도할 수 있게 한다.
+
+Usage:
+    python batch_jobs.py list
+    python batch_jobs.py empty               # 본문 없는 슬롯으로 작업 생성
+    python batch_jobs.py run <job_id>        # 시작 / 재개
+    python batch_jobs.py pause <job_id>
+    python batch_jobs.py retry <job_id>      # 실패 슬롯 재시도
+    python batch_jobs.py status <job_id>
+"""
+import json
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(__file__))
+import database as db
+import generator as gen
+
+MAX_ATTEMPTS = 3
+
+SLOT_FIELDS = ["genre", "length_type", "lexile_band", "topic", "age_group", "vocabulary_band"]
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def create_job(slots, conn=None):
+    """Persist a list of slot dicts as a new job; returns job_id."""
+    with db.connection(conn) as conn:
+        now = _now()
+        cur = conn.execute(
+            "INSERT INTO generation_jobs (status, total, created_at, updated_at) VALUES ('pending', ?, ?, ?)",
+            (len(slots), now, now),
+        )
+        job_id = cur.lastrowid
+        conn.executemany(
+            "INSERT INTO generation_job_slots (job_id, slot_index, slot, updated_at) VALUES (?, ?, ?, ?)",
+            [
+                (job_id, i, json.dumps(slot, ensure_ascii=False), now)
+                for i, slot in enumerate(slots)
+            ],
+        )
+        conn.commit()
+    return job_id
+
+
+def create_job_from_empty_slots(conn=None):
+    """Job covering every reading_text row that has metadata but no body."""
+    with db.connection(conn) as conn:
+        slots = [
+            {field: row[field] for field in SLOT_FIELDS} | {"text_id": row["text_id"]}
+            for row in db.get_empty_slots(conn)
+        ]
+        if not slots:
+            return None
+        return create_job(slots, conn)
+
+
+def _set_job_status(conn, job_id, status):
+    conn.execute(
+        "UPDATE generation_jobs SET status = ?, updated_at = ? WHERE job_id = ?",
+        (status, _now(), job_id),
+    )
+
+
+def get_job(job_id, conn=None):
+    with db.connection(conn) as conn:
+        return conn.execute(
+            "SELECT * FROM generation_jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+
+
+def list_jobs(conn=None):
+    with db.connection(conn) as conn:
+        return conn.execute(
+            "SELECT * FROM generation_jobs ORDER BY job_id DESC"
+        ).fetchall()
+
+
+def job_status(job_id, conn=None):
+    """Slot counts by status, e.g. {"done": 12, "pending": 30, "failed": 1}."""
+    with db.connection(conn) as conn:
+        rows = conn.execute(
+            "SELECT status, COUNT(*) FROM generation_job_slots WHERE job_id = ? GROUP BY status",
+            (job_id,),
+        ).fetchall()
+    return {row[0]: row[1] for row in rows}
+
+
+def pause_job(job_id, conn=None):
+    """Ask a running job to stop; run_job() checks this after every slot."""
+    with db.connection(conn) as conn:
+        _set_job_status(conn, job_id, "paused")
+        conn.commit()
+
+
+def retry_failed(job_id, conn=None):
+    """Put failed slots back in the queue with a fresh attempt budget."""
+    with db.connection(conn) as conn:
+        count = conn.execute(
+            "UPDATE generation_job_slots SET status = 'pending', attempts = 0, error = NULL, "
+            "updated_at = ? "
+            "WHERE job_id = ? AND status = 'failed'",
+            (_now(), job_id),
+        ).rowcount
+        conn.commit()
+    return count
+
+
+def _record_result(conn, job_id, index, slot, result, error, max_attempts):
+    """Store one finished slot; successful results go straight into reading_text.
+
+    Slots taken from an existing empty row only get their body filled in,
+    so the row keeps its own metadata.
+    """
+    now = _now()
+    if error is None:
+        try:
+            data = gen.build_text_record(slot, result)
+            if slot.get("text_id"):
+                text_id = db.fill_text_body(slot["text_id"], data, conn)
+            else:
+                text_id = db.insert_text(data, conn)
+        except (KeyError, TypeError, ValueError) as e:
+            error = f"invalid result: {e}"
+        else:
+            conn.execute(
+                "UPDATE generation_job_slots SET status = 'done', attempts = attempts + 1, "
+                "result = ?, error = NULL, text_id = ?, updated_at = ? "
+                "WHERE job_id = ? AND slot_index = ?",
+                (json.dumps(result, ensure_ascii=False), text_id, now, job_id, index),
+            )
+            conn.commit()
+            return True
+
+    conn.execute(
+        "UPDATE generation_job_slots SET attempts = attempts + 1, error = ?, updated_at = ?, "
+        "status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'pending' END "
+        "WHERE job_id = ? AND slot_index = ?",
+        (error, now, max_attempts, job_id, index),
+    )
+    conn.commit()
+    return False
+
+
+def run_job(job_id, api_key=None, client=None, on_progress=None, max_attempts=MAX_ATTEMPTS,
+            **batch_options):
+    """Run (or resume) a job until every slot is done/failed or it is paused.
+
+    Slots left 'running' by a crashed run are picked up again. Each result
+    is written to reading_text as soon as it arrives.
+    on_progress: callback(index, total, result_or_error) like batch_generate
+    batch_options: passed to generator.iter_generate (max_workers, ...)
+    Returns job_status() counts.
+    """
+    with db.connection() as conn:
+        job = get_job(job_id, conn)
+        if job is None:
+            raise ValueError(f"Unknown job: {job_id}")
+
+        # 이전 실행이 중간에 죽은 경우 running 슬롯을 다시 대기열로
+        conn.execute(
+            "UPDATE generation_job_slots SET status = 'pending' WHERE job_id = ? AND status = 'running'",
+            (job_id,),
+        )
+        rows = conn.execute(
+            "SELECT slot_index, slot FROM generation_job_slots "
+            "WHERE job_id = ? AND status = 'pending' AND attempts < ? ORDER BY slot_index",
+            (job_id, max_attempts),
+        ).fetchall()
+        indexes = [row["slot_index"] for row in rows]
+        slots = [json.loads(row["slot"]) for row in rows]
+
+        conn.execute(
+            "UPDATE generation_job_slots SET status = 'running' WHERE job_id = ? AND status = 'pending' "
+            "AND attempts < ?",
+            (job_id, max_attempts),
+        )
+        _set_job_status(conn, job_id, "running")
+        conn.commit()
+
+        total = len(slots)
+        completed = gen.iter_generate(slots, api_key, client, **batch_options)
+        paused = False
+        try:
+            for i, slot, result, error in completed:
+                _record_result(conn, job_id, indexes[i], slot, result, error, max_attempts)
+                if on_progress:
+                    on_progress(i + 1, total, result if error is None else error)
+                if get_job(job_id, conn)["status"] == "paused":
+                    paused = True
+                    break
+        except KeyboardInterrupt:
+            paused = True
+        finally:
+            completed.close()
+            conn.execute(
+                "UPDATE generation_job_slots SET status = 'pending' WHERE job_id = ? AND status = 'running'",
+                (job_id,),
+            )
+            counts = job_status(job_id, conn)
+            if paused:
+                status = "paused"
+            elif counts.get("pending"):
+                status = "pending"
+            elif counts.get("failed"):
+                status = "failed"
+            else:
+                status = "done"
+            _set_job_status(conn, job_id, status)
+            conn.commit()
+
+    return counts
+
+
+def main():
+    sys.stdout.reconfigure(encoding="utf-8")
+    db.init_db()
+
+    args = sys.argv[1:]
+    command = args[0] if args else "list"
+
+    if command == "list":
+        for job in list_jobs():
+            print(f"  #{job['job_id']:<4} {job['status']:<8} {job['total']:>5} slots | {job['updated_at']}")
+        return
+
+    if command == "empty":
+        job_id = create_job_from_empty_slots()
+        print(f"Created job #{job_id}" if job_id else "No empty slots.")
+        return
+
+    if len(args) < 2:
+        print(__doc__)
+        return
+    job_id = int(args[1])
+
+    if command == "run":
+        def progress(i, total, outcome):
+            mark = "ERR" if isinstance(outcome, str) else "OK "
+            print(f"  [{i}/{total}] {mark}")
+        print(run_job(job_id, on_progress=progress))
+    elif command == "pause":
+        pause_job(job_id)
+    elif command == "retry":
+        print(f"{retry_failed(job_id)} slots re-queued")
+        print(run_job(job_id))
+    elif command == "status":
+        print(job_status(job_id))
+    else:
+        print(__doc__)
+
+
+if __name__ == "__main__":
+    main()
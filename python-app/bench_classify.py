@@ -0,0 +1,97 @@
+"""
+Benchmark: GenreMatcher vs. the original per-keyword classify_genre loop.
+
+Usage:
+    python bench_classify.py [repeat]
+
+Classifies every passage in the bundled CSVs with both implementations,
+checks that the genres are identical and prints the timings.
+"""
+import csv
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+import import_external as ie
+
+CSV_FILES = [
+    "reading_2000.csv",
+    "reading_3000.csv",
+    "reading_5000.csv",
+    "reading_totalpassage_dohyung.csv",
+]
+
+
+def classify_genre_reference(title, passage):
+    """The original implementation, kept verbatim for comparison."""
+    title_lower = title.lower()
+    passage_lower = passage.lower()[:500]
+    combined = title_lower + " " + passage_lower
+
+    scores = {}
+    for genre, keywords in ie.GENRE_KEYWORDS.items():
+        score = sum(1 for kw in keywords if kw in combined)
+        scores[genre] = score
+
+    if any(w in title_lower for w in ["should", "banned", "worth", "deserve", "fair"]):
+        scores["Argumentative"] += 3
+    if any(w in title_lower for w in ["how to", "steps", "guide"]):
+        scores["Procedural"] += 3
+    if any(w in title_lower for w in ["what is", "how does", "how do", "how can", "why do", "why is", "why are"]):
+        scores["Expository"] += 2
+
+    if re.search(r'[A-Z][a-z]+\s(said|asked|smiled|looked|felt|walked)', passage[:300]):
+        scores["Narrative"] += 3
+    if '""' in passage[:200] or '"' in passage[:200]:
+        scores["Narrative"] += 1
+
+    best = max(scores, key=scores.get)
+    if scores[best] == 0:
+        return "Expository"
+    return best
+
+
+def load_items():
+    base_dir = os.path.join(os.path.dirname(__file__), "..")
+    items = []
+    for filename in CSV_FILES:
+        path = os.path.join(base_dir, filename)
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8-sig") as f:
+            for row in csv.DictReader(f):
+                if row.get("passage", "").strip():
+                    items.append((row.get("title", ""), row["passage"]))
+    return items
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    items = load_items()
+    matcher = ie.GenreMatcher()
+
+    expected, t_ref = timed(lambda: [classify_genre_reference(t, p) for t, p in items], repeat)
+    actual, t_new = timed(lambda: matcher.classify_batch(items), repeat)
+
+    mismatches = [i for i, (a, b) in enumerate(zip(expected, actual)) if a != b]
+    n = len(items) * repeat
+    backend = "aho-corasick" if matcher.keyword_automaton is not None else "str.find"
+    print(f"passages: {len(items)} x {repeat} (matcher backend: {backend})")
+    print(f"reference : {t_ref:.3f}s ({n / t_ref:,.0f} passages/s)")
+    print(f"matcher   : {t_new:.3f}s ({n / t_new:,.0f} passages/s)")
+    print(f"speedup   : {t_ref / t_new:.2f}x")
+    print(f"identical : {not mismatches} ({len(mismatches)} mismatches)")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+Benchmark: compiled prompt templates vs. the original build_prompt.
+
+Usage:
+    python bench_prompts.py [repeat]
+
+Renders every passage in reading_text with all task types using both
+implementations, checks that the prompts are identical and prints the
+timings.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+import database as db
+import llm_toolkit as lt
+
+
+def build_prompt_reference(text_row, task_type, **kwargs):
+    """The original implementation, kept verbatim for comparison."""
+    template_info = lt.PROMPT_TEMPLATES.get(task_type)
+    if not template_info:
+        raise ValueError(f"Unknown task type: {task_type}")
+
+    row = dict(text_row)
+
+    # Default values
+    row.setdefault("num_questions", kwargs.get("num_questions", 5))
+    row.setdefault("summary_length", max(row.get("word_count", 100) // 3, 30))
+
+    # For graded reader adaptation
+    if task_type == "graded_reader":
+        target_band = kwargs.get("target_band", "500-700")
+        row["target_lexile"] = target_band
+        with db.connection() as conn:
+            row["target_age_group"] = conn.execute(
+                "SELECT age_group FROM config_bands WHERE band = ?", (target_band,)
+            ).fetchone()
+        if row["target_age_group"]:
+            row["target_age_group"] = row["target_age_group"][0]
+        else:
+            row["target_age_group"] = "Middle School"
+        row["adaptation_rules"] = lt.ADAPTATION_RULES.get(target_band, "")
+        row["target_word_count"] = lt.TARGET_WORD_COUNTS.get(target_band, 200)
+
+    # Merge extra kwargs
+    row.update(kwargs)
+
+    return template_info["template"].format(**row)
+
+
+def load_rows():
+    with db.connection() as conn:
+        return conn.execute(
+            "SELECT * FROM reading_text WHERE text_body IS NOT NULL AND word_count IS NOT NULL "
+            "ORDER BY text_id"
+        ).fetchall()
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    db.init_db()
+    rows = load_rows()
+    task_types = list(lt.PROMPT_TEMPLATES)
+
+    def reference():
+        return [build_prompt_reference(r, t) for t in task_types for r in rows]
+
+    def compiled():
+        return [p for t in task_types for p in lt.render_batch(rows, t)]
+
+    expected, t_ref = timed(reference, repeat)
+    actual, t_new = timed(compiled, repeat)
+
+    mismatches = sum(1 for a, b in zip(expected, actual) if a != b)
+    n = len(expected) * repeat
+    print(f"prompts: {len(rows)} texts x {len(task_types)} task types x {repeat}")
+    print(f"reference : {t_ref:.3f}s ({n / t_ref:,.0f} prompts/s)")
+    print(f"compiled  : {t_new:.3f}s ({n / t_new:,.0f} prompts/s)")
+    print(f"speedup   : {t_ref / t_new:.2f}x")
+    print(f"identical : {not mismatches} ({mismatches} mismatches)")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
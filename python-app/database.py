@@ -4,8 +4,29 @@ Lexile Reading Text DB - SQLite Database Module
 import sqlite3
 import os
 import csv
+import gzip
+import io
+import re
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 
+import dedup
+import text_stats
+
+try:
+    import zstandard
+except ImportError:  # .zst export만 사용 불가
+    zstandard = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as pa_ds
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export/import만 사용 불가
+    pa = None
+
 DB_PATH = os.path.join(os.path.dirname(__file__), "reading_text.db")
 
 GENRE_CODES = {
@@ -44,16 +65,266 @@ LENGTH_TYPES = [
     ("Extra Long", 700, "421-1000", "심화 독해 / 학술"),
 ]
 
+# CSAT 문항 유형 (apps-script/QuestionGenerator.gs QUESTION_TYPES)
+# (code, name, min_lexile, min_length, genres: 쉼표 구분 또는 'all')
+QUESTION_TYPES = [
+    ("MI-01", "글의 목적", 700, "Short", "Narrative,Procedural,Informational"),
+    ("MI-02", "주장/요지", 700, "Short", "Argumentative,Expository"),
+    ("MI-03", "주제", 700, "Short", "Expository,Informational,Argumentative"),
+    ("MI-04", "제목", 700, "Short", "Expository,Informational,Argumentative,Literary,Narrative"),
+    ("DT-01", "내용 일치/불일치", 500, "Short", "all"),
+    ("IF-01", "함축 의미 추론", 900, "Short", "Narrative,Argumentative,Literary"),
+    ("IF-02", "빈칸 추론 (구)", 900, "Short", "Expository,Informational,Argumentative"),
+    ("IF-03", "빈칸 추론 (문장)", 1100, "Medium", "Expository,Argumentative"),
+    ("ST-01", "무관한 문장", 900, "Medium", "Expository,Informational,Argumentative"),
+    ("ST-02", "문장 삽입", 900, "Medium", "Narrative,Expository,Argumentative,Literary"),
+    ("ST-03", "글의 순서", 900, "Medium", "Narrative,Expository,Argumentative"),
+    ("VG-01", "어법 판단", 700, "Short", "all"),
+    ("VG-02", "어휘 판단", 700, "Short", "all"),
+    ("SM-01", "요약문 완성", 1100, "Medium", "Expository,Informational,Argumentative"),
+]
+
+
+# llm_toolkit 프롬프트가 쓰는 문항 유형 라벨 -> QUESTION_TYPES code
+# (csat_style: 주제|제목|요지|빈칸추론|순서배열, comprehension: factual|inference|...)
+ITEM_TYPE_CODES = {
+    "주제": "MI-03",
+    "제목": "MI-04",
+    "요지": "MI-02",
+    "빈칸추론": "IF-02",
+    "순서배열": "ST-03",
+    "main_idea": "MI-03",
+    "factual": "DT-01",
+    "inference": "IF-01",
+    "vocabulary": "VG-02",
+}
+
+# 커넥션마다 적용하는 PRAGMA (WAL + 캐시/mmap 튜닝)
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -16000,  # 음수 = KiB 단위 (약 16MB)
+    "mmap_size": 128 * 1024 * 1024,
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",
+    # REPLACE 충돌 해결로 지워지는 행에도 DELETE 트리거가 돌도록 하는 안전장치.
+    # 이 앱의 reading_text 쓰기는 ON CONFLICT DO UPDATE라 UPDATE 트리거로 동기화된다.
+    "recursive_triggers": "ON",
+}
+
+POOL_MAX_IDLE = 4
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() hands it back to its pool."""
+
+    pool = None
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.release(self)
+        else:
+            sqlite3.Connection.close(self)
+
+
+class ConnectionPool:
+    """Thread-safe SQLite connection pool.
+
+    A thread that already holds a connection gets the same one back on
+    nested acquire() calls; released connections are kept idle (up to
+    `max_idle`) and reused by the next caller instead of reconnecting.
+    The number of connections in use is not capped: every thread that
+    asks gets one, and extras are closed when released.
+    """
+
+    def __init__(self, db_path=None, max_idle=POOL_MAX_IDLE, pragmas=None):
+        self.db_path = db_path or DB_PATH
+        self.max_idle = max_idle
+        self.pragmas = dict(PRAGMAS if pragmas is None else pragmas)
+        self._idle = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._closed = False
+        self.opened = 0
+        self.reused = 0
+        self.closed = 0
+
+    def _open(self):
+        conn = sqlite3.connect(
+            self.db_path, factory=PooledConnection, check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        conn.pool = self
+        return conn
+
+    def acquire(self):
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            self._local.depth += 1
+            with self._lock:
+                self.reused += 1
+            return held
+
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+            if conn is not None:
+                self.reused += 1
+            else:
+                self.opened += 1
+        if conn is None:
+            conn = self._open()
+
+        self._local.conn = conn
+        self._local.depth = 1
+        return conn
+
+    def release(self, conn):
+        if getattr(self._local, "conn", None) is conn:
+            self._local.depth -= 1
+            if self._local.depth > 0:
+                return
+            self._local.conn = None
+
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if not self._closed and len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+            self.closed += 1
+        sqlite3.Connection.close(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self.closed += len(idle)
+        for conn in idle:
+            sqlite3.Connection.close(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "db_path": self.db_path,
+                "max_idle": self.max_idle,
+                "opened": self.opened,
+                "reused": self.reused,
+                "closed": self.closed,
+                "idle": len(self._idle),
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the shared pool, rebuilding it if DB_PATH changed."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.db_path != DB_PATH:
+            if _pool is not None:
+                _pool.close_all()
+            _pool = ConnectionPool(DB_PATH)
+        return _pool
+
+
+def configure_pool(max_idle=None, db_path=None, pragmas=None):
+    """Replace the shared pool (e.g. more idle connections for batch jobs)."""
+    global _pool, DB_PATH
+    with _pool_lock:
+        if db_path:
+            DB_PATH = db_path
+        if _pool is not None:
+            _pool.close_all()
+        _pool = ConnectionPool(DB_PATH, max_idle or POOL_MAX_IDLE, pragmas)
+        return _pool
+
+
+def get_pool_stats():
+    return get_pool().stats()
+
 
 def get_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON")
-    return conn
+    """Check out a pooled connection; conn.close() returns it to the pool."""
+    return get_pool().acquire()
 
 
-def init_db():
+@contextmanager
+def connection(conn=None):
+    """Reuse `conn` if given, otherwise borrow one from the pool."""
+    if conn is not None:
+        yield conn
+        return
     conn = get_connection()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+@contextmanager
+def import_transaction(conn):
+    """Write lock for a bulk import.
+
+    On an idle connection: BEGIN IMMEDIATE, then commit (rollback on
+    error). If the caller already has a transaction open, the import runs
+    under a SAVEPOINT instead and committing stays the caller's job.
+    """
+    if conn.in_transaction:
+        conn.execute("SAVEPOINT bulk_import")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK TO bulk_import")
+            conn.execute("RELEASE bulk_import")
+            raise
+        conn.execute("RELEASE bulk_import")
+        return
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+_config_version = 0
+
+
+def config_changed():
+    """Call after writing the config_* tables so cached copies get reloaded."""
+    global _config_version
+    _config_version += 1
+
+
+def config_version():
+    """Changes whenever the config tables may differ (DB switched or rewritten)."""
+    return DB_PATH, _config_version
+
+
+def init_db(conn=None):
+    with connection(conn) as conn:
+        _create_schema(conn)
+        if ensure_indexes(conn):
+            conn.execute("ANALYZE")
+        conn.commit()
+    config_changed()
+
+
+def _create_schema(conn):
     c = conn.cursor()
 
     c.execute("""
@@ -73,9 +344,11 @@ def init_db():
             vocabulary_band TEXT,
             intended_use TEXT,
             created_date TEXT,
-            notes TEXT
+            notes TEXT,
+            content_hash TEXT
         )
     """)
+    _add_content_hash(conn)
 
     c.execute("""
         CREATE TABLE IF NOT EXISTS config_bands (
@@ -103,6 +376,16 @@ def init_db():
         )
     """)
 
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS config_question_types (
+            code TEXT PRIMARY KEY,
+            name TEXT,
+            min_lexile INTEGER NOT NULL,
+            min_length TEXT NOT NULL,
+            genres TEXT NOT NULL
+        )
+    """)
+
     # Populate config tables
     for band in LEXILE_BANDS:
         c.execute(
@@ -116,150 +399,1311 @@ def init_db():
         c.execute(
             "INSERT OR IGNORE INTO config_lengths VALUES (?, ?, ?, ?)", length
         )
+    for question_type in QUESTION_TYPES:
+        c.execute(
+            "INSERT OR IGNORE INTO config_question_types VALUES (?, ?, ?, ?, ?)", question_type
+        )
 
-    conn.commit()
-    conn.close()
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS generation_jobs (
+            job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            total INTEGER NOT NULL,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    """)
 
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS generation_job_slots (
+            job_id INTEGER NOT NULL REFERENCES generation_jobs (job_id) ON DELETE CASCADE,
+            slot_index INTEGER NOT NULL,
+            slot TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            result TEXT,
+            error TEXT,
+            text_id TEXT,
+            updated_at TEXT,
+            PRIMARY KEY (job_id, slot_index)
+        )
+    """)
+    c.execute("""
+        CREATE INDEX IF NOT EXISTS idx_generation_job_slots_status
+        ON generation_job_slots (job_id, status)
+    """)
 
-def generate_text_id(band, genre, word_count, conn):
+    _create_id_sequences(conn)
+    _create_coverage_counts(conn)
+    _create_duplicate_index(conn)
+    _create_validation_state(conn)
+    _create_llm_batches(conn)
+    _create_question_bank(conn)
+    _create_fulltext(conn)
+
+
+def _add_content_hash(conn):
+    """기존 DB에 content_hash 컬럼 추가 + 채우기 (같은 본문은 첫 행에만 해시)"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(reading_text)")}
+    if "content_hash" in columns:
+        return
+
+    conn.execute("ALTER TABLE reading_text ADD COLUMN content_hash TEXT")
+    seen = set()
+    updates = []
+    for text_id, text_body in conn.execute(
+        "SELECT text_id, text_body FROM reading_text ORDER BY text_id"
+    ):
+        chash = body_hash(text_body)
+        if chash and chash not in seen:
+            seen.add(chash)
+            updates.append((chash, text_id))
+    conn.executemany("UPDATE reading_text SET content_hash = ? WHERE text_id = ?", updates)
+
+
+def _create_id_sequences(conn):
+    """text_id 순번 카운터 테이블 (prefix -> 다음 순번)"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'id_sequences'"
+    ).fetchone()
+    if exists:
+        return
+
+    conn.execute("""
+        CREATE TABLE id_sequences (
+            prefix TEXT PRIMARY KEY,
+            next_seq INTEGER NOT NULL
+        )
+    """)
+
+    # 기존 DB: 이미 사용된 최대 순번으로 카운터를 한 번만 초기화
+    next_seq = {}
+    for (text_id,) in conn.execute("SELECT text_id FROM reading_text"):
+        parsed = _split_text_id(text_id)
+        if parsed:
+            prefix, seq = parsed
+            next_seq[prefix] = max(next_seq.get(prefix, 1), seq + 1)
+    conn.executemany("INSERT INTO id_sequences VALUES (?, ?)", next_seq.items())
+
+
+# ==================== Coverage counts ====================
+
+# (band, genre, length_type) 셀별 텍스트 수를 트리거로 유지하는 집계 테이블.
+# 커버리지/통계 화면은 reading_text 대신 이 테이블(셀 수만큼의 행)을 읽는다.
+_HAS_BODY = "({row}.text_body IS NOT NULL AND {row}.text_body != '')"
+
+_COVERAGE_ADD = """
+            INSERT INTO coverage_counts (lexile_band, genre, length_type, count, with_body_count)
+            VALUES (new.lexile_band, new.genre, new.length_type, 1, {has_body})
+            ON CONFLICT (lexile_band, genre, length_type) DO UPDATE SET
+                count = count + 1,
+                with_body_count = with_body_count + excluded.with_body_count;""".format(
+    has_body=_HAS_BODY.format(row="new"))
+
+_COVERAGE_REMOVE = """
+            UPDATE coverage_counts SET
+                count = count - 1,
+                with_body_count = with_body_count - {has_body}
+            WHERE lexile_band = old.lexile_band AND genre = old.genre
+              AND length_type = old.length_type;
+            DELETE FROM coverage_counts
+            WHERE lexile_band = old.lexile_band AND genre = old.genre
+              AND length_type = old.length_type AND count <= 0;""".format(
+    has_body=_HAS_BODY.format(row="old"))
+
+_COVERAGE_TRIGGERS = {
+    "coverage_counts_ai": f"""
+        CREATE TRIGGER coverage_counts_ai AFTER INSERT ON reading_text BEGIN{_COVERAGE_ADD}
+        END""",
+    "coverage_counts_ad": f"""
+        CREATE TRIGGER coverage_counts_ad AFTER DELETE ON reading_text BEGIN{_COVERAGE_REMOVE}
+        END""",
+    "coverage_counts_au": f"""
+        CREATE TRIGGER coverage_counts_au
+        AFTER UPDATE OF lexile_band, genre, length_type, text_body ON reading_text BEGIN{_COVERAGE_REMOVE}{_COVERAGE_ADD}
+        END""",
+}
+
+
+def _create_coverage_counts(conn):
+    """coverage_counts 집계 테이블 + 트리거 생성 (새로 만들면 기존 행으로 채움)"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'coverage_counts'"
+    ).fetchone()
+    if not exists:
+        conn.execute("""
+            CREATE TABLE coverage_counts (
+                lexile_band TEXT NOT NULL,
+                genre TEXT NOT NULL,
+                length_type TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                with_body_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (lexile_band, genre, length_type)
+            ) WITHOUT ROWID
+        """)
+        rebuild_coverage_counts(conn)
+
+    existing = {
+        row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'reading_text'"
+        )
+    }
+    for name, sql in _COVERAGE_TRIGGERS.items():
+        if name not in existing:
+            conn.execute(sql)
+
+
+def rebuild_coverage_counts(conn=None):
+    """Recompute coverage_counts from reading_text (one full scan)."""
+    with connection(conn) as conn:
+        conn.execute("DELETE FROM coverage_counts")
+        conn.execute(f"""
+            INSERT INTO coverage_counts
+            SELECT lexile_band, genre, length_type, COUNT(*),
+                   SUM{_HAS_BODY.format(row="reading_text")}
+            FROM reading_text
+            GROUP BY lexile_band, genre, length_type
+        """)
+
+
+def get_coverage_summary(conn=None):
+    """Totals and per-band / per-genre counts, read from coverage_counts.
+
+    Returns {"total", "with_body", "empty", "bands": [(band, cnt)],
+    "genres": [(genre, cnt)]} with genres sorted by count descending.
+    """
+    with connection(conn) as conn:
+        cells = conn.execute(
+            "SELECT lexile_band, genre, count, with_body_count FROM coverage_counts"
+        ).fetchall()
+
+    bands, genres = {}, {}
+    total = with_body = 0
+    for cell in cells:
+        total += cell["count"]
+        with_body += cell["with_body_count"]
+        bands[cell["lexile_band"]] = bands.get(cell["lexile_band"], 0) + cell["count"]
+        genres[cell["genre"]] = genres.get(cell["genre"], 0) + cell["count"]
+
+    return {
+        "total": total,
+        "with_body": with_body,
+        "empty": total - with_body,
+        "bands": sorted(bands.items()),
+        "genres": sorted(genres.items(), key=lambda item: -item[1]),
+    }
+
+
+# ==================== Duplicate index ====================
+
+# dedup.DuplicateIndex가 채우는 MinHash 서명 / LSH 버킷 테이블.
+# 행이 삭제되거나 본문이 바뀌면 서명을 지우고, 다음 sync()에서 다시 계산한다.
+_DUPLICATE_TRIGGERS = {
+    "passage_signatures_ad": """
+        CREATE TRIGGER passage_signatures_ad AFTER DELETE ON reading_text BEGIN
+            DELETE FROM passage_signatures WHERE text_id = old.text_id;
+            DELETE FROM lsh_buckets WHERE text_id = old.text_id;
+        END""",
+    "passage_signatures_au": """
+        CREATE TRIGGER passage_signatures_au AFTER UPDATE OF text_id, text_body ON reading_text BEGIN
+            DELETE FROM passage_signatures WHERE text_id = old.text_id;
+            DELETE FROM lsh_buckets WHERE text_id = old.text_id;
+        END""",
+}
+
+
+def _create_duplicate_index(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS passage_signatures (
+            text_id TEXT PRIMARY KEY,
+            content_hash TEXT NOT NULL,
+            signature BLOB NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_passage_signatures_hash
+        ON passage_signatures(content_hash)
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS lsh_buckets (
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            text_id TEXT NOT NULL,
+            PRIMARY KEY (band, bucket, text_id)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_lsh_buckets_text ON lsh_buckets(text_id)")
+
+    existing = {
+        row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'reading_text'"
+        )
+    }
+    for name, sql in _DUPLICATE_TRIGGERS.items():
+        if name not in existing:
+            conn.execute(sql)
+
+
+# ==================== Validation state ====================
+
+# validation.validate_incremental()의 결과 캐시. 검증 대상 컬럼이 바뀌거나
+# 행이 삭제되면 트리거가 상태를 지워 다음 실행에서 그 행만 다시 검증한다.
+VALIDATED_COLUMNS = ["lexile_band", "lexile_score", "genre", "length_type", "word_count", "text_body"]
+
+_VALIDATION_CLEAR = """
+            DELETE FROM validation_state WHERE text_id = old.text_id;
+            DELETE FROM validation_errors WHERE text_id = old.text_id;"""
+
+_VALIDATION_TRIGGERS = {
+    "validation_state_ad": f"""
+        CREATE TRIGGER validation_state_ad AFTER DELETE ON reading_text BEGIN{_VALIDATION_CLEAR}
+        END""",
+    "validation_state_au": f"""
+        CREATE TRIGGER validation_state_au
+        AFTER UPDATE OF text_id, {", ".join(VALIDATED_COLUMNS)} ON reading_text BEGIN{_VALIDATION_CLEAR}
+        END""",
+}
+
+
+def _create_validation_state(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS validation_state (
+            text_id TEXT PRIMARY KEY,
+            row_hash TEXT NOT NULL,
+            rules_hash TEXT NOT NULL,
+            error_count INTEGER NOT NULL,
+            validated_at TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS validation_errors (
+            text_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            field TEXT,
+            type TEXT NOT NULL,
+            message TEXT,
+            PRIMARY KEY (text_id, seq)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_validation_errors_type ON validation_errors(type)")
+
+    existing = {
+        row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'reading_text'"
+        )
+    }
+    for name, sql in _VALIDATION_TRIGGERS.items():
+        if name not in existing:
+            conn.execute(sql)
+
+
+# ==================== LLM batches ====================
+
+def _create_llm_batches(conn):
+    """Provider batch jobs and their requests.
+
+    The raw reply of each request is kept in llm_batch_requests.reply;
+    parsed question items go to question_bank (with their batch_id).
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS llm_batches (
+            batch_id TEXT PRIMARY KEY,
+            provider TEXT NOT NULL,
+            model TEXT,
+            status TEXT NOT NULL,
+            total INTEGER NOT NULL,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS llm_batch_requests (
+            batch_id TEXT NOT NULL REFERENCES llm_batches (batch_id) ON DELETE CASCADE,
+            custom_id TEXT NOT NULL,
+            text_id TEXT NOT NULL,
+            task_type TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            error TEXT,
+            reply TEXT,
+            PRIMARY KEY (batch_id, custom_id)
+        )
+    """)
+    _add_column(conn, "llm_batch_requests", "reply", "TEXT")
+
+
+def _add_column(conn, table, column, decl):
+    """기존 DB에 없는 컬럼만 추가"""
+    if column not in {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+# ==================== Question bank ====================
+
+# sheets-setup QUESTION_BANK 시트 / QuestionGenerator.gs saveQuestion_과 같은 컬럼
+# + batch_id (llm_batch로 생성된 문항만, 시트 행은 NULL)
+QUESTION_CHOICES = 5
+QUESTION_BANK_COLUMNS = [
+    "question_id", "source_text_id", "question_type", "question_type_name",
+    "question_stem", "modified_passage",
+    *[f"choice_{n}" for n in range(1, QUESTION_CHOICES + 1)],
+    "correct_answer", "explanation", "difficulty", "created_date", "batch_id",
+]
+
+
+def _create_question_bank(conn):
+    """CSAT 문항 은행 (지문이 삭제되면 문항도 함께 삭제)"""
+    choices = ",\n".join(f"            choice_{n} TEXT" for n in range(1, QUESTION_CHOICES + 1))
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS question_bank (
+            question_id TEXT PRIMARY KEY,
+            source_text_id TEXT NOT NULL REFERENCES reading_text (text_id) ON DELETE CASCADE,
+            question_type TEXT NOT NULL,
+            question_type_name TEXT,
+            question_stem TEXT,
+            modified_passage TEXT,
+{choices},
+            correct_answer INTEGER,
+            explanation TEXT,
+            difficulty TEXT,
+            created_date TEXT,
+            batch_id TEXT
+        )
+    """)
+    _add_column(conn, "question_bank", "batch_id", "TEXT")
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_question_bank_source
+        ON question_bank (source_text_id, question_type)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_question_bank_type
+        ON question_bank (question_type, difficulty)
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS question_eligibility (
+            lexile_band TEXT NOT NULL,
+            genre TEXT NOT NULL,
+            length_type TEXT NOT NULL,
+            question_type TEXT NOT NULL,
+            PRIMARY KEY (lexile_band, genre, length_type, question_type)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_question_eligibility_type
+        ON question_eligibility (question_type, lexile_band, genre, length_type)
+    """)
+    sync_question_eligibility(conn)
+
+
+def recommended_types(lexile_score, genre, length_type, question_types=QUESTION_TYPES,
+                      length_order=None):
+    """Port of QuestionGenerator.gs getRecommendedTypes for one passage.
+
+    question_types: (code, name, min_lexile, min_length, genres) rows.
+    length_order: {length_type: rank}; defaults to LENGTH_TYPES order. As
+    in the script, an unknown length_type is never filtered out.
+    """
+    if length_order is None:
+        length_order = {row[0]: i for i, row in enumerate(LENGTH_TYPES)}
+    codes = []
+    for code, _, min_lexile, min_length, genres in question_types:
+        if (lexile_score or 0) < min_lexile:
+            continue
+        if length_type in length_order and length_order[length_type] < length_order[min_length]:
+            continue
+        allowed = genres.split(",")
+        if "all" not in allowed and genre not in allowed:
+            continue
+        codes.append(code)
+    return codes
+
+
+def build_question_eligibility(conn):
+    """(band, genre, length_type, code) rows from the config_* tables.
+
+    Bands are half-open ([300, 500) -> "300-500", import_external.get_band)
+    and every min_lexile is a band lower bound, so checking a band's lower
+    bound gives the same answer as checking each score inside it.
+    """
+    question_types = conn.execute(
+        "SELECT code, name, min_lexile, min_length, genres FROM config_question_types ORDER BY code"
+    ).fetchall()
+    lengths = [row[0] for row in conn.execute("SELECT type FROM config_lengths ORDER BY target_words")]
+    length_order = {length: i for i, length in enumerate(lengths)}
+    genres = [row[0] for row in conn.execute("SELECT name FROM config_genres")]
+
+    rows = []
+    for (band,) in conn.execute("SELECT band FROM config_bands"):
+        band_min = int(band.split("-")[0])
+        for genre in genres:
+            for length in lengths:
+                for code in recommended_types(band_min, genre, length, question_types, length_order):
+                    rows.append((band, genre, length, code))
+    return rows
+
+
+def sync_question_eligibility(conn):
+    """Rewrite question_eligibility if the config tables changed; returns True if rewritten."""
+    rows = set(build_question_eligibility(conn))
+    stored = set(conn.execute(
+        "SELECT lexile_band, genre, length_type, question_type FROM question_eligibility"
+    ).fetchall())
+    if rows == {tuple(r) for r in stored}:
+        return False
+    conn.execute("DELETE FROM question_eligibility")
+    conn.executemany("INSERT INTO question_eligibility VALUES (?, ?, ?, ?)", sorted(rows))
+    return True
+
+
+# ==================== Full-text search ====================
+
+FTS_TABLE = "reading_text_fts"
+
+# reading_text 변경 시 FTS 인덱스를 동기화하는 트리거
+_FTS_TRIGGERS = {
+    "reading_text_fts_ai": """
+        CREATE TRIGGER reading_text_fts_ai AFTER INSERT ON reading_text BEGIN
+            INSERT INTO reading_text_fts (rowid, topic, text_body)
+            VALUES (new.rowid, new.topic, new.text_body);
+        END""",
+    "reading_text_fts_ad": """
+        CREATE TRIGGER reading_text_fts_ad AFTER DELETE ON reading_text BEGIN
+            INSERT INTO reading_text_fts (reading_text_fts, rowid, topic, text_body)
+            VALUES ('delete', old.rowid, old.topic, old.text_body);
+        END""",
+    "reading_text_fts_au": """
+        CREATE TRIGGER reading_text_fts_au AFTER UPDATE OF topic, text_body ON reading_text BEGIN
+            INSERT INTO reading_text_fts (reading_text_fts, rowid, topic, text_body)
+            VALUES ('delete', old.rowid, old.topic, old.text_body);
+            INSERT INTO reading_text_fts (rowid, topic, text_body)
+            VALUES (new.rowid, new.topic, new.text_body);
+        END""",
+}
+
+# bm25 가중치: topic 매치를 본문 매치보다 높게
+FTS_WEIGHTS = (5.0, 1.0)
+
+
+def _create_fulltext(conn):
+    """FTS5 인덱스 + 동기화 트리거 생성 (FTS5 미지원 빌드면 건너뜀)"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+    ).fetchone()
+    if not exists:
+        try:
+            conn.execute(f"""
+                CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+                    topic, text_body,
+                    content='reading_text', content_rowid='rowid',
+                    tokenize='porter unicode61'
+                )
+            """)
+        except sqlite3.OperationalError:
+            return
+        # 기존 DB의 행을 한 번에 인덱싱
+        conn.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')")
+
+    existing = {
+        row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'reading_text'"
+        )
+    }
+    for name, sql in _FTS_TRIGGERS.items():
+        if name not in existing:
+            conn.execute(sql)
+
+
+def fulltext_available(conn=None):
+    with connection(conn) as conn:
+        return conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+        ).fetchone() is not None
+
+
+def parse_search_query(text):
+    """Split user input into terms: ("phrase", False) / ("prefix", True)."""
+    terms = []
+    for phrase, word in re.findall(r'"([^"]+)"|(\S+)', text or ""):
+        if phrase:
+            if phrase.strip():
+                terms.append((phrase.strip(), False))
+            continue
+        prefix = word.endswith("*")
+        word = word.strip('*"')
+        if word:
+            terms.append((word, prefix))
+    return terms
+
+
+def to_fts_query(terms):
+    """Quote each term so FTS5 operators in user input are taken literally."""
+    parts = []
+    for term, prefix in terms:
+        quoted = '"' + term.replace('"', '""') + '"'
+        parts.append(quoted + ("*" if prefix else ""))
+    return " ".join(parts)
+
+
+def fulltext_search(query, band=None, genre=None, length_type=None, limit=None,
+                    snippet_markers=("[", "]"), conn=None):
+    """Keyword search over topic + text_body.
+
+    Supports "quoted phrases" and prefix* terms (all terms must match).
+    With FTS5 the rows are ranked by bm25 and carry a highlighted
+    `snippet`; otherwise falls back to LIKE matching ordered by
+    lexile_score (rank and snippet are NULL).
+    """
+    terms = parse_search_query(query)
+    if not terms:
+        return []
+
+    filters = []
+    params = []
+    if band:
+        filters.append("t.lexile_band = ?")
+        params.append(band)
+    if genre:
+        filters.append("t.genre = ?")
+        params.append(genre)
+    if length_type:
+        filters.append("t.length_type = ?")
+        params.append(length_type)
+
+    with connection(conn) as conn:
+        if fulltext_available(conn):
+            start, end = snippet_markers
+            sql = f"""
+                SELECT t.*,
+                       bm25({FTS_TABLE}, {FTS_WEIGHTS[0]}, {FTS_WEIGHTS[1]}) AS rank,
+                       snippet({FTS_TABLE}, 1, ?, ?, '...', 16) AS snippet
+                FROM {FTS_TABLE} f
+                JOIN reading_text t ON t.rowid = f.rowid
+                WHERE {FTS_TABLE} MATCH ?
+            """
+            params = [start, end, to_fts_query(terms)] + params
+            order = " ORDER BY rank"
+        else:
+            sql = "SELECT t.*, NULL AS rank, NULL AS snippet FROM reading_text t WHERE 1=1"
+            like = []
+            for term, _ in terms:
+                sql += " AND (t.topic LIKE ? OR t.text_body LIKE ?)"
+                like.extend([f"%{term}%", f"%{term}%"])
+            params = like + params
+            order = " ORDER BY t.lexile_score"
+
+        for f in filters:
+            sql += f" AND {f}"
+        sql += order
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return conn.execute(sql, params).fetchall()
+
+
+# ==================== Indexes ====================
+
+# init_db()가 관리하는 reading_text 보조 인덱스 (이름 -> 정의)
+INDEXES = {
+    # get_all_texts(band) / get_all_texts(genre): 필터 + text_id 정렬
+    "idx_reading_text_band_id":
+        "reading_text (lexile_band, text_id)",
+    "idx_reading_text_genre_id":
+        "reading_text (genre, text_id)",
+    # get_coverage_matrix(band), band + genre + length 필터
+    "idx_reading_text_band_genre_length":
+        "reading_text (lexile_band, genre, length_type)",
+    # search_texts(band) / build_curriculum_sequence: band 필터 + lexile_score 정렬
+    "idx_reading_text_band_score":
+        "reading_text (lexile_band, lexile_score)",
+    # get_coverage_matrix() 전체, genre(+length) 필터 + lexile_score 정렬
+    "idx_reading_text_genre_length_score":
+        "reading_text (genre, length_type, lexile_score)",
+    # search_texts(length_type)
+    "idx_reading_text_length_score":
+        "reading_text (length_type, lexile_score)",
+    # get_empty_slots(): 본문 미작성 행만 담는 부분 인덱스
+    "idx_reading_text_empty_body":
+        "reading_text (text_id) WHERE text_body IS NULL OR text_body = ''",
+    # upsert_texts(): 본문 해시가 지문의 실제 identity (빈 슬롯은 제외)
+    "idx_reading_text_content_hash":
+        "reading_text (content_hash) WHERE content_hash IS NOT NULL",
+}
+
+UNIQUE_INDEXES = {"idx_reading_text_content_hash"}
+
+MANAGED_INDEX_PREFIX = "idx_reading_text_"
+
+
+def ensure_indexes(conn):
+    """Create missing managed indexes and drop retired ones.
+
+    Safe to run on existing DBs; returns the names of indexes created.
+    """
+    existing = {
+        row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'reading_text'"
+        )
+    }
+
+    for name in existing:
+        if name.startswith(MANAGED_INDEX_PREFIX) and name not in INDEXES:
+            conn.execute(f"DROP INDEX {name}")
+
+    created = []
+    for name, definition in INDEXES.items():
+        if name not in existing:
+            kind = "UNIQUE INDEX" if name in UNIQUE_INDEXES else "INDEX"
+            conn.execute(f"CREATE {kind} {name} ON {definition}")
+            created.append(name)
+    return created
+
+
+def hot_queries():
+    """(name, sql, params) for the queries the helpers run (EXPLAIN QUERY PLAN 진단용).
+
+    Built with the query builders the helpers themselves call.
+    """
+    text_id = "L700-NAR-100-001"
+    return [
+        ("get_all_texts(band)", *texts_query("700-900")),
+        ("get_all_texts(genre)", *texts_query(genre="Narrative")),
+        ("get_all_texts(band, genre)", *texts_query("700-900", "Narrative")),
+        ("get_coverage_matrix()", *coverage_query()),
+        ("get_coverage_matrix(band)", *coverage_query("700-900")),
+        ("get_text_count()", TEXT_COUNT_SQL, ()),
+        ("get_empty_slots()", EMPTY_SLOTS_SQL, ()),
+        ("get_text(text_id)", GET_TEXT_SQL, (text_id,)),
+        ("llm_toolkit.search_texts(band)", *texts_query("700-900", order_by="lexile_score")),
+        ("llm_toolkit.search_texts(genre, length_type)",
+         *texts_query(genre="Narrative", length_type="Short", order_by="lexile_score")),
+        ("llm_toolkit.search_texts(length_type)",
+         *texts_query(length_type="Short", order_by="lexile_score")),
+        ("llm_toolkit.build_curriculum_sequence(band)", *curriculum_query("700-900")),
+        ("llm_toolkit.quick_generate(band)", *random_text_query("700-900")),
+        ("query_questions(text_id)", *questions_query(text_id)),
+        ("get_eligible_texts(question_type)", *eligible_texts_query("IF-03")),
+        ("query_questions(question_type, band)",
+         *questions_query(question_type="IF-03", band="700-900")),
+    ]
+
+
+def explain_query(sql, params=(), conn=None):
+    """Return EXPLAIN QUERY PLAN detail lines for a query."""
+    with connection(conn) as conn:
+        rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    return [row["detail"] for row in rows]
+
+
+# 셀 단위 집계 테이블: 전체를 읽어도 O(cells)
+SUMMARY_TABLES = {"coverage_counts"}
+
+
+def is_full_scan(plan):
+    """True if the plan walks every row of a table.
+
+    Scans of a covering index, of a partial index or of a summary table
+    (one row per cell) don't count; a non-covering scan (e.g. walking the
+    primary key to avoid a sort) does.
+    """
+    partial = [name for name, definition in INDEXES.items() if " WHERE " in definition]
+    for detail in plan:
+        if not detail.startswith("SCAN "):
+            continue
+        if detail.split()[1] in SUMMARY_TABLES:
+            continue
+        if "COVERING INDEX" in detail or any(f"INDEX {name}" in detail for name in partial):
+            continue
+        return True
+    return False
+
+
+def query_plan_report(queries=None, conn=None):
+    """EXPLAIN every hot query; returns list of dicts (name, sql, plan, full_scan)."""
+    report = []
+    with connection(conn) as conn:
+        for name, sql, params in queries or hot_queries():
+            plan = explain_query(sql, params, conn)
+            report.append({
+                "name": name,
+                "sql": sql,
+                "plan": plan,
+                "full_scan": is_full_scan(plan),
+            })
+    return report
+
+
+def text_id_prefix(band, genre, word_count):
     genre_code = GENRE_CODES.get(genre, "UNK")
     band_num = band.split("-")[0]
-    prefix = f"L{band_num}-{genre_code}-{word_count:03d}"
+    return f"L{band_num}-{genre_code}-{word_count:03d}"
 
-    c = conn.cursor()
-    c.execute(
-        "SELECT text_id FROM reading_text WHERE text_id LIKE ?", (f"{prefix}%",)
-    )
-    rows = c.fetchall()
 
-    max_seq = 0
-    for row in rows:
-        parts = row["text_id"].split("-")
-        seq = int(parts[-1])
-        if seq > max_seq:
-            max_seq = seq
+def _split_text_id(text_id):
+    """'L700-NAR-100-003' -> ('L700-NAR-100', 3); None if not in ID format."""
+    prefix, _, seq = (text_id or "").rpartition("-")
+    if not prefix or not seq.isdigit():
+        return None
+    return prefix, int(seq)
 
-    return f"{prefix}-{max_seq + 1:03d}"
 
+class TextIdAllocator:
+    """Allocates text_id sequence numbers from the id_sequences table.
 
-def calculate_text_stats(text_body):
-    if not text_body:
-        return 0, 0, 0.0
+    Each allocation is a single upsert on the prefix row, so it runs in
+    constant time and inside the caller's insert transaction.
+    """
+
+    def next_id(self, band, genre, word_count, conn):
+        prefix = text_id_prefix(band, genre, word_count)
+        seq = conn.execute(
+            """INSERT INTO id_sequences (prefix, next_seq) VALUES (?, 2)
+               ON CONFLICT(prefix) DO UPDATE SET next_seq = next_seq + 1
+               RETURNING next_seq - 1""",
+            (prefix,),
+        ).fetchone()[0]
+        return f"{prefix}-{seq:03d}"
+
+    def reserve(self, text_id, conn):
+        """Keep the counter ahead of an explicitly supplied text_id."""
+        parsed = _split_text_id(text_id)
+        if parsed:
+            prefix, seq = parsed
+            conn.execute(
+                """INSERT INTO id_sequences (prefix, next_seq) VALUES (?, ?)
+                   ON CONFLICT(prefix) DO UPDATE
+                   SET next_seq = MAX(next_seq, excluded.next_seq)""",
+                (prefix, seq + 1),
+            )
 
-    words = text_body.strip().split()
-    word_count = len(words)
 
-    sentences = [s.strip() for s in text_body.replace("!", ".").replace("?", ".").split(".") if s.strip()]
-    sentence_count = len(sentences)
+class BulkTextIdAllocator(TextIdAllocator):
+    """In-memory allocator for bulk imports.
 
-    avg_length = round(word_count / sentence_count, 1) if sentence_count > 0 else 0.0
-    return word_count, sentence_count, avg_length
+    Reads each prefix's counter once, counts in memory, and writes the
+    counters back with flush() before the import commits. The caller must
+    hold the write lock (BEGIN IMMEDIATE) for the whole import.
+    """
+
+    def __init__(self):
+        self.next_seq = {}
+
+    def _load(self, prefix, conn):
+        if prefix not in self.next_seq:
+            row = conn.execute(
+                "SELECT next_seq FROM id_sequences WHERE prefix = ?", (prefix,)
+            ).fetchone()
+            self.next_seq[prefix] = row[0] if row else 1
+        return self.next_seq[prefix]
+
+    def next_id(self, band, genre, word_count, conn):
+        return self.next_prefixed(text_id_prefix(band, genre, word_count), conn)
+
+    def next_prefixed(self, prefix, conn):
+        seq = self._load(prefix, conn)
+        self.next_seq[prefix] = seq + 1
+        return f"{prefix}-{seq:03d}"
+
+    def reserve(self, text_id, conn):
+        parsed = _split_text_id(text_id)
+        if parsed:
+            prefix, seq = parsed
+            self.next_seq[prefix] = max(self._load(prefix, conn), seq + 1)
+
+    def flush(self, conn):
+        conn.executemany(
+            """INSERT INTO id_sequences (prefix, next_seq) VALUES (?, ?)
+               ON CONFLICT(prefix) DO UPDATE
+               SET next_seq = MAX(next_seq, excluded.next_seq)""",
+            self.next_seq.items(),
+        )
+
+
+_id_allocator = TextIdAllocator()
+
+
+def generate_text_id(band, genre, word_count, conn):
+    return _id_allocator.next_id(band, genre, word_count, conn)
+
+
+def calculate_text_stats(text_body):
+    return text_stats.db_stats(text_stats.analyze(text_body))
 
 
 def get_length_type(word_count):
-    if word_count <= 60:
-        return "Micro"
-    if word_count <= 120:
-        return "Short"
-    if word_count <= 230:
-        return "Medium"
-    return "Long"
+    """Smallest LENGTH_TYPES entry whose range upper bound covers word_count."""
+    for name, _target, word_range, _purpose in LENGTH_TYPES:
+        if word_count <= int(word_range.split("-")[1]):
+            return name
+    return LENGTH_TYPES[-1][0]
 
 
-def insert_text(data, conn=None):
-    close_conn = conn is None
-    if conn is None:
-        conn = get_connection()
+TEXT_COLUMNS = [
+    "text_id", "lexile_band", "lexile_score", "age_group", "grade_hint",
+    "genre", "topic", "word_count", "length_type", "text_body",
+    "sentence_count", "avg_sentence_length", "vocabulary_band",
+    "intended_use", "created_date", "notes", "content_hash",
+]
 
-    c = conn.cursor()
+IMPORT_CHUNK_SIZE = 500
+_BODY_INDEX = TEXT_COLUMNS.index("text_body")
+
+# text_id가 같으면 그 행을 갱신 (REPLACE는 행을 지워서 FK CASCADE와
+# content_hash UNIQUE 충돌 시 다른 행까지 삭제함). 본문 중복은 IntegrityError.
+_INSERT_SQL = (
+    f"INSERT INTO reading_text ({', '.join(TEXT_COLUMNS)}) "
+    f"VALUES ({', '.join(['?'] * len(TEXT_COLUMNS))}) "
+    f"ON CONFLICT(text_id) DO UPDATE SET "
+    f"{', '.join(f'{col} = excluded.{col}' for col in TEXT_COLUMNS[1:])}"
+)
+
+
+NUMERIC_FIELDS = {
+    "lexile_score": int,
+    "word_count": int,
+    "sentence_count": int,
+    "avg_sentence_length": float,
+}
+
+
+STAT_FIELDS = ["word_count", "sentence_count", "avg_sentence_length", "length_type"]
+
+
+def body_hash(text_body):
+    """content_hash value for a body (None for empty slots)."""
+    return text_stats.content_hash(text_body) if text_body else None
+
+
+def needs_stats(data):
+    return bool(data.get("text_body")) and any(f not in data for f in STAT_FIELDS)
+
+
+def prepare_text(data, conn, id_allocator=None, stats=None):
+    """Fill derived fields in place and return the row values in column order.
+
+    stats: precomputed text_stats result for data["text_body"] (bulk path).
+    """
+    # Convert numeric fields (CSV rows arrive as strings)
+    _cast_numeric(data)
 
     # Auto-calculate stats if text_body exists
-    if data.get("text_body"):
-        wc, sc, avg = calculate_text_stats(data["text_body"])
+    if needs_stats(data):
+        wc, sc, avg = text_stats.db_stats(stats or text_stats.analyze(data["text_body"]))
         data.setdefault("word_count", wc)
         data.setdefault("sentence_count", sc)
         data.setdefault("avg_sentence_length", avg)
         data.setdefault("length_type", get_length_type(wc))
 
     # Auto-generate ID
+    allocator = id_allocator or _id_allocator
     if not data.get("text_id"):
-        data["text_id"] = generate_text_id(
+        data["text_id"] = allocator.next_id(
             data["lexile_band"], data["genre"], data.get("word_count", 0), conn
         )
+    else:
+        allocator.reserve(data["text_id"], conn)
 
     data.setdefault("created_date", datetime.now().strftime("%Y-%m-%d"))
+    # 표시(flag)된 완전 중복은 해시를 원본 행에 남긴다 (unique)
+    data["content_hash"] = None if data.get("duplicate_of") else body_hash(data.get("text_body"))
+    return [data.get(col) for col in TEXT_COLUMNS]
 
-    columns = [
-        "text_id", "lexile_band", "lexile_score", "age_group", "grade_hint",
-        "genre", "topic", "word_count", "length_type", "text_body",
-        "sentence_count", "avg_sentence_length", "vocabulary_band",
-        "intended_use", "created_date", "notes",
-    ]
 
-    values = [data.get(col) for col in columns]
-    placeholders = ", ".join(["?"] * len(columns))
-    col_names = ", ".join(columns)
+def duplicate_owner(content_hash, conn):
+    """text_id of the row that already stores this body hash (or None)."""
+    if not content_hash:
+        return None
+    row = conn.execute(
+        "SELECT text_id FROM reading_text WHERE content_hash = ?", (content_hash,)
+    ).fetchone()
+    return row["text_id"] if row else None
 
-    c.execute(f"INSERT OR REPLACE INTO reading_text ({col_names}) VALUES ({placeholders})", values)
-    conn.commit()
 
-    if close_conn:
-        conn.close()
+def insert_text(data, conn=None):
+    """Insert a passage, or overwrite the row with the same text_id.
 
+    Raises ValueError if another row already holds the same body.
+    """
+    with connection(conn) as conn:
+        values = prepare_text(data, conn)
+        owner = duplicate_owner(data["content_hash"], conn)
+        if owner is not None and owner != data["text_id"]:
+            raise ValueError(f"{data['text_id']}: same text_body already stored as {owner}")
+        conn.execute(_INSERT_SQL, values)
+        dedup.index_passages(conn, [(data["text_id"], data.get("text_body"))])
+        conn.commit()
     return data["text_id"]
 
 
-def import_csv(csv_path):
-    conn = get_connection()
-    count = 0
+BODY_FIELDS = ["text_body", "word_count", "sentence_count", "avg_sentence_length"]
 
-    with open(csv_path, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            # Convert numeric fields
-            for field in ["lexile_score", "word_count", "sentence_count"]:
-                if row.get(field):
-                    row[field] = int(row[field])
-            if row.get("avg_sentence_length"):
-                row["avg_sentence_length"] = float(row["avg_sentence_length"])
 
-            insert_text(row, conn)
-            count += 1
+def fill_text_body(text_id, data, conn=None):
+    """Store a generated body in an existing (empty slot) row.
 
-    conn.close()
-    return count
+    Only the body, its stats and content_hash are written; the slot's own
+    metadata (grade_hint, notes, created_date, ...) is kept. Raises
+    ValueError for an unknown text_id or a body another row already holds.
+    """
+    data = dict(data)
+    if needs_stats(data):
+        wc, sc, avg = calculate_text_stats(data["text_body"])
+        data.setdefault("word_count", wc)
+        data.setdefault("sentence_count", sc)
+        data.setdefault("avg_sentence_length", avg)
+
+    with connection(conn) as conn:
+        chash = body_hash(data.get("text_body"))
+        owner = duplicate_owner(chash, conn)
+        if owner is not None and owner != text_id:
+            raise ValueError(f"{text_id}: same text_body already stored as {owner}")
+        cur = conn.execute(
+            f"UPDATE reading_text SET {', '.join(f'{col} = ?' for col in BODY_FIELDS)}, "
+            "content_hash = ? WHERE text_id = ?",
+            [*(data.get(col) for col in BODY_FIELDS), chash, text_id],
+        )
+        if cur.rowcount == 0:
+            raise ValueError(f"Unknown text_id: {text_id}")
+        dedup.index_passages(conn, [(text_id, data.get("text_body"))])
+        conn.commit()
+    return text_id
 
 
-def get_all_texts(band_filter=None, genre_filter=None):
-    conn = get_connection()
+def chunked(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+_CHUNK_ERRORS = (sqlite3.Error, ValueError, TypeError, KeyError)
+
+
+def _in_savepoint(conn, name, write, rows):
+    conn.execute(f"SAVEPOINT {name}")
+    try:
+        result = write(rows)
+    except _CHUNK_ERRORS:
+        conn.execute(f"ROLLBACK TO {name}")
+        conn.execute(f"RELEASE {name}")
+        raise
+    conn.execute(f"RELEASE {name}")
+    return result
+
+
+def write_chunk(conn, chunk, write, stats):
+    """Run write(rows) for one chunk under a SAVEPOINT and add its counts to stats.
+
+    If the chunk fails it is rolled back and retried row by row, so one
+    bad row costs only itself: each failing row adds 1 to "failed" and an
+    "errors" entry with its chunk and row number. write() must return a
+    dict of counts (e.g. {"inserted": n}).
+    """
+    stats["chunks"] += 1
+    originals = [dict(row) for row in chunk]  # write()가 행을 채워 넣으므로 재시도용 사본
+    try:
+        results = [_in_savepoint(conn, "import_chunk", write, chunk)]
+    except _CHUNK_ERRORS:
+        results = []
+        for n, row in enumerate(originals, 1):
+            try:
+                results.append(_in_savepoint(conn, "import_row", write, [row]))
+            except _CHUNK_ERRORS as e:
+                stats["failed"] += 1
+                stats["errors"].append({
+                    "chunk": stats["chunks"],
+                    "row": n,
+                    "rows": 1,
+                    "message": str(e),
+                })
+    for counts in results:
+        for key, value in counts.items():
+            stats[key] += value
+
+
+def bulk_insert(rows, conn=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """Insert many text dicts in a single transaction.
+
+    Rows are enriched with prepare_text() and written with executemany()
+    in chunks, each under its own SAVEPOINT: a chunk that fails is rolled
+    back and retried row by row (see write_chunk()), so only the bad rows
+    are reported in "errors" while the rest of the import commits.
+    text_ids come from an in-memory BulkTextIdAllocator. A conn with an
+    open transaction is left uncommitted (see import_transaction()).
+    Returns a stats dict (inserted, failed, chunks, errors, elapsed,
+    rows_per_sec).
+    """
+    stats = {"inserted": 0, "failed": 0, "chunks": 0, "errors": []}
+    allocator = BulkTextIdAllocator()
+    started = time.perf_counter()
+
+    def write(chunk):
+        # 통계가 필요한 행만 모아 한 번에 계산
+        todo = [i for i, row in enumerate(chunk) if needs_stats(row)]
+        columns = text_stats.analyze_batch([chunk[i]["text_body"] for i in todo])
+        row_stats = {i: text_stats.row(columns, n) for n, i in enumerate(todo)}
+        values = [
+            prepare_text(row, conn, allocator, row_stats.get(i))
+            for i, row in enumerate(chunk)
+        ]
+        conn.executemany(_INSERT_SQL, values)
+        dedup.index_passages(conn, ((v[0], v[_BODY_INDEX]) for v in values))
+        return {"inserted": len(values)}
+
+    with connection(conn) as conn, import_transaction(conn):
+        for chunk in chunked(rows, chunk_size):
+            write_chunk(conn, chunk, write, stats)
+        allocator.flush(conn)
+
+    stats["elapsed"] = time.perf_counter() - started
+    stats["rows_per_sec"] = stats["inserted"] / stats["elapsed"] if stats["elapsed"] else 0.0
+    return stats
+
+
+# 비교/갱신에서 제외: identity(text_id, content_hash)와 최초 생성일
+UPSERT_IGNORE = {"text_id", "content_hash", "created_date"}
+_LOOKUP_BATCH = 900  # SQLite 바인딩 변수 개수 제한 이하
+
+
+def _blank(value):
+    return None if value == "" else value
+
+
+def _cast_numeric(data):
+    for field, cast in NUMERIC_FIELDS.items():
+        if isinstance(data.get(field), str) and data[field]:
+            data[field] = cast(data[field])
+
+
+def _changed_fields(data, current):
+    """Incoming values that differ from the stored row ('' counts as NULL)."""
+    return {
+        col: _blank(data[col]) for col in TEXT_COLUMNS
+        if col in data and col not in UPSERT_IGNORE and _blank(data[col]) != current[col]
+    }
+
+
+def _load_existing(conn, column, keys):
+    found = {}
+    keys = list({k for k in keys if k})
+    for i in range(0, len(keys), _LOOKUP_BATCH):
+        part = keys[i:i + _LOOKUP_BATCH]
+        for row in conn.execute(
+            f"SELECT * FROM reading_text WHERE {column} IN ({', '.join('?' * len(part))})", part
+        ):
+            found[row[column]] = dict(row)
+    return found
+
+
+def _upsert_chunk(chunk, conn, allocator):
+    """Insert new passages, update changed ones, skip unchanged ones.
+
+    A row that carries an existing text_id matches that row (re-imported
+    exports, edited bodies, empty slots); otherwise it matches by
+    content_hash, so external files without IDs don't get re-inserted.
+    Rows flagged as exact copies ("duplicate_of") are always inserted.
+    Returns the inserted/updated/skipped counts.
+    """
+    counts = {"inserted": 0, "updated": 0, "skipped": 0}
+    for row in chunk:
+        _cast_numeric(row)
+    hashes = [body_hash(row.get("text_body")) for row in chunk]
+    by_hash = _load_existing(conn, "content_hash", hashes)
+    by_id = _load_existing(conn, "text_id", [row.get("text_id") for row in chunk])
+
+    todo = [i for i, row in enumerate(chunk) if needs_stats(row)]
+    columns = text_stats.analyze_batch([chunk[i]["text_body"] for i in todo])
+    row_stats = {i: text_stats.row(columns, n) for n, i in enumerate(todo)}
+
+    inserts = []
+    indexed = {}  # text_id -> text_body written in this chunk (MinHash index)
+    for i, (row, chash) in enumerate(zip(chunk, hashes)):
+        current = by_id.get(row.get("text_id"))
+        if current is None and chash and not row.get("duplicate_of"):
+            current = by_hash.get(chash)
+
+        if current is None:
+            values = prepare_text(row, conn, allocator, row_stats.get(i))
+            inserts.append(values)
+            indexed[values[0]] = values[_BODY_INDEX]
+            stored = dict(zip(TEXT_COLUMNS, values))
+            by_id[stored["text_id"]] = stored
+            if stored["content_hash"]:
+                by_hash[chash] = stored
+            counts["inserted"] += 1
+            continue
+
+        row["text_id"] = current["text_id"]
+        changes = _changed_fields(row, current)
+        if not changes:
+            counts["skipped"] += 1
+            continue
+
+        if "text_body" in changes:
+            owner = by_hash.get(chash)
+            # 같은 본문을 가진 다른 행이 있으면 해시는 그 행에 남긴다 (unique)
+            changes["content_hash"] = chash if owner is None or owner is current else None
+            if changes["content_hash"]:
+                by_hash[chash] = current
+            if i in row_stats:
+                wc, sc, avg = text_stats.db_stats(row_stats[i])
+                for field, value in (("word_count", wc), ("sentence_count", sc),
+                                     ("avg_sentence_length", avg),
+                                     ("length_type", get_length_type(wc))):
+                    changes.setdefault(field, value)
+
+        # 같은 chunk에서 방금 추가한 행을 갱신할 수 있으므로 INSERT를 먼저 반영
+        if inserts:
+            conn.executemany(_INSERT_SQL, inserts)
+            inserts = []
+        conn.execute(
+            f"UPDATE reading_text SET {', '.join(f'{col} = ?' for col in changes)} "
+            "WHERE text_id = ?",
+            [*changes.values(), current["text_id"]],
+        )
+        current.update(changes)
+        counts["updated"] += 1
+        if "text_body" in changes:
+            indexed[current["text_id"]] = changes["text_body"]
+
+    if inserts:
+        conn.executemany(_INSERT_SQL, inserts)
+    dedup.index_passages(conn, indexed.items())
+    return counts
+
+
+def upsert_texts(rows, conn=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """Idempotent bulk import keyed by the normalized body hash.
+
+    Unchanged passages are skipped, passages whose metadata changed are
+    updated in place (keeping their text_id), new ones are inserted.
+    Same transaction/savepoint handling as bulk_insert(); the stats dict
+    adds "updated" and "skipped".
+    """
+    stats = {"inserted": 0, "updated": 0, "skipped": 0, "failed": 0, "chunks": 0, "errors": []}
+    allocator = BulkTextIdAllocator()
+    started = time.perf_counter()
+
+    with connection(conn) as conn, import_transaction(conn):
+        for chunk in chunked(rows, chunk_size):
+            write_chunk(conn, chunk, lambda rows: _upsert_chunk(rows, conn, allocator), stats)
+        allocator.flush(conn)
+
+    stats["elapsed"] = time.perf_counter() - started
+    processed = stats["inserted"] + stats["updated"] + stats["skipped"]
+    stats["rows_per_sec"] = processed / stats["elapsed"] if stats["elapsed"] else 0.0
+    return stats
+
+
+def bulk_import_csv(csv_path, conn=None, chunk_size=IMPORT_CHUNK_SIZE, duplicates=None):
+    """Import a reading_text-schema CSV with upsert_texts() (re-runs are idempotent).
+
+    duplicates: None (no check), "reject" or "flag" -- see
+    dedup.filter_duplicates. The stats dict gains "duplicates" (count).
+    """
+    with connection(conn) as conn, open(csv_path, "r", encoding="utf-8") as f:
+        rows = csv.DictReader(f)
+        if duplicates is None:
+            return upsert_texts(rows, conn, chunk_size)
+        return upsert_checked(rows, duplicates, conn, chunk_size)
+
+
+def upsert_checked(rows, duplicates="reject", conn=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """upsert_texts() with near-duplicate detection against the MinHash index.
+
+    Index catch-up, import and flush share one import_transaction().
+    """
+    found = []
+    with connection(conn) as conn, import_transaction(conn):
+        index = dedup.DuplicateIndex(conn)
+        index.sync()
+        stats = upsert_texts(
+            dedup.filter_duplicates(rows, index, duplicates,
+                                    lambda row, matches: found.append(matches)),
+            conn, chunk_size,
+        )
+        index.flush()
+    stats["duplicates"] = len(found)
+    return stats
+
+
+def import_csv(csv_path, conn=None, duplicates=None):
+    """bulk_import_csv() with the default chunk size; returns its stats dict."""
+    return bulk_import_csv(csv_path, conn, duplicates=duplicates)
+
+
+# ==================== Queries ====================
+# *_query() 빌더가 (sql, params)를 만들고, 헬퍼와 hot_queries()가 같은 빌더를 쓴다
+
+def texts_query(band=None, genre=None, length_type=None, order_by="text_id"):
+    """reading_text rows filtered by band / genre / length_type.
+
+    order_by is a fixed column name from the caller, never user input.
+    """
     query = "SELECT * FROM reading_text WHERE 1=1"
     params = []
 
-    if band_filter:
+    if band:
         query += " AND lexile_band = ?"
-        params.append(band_filter)
-    if genre_filter:
+        params.append(band)
+    if genre:
         query += " AND genre = ?"
-        params.append(genre_filter)
+        params.append(genre)
+    if length_type:
+        query += " AND length_type = ?"
+        params.append(length_type)
 
-    query += " ORDER BY text_id"
-    rows = conn.execute(query, params).fetchall()
-    conn.close()
-    return rows
+    query += f" ORDER BY {order_by}"
+    return query, params
 
 
-def get_coverage_matrix(band_filter=None):
-    conn = get_connection()
-    query = "SELECT genre, length_type, COUNT(*) as cnt FROM reading_text"
+def coverage_query(band=None):
+    query = "SELECT genre, length_type, SUM(count) as cnt FROM coverage_counts"
     params = []
 
-    if band_filter:
+    if band:
         query += " WHERE lexile_band = ?"
-        params.append(band_filter)
+        params.append(band)
 
     query += " GROUP BY genre, length_type"
-    rows = conn.execute(query, params).fetchall()
-    conn.close()
+    return query, params
+
+
+TEXT_COUNT_SQL = "SELECT COALESCE(SUM(count), 0) FROM coverage_counts"
+EMPTY_SLOTS_SQL = "SELECT * FROM reading_text WHERE text_body IS NULL OR text_body = ''"
+GET_TEXT_SQL = "SELECT * FROM reading_text WHERE text_id = ?"
+
+
+def curriculum_query(band, num_texts=5):
+    """Texts of a band from the shortest length type up (Micro -> Extra Long)."""
+    order = " ".join(f"WHEN '{name}' THEN {i}" for i, (name, *_) in enumerate(LENGTH_TYPES, 1))
+    return (
+        "SELECT * FROM reading_text WHERE lexile_band = ? "
+        f"ORDER BY CASE length_type {order} END, lexile_score LIMIT ?",
+        [band, num_texts],
+    )
+
+
+def random_text_query(band):
+    return (
+        "SELECT * FROM reading_text WHERE lexile_band = ? AND text_body IS NOT NULL "
+        "ORDER BY RANDOM() LIMIT 1",
+        [band],
+    )
+
+
+def get_all_texts(band_filter=None, genre_filter=None, conn=None):
+    query, params = texts_query(band_filter, genre_filter)
+    with connection(conn) as conn:
+        return conn.execute(query, params).fetchall()
+
+
+def get_coverage_matrix(band_filter=None, conn=None):
+    query, params = coverage_query(band_filter)
+    with connection(conn) as conn:
+        rows = conn.execute(query, params).fetchall()
 
     matrix = {}
     for row in rows:
@@ -271,35 +1715,453 @@ def get_coverage_matrix(band_filter=None):
     return matrix
 
 
-def get_text_count():
-    conn = get_connection()
-    count = conn.execute("SELECT COUNT(*) FROM reading_text").fetchone()[0]
-    conn.close()
+def get_text_count(conn=None):
+    with connection(conn) as conn:
+        return conn.execute(TEXT_COUNT_SQL).fetchone()[0]
+
+
+def get_empty_slot_count(conn=None):
+    with connection(conn) as conn:
+        return conn.execute(
+            "SELECT COALESCE(SUM(count - with_body_count), 0) FROM coverage_counts"
+        ).fetchone()[0]
+
+
+def get_empty_slots(conn=None):
+    with connection(conn) as conn:
+        return conn.execute(EMPTY_SLOTS_SQL).fetchall()
+
+
+def get_text(text_id, conn=None):
+    with connection(conn) as conn:
+        return conn.execute(GET_TEXT_SQL, (text_id,)).fetchone()
+
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_COMPRESSION = {".gz": "gzip", ".zst": "zstd"}
+
+
+def open_export(output_path, compression=None):
+    """Open a text-mode writer for output_path (plain, gzip or zstd)."""
+    if compression is None:
+        ext = os.path.splitext(output_path)[1].lower()
+        compression = EXPORT_COMPRESSION.get(ext)
+
+    if compression is None:
+        return open(output_path, "w", encoding="utf-8", newline="")
+    if compression == "gzip":
+        return gzip.open(output_path, "wt", encoding="utf-8", newline="")
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd export requires the zstandard package (pip install zstandard)")
+        raw = zstandard.ZstdCompressor().stream_writer(open(output_path, "wb"))
+        return io.TextIOWrapper(raw, encoding="utf-8", newline="")
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+def _export_query(columns, band_filter=None, genre_filter=None):
+    """SELECT over reading_text; columns=None keeps the table's own order (SELECT *)."""
+    unknown = [c for c in columns or () if c not in TEXT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+
+    query = f"SELECT {', '.join(columns) if columns else '*'} FROM reading_text WHERE 1=1"
+    params = []
+    if band_filter:
+        query += " AND lexile_band = ?"
+        params.append(band_filter)
+    if genre_filter:
+        query += " AND genre = ?"
+        params.append(genre_filter)
+    return query + " ORDER BY text_id", params
+
+
+def export_csv(output_path, conn=None, columns=None, band_filter=None,
+               genre_filter=None, compression=None, batch_size=EXPORT_BATCH_SIZE):
+    """Stream reading_text to CSV, batch_size rows at a time.
+
+    columns: projection (e.g. everything but text_body); defaults to all
+        columns in table order.
+    compression: "gzip" | "zstd" | None (inferred from .gz / .zst suffix).
+    Returns the number of rows written; no file is created when nothing matches.
+    """
+    query, params = _export_query(columns and list(columns), band_filter, genre_filter)
+
+    count = 0
+    with connection(conn) as conn:
+        cursor = conn.execute(query, params)
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            return 0
+
+        with open_export(output_path, compression) as f:
+            writer = csv.writer(f)
+            writer.writerow([d[0] for d in cursor.description])
+            while batch:
+                writer.writerows(batch)
+                count += len(batch)
+                batch = cursor.fetchmany(batch_size)
+
     return count
 
 
-def get_empty_slots():
-    conn = get_connection()
-    rows = conn.execute(
-        "SELECT * FROM reading_text WHERE text_body IS NULL OR text_body = ''"
-    ).fetchall()
-    conn.close()
-    return rows
+# ==================== Parquet / Arrow ====================
 
+# 반복값이 많은 범주형 컬럼은 dictionary 인코딩
+DICTIONARY_COLUMNS = ["lexile_band", "genre", "length_type"]
+PARQUET_PARTITION = "lexile_band"
 
-def export_csv(output_path):
-    conn = get_connection()
-    rows = conn.execute("SELECT * FROM reading_text ORDER BY text_id").fetchall()
-    conn.close()
 
-    if not rows:
-        return 0
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("Parquet support requires pyarrow (pip install pyarrow)")
+
+
+def arrow_schema(columns=None):
+    """Typed Arrow schema for reading_text (optionally projected)."""
+    _require_pyarrow()
+    category = pa.dictionary(pa.int32(), pa.string())
+    types = {col: pa.string() for col in TEXT_COLUMNS}
+    types.update({col: category for col in DICTIONARY_COLUMNS})
+    types.update({
+        "lexile_score": pa.int32(),
+        "word_count": pa.int32(),
+        "sentence_count": pa.int32(),
+        "avg_sentence_length": pa.float64(),
+    })
+    return pa.schema([(col, types[col]) for col in (columns or TEXT_COLUMNS)])
+
+
+def iter_record_batches(conn=None, columns=None, band_filter=None, genre_filter=None,
+                        batch_size=EXPORT_BATCH_SIZE):
+    """Yield reading_text as Arrow RecordBatches of batch_size rows."""
+    schema = arrow_schema(columns)
+    columns = schema.names
+    query, params = _export_query(columns, band_filter, genre_filter)
+    with connection(conn) as conn:
+        cursor = conn.execute(query, params)
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            arrays = [
+                pa.array([row[i] for row in batch], type=field.type)
+                for i, field in enumerate(schema)
+            ]
+            yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def export_parquet(output_path, conn=None, columns=None, band_filter=None,
+                   genre_filter=None, partition_by_band=False,
+                   compression="zstd", batch_size=EXPORT_BATCH_SIZE):
+    """Write reading_text to Parquet with typed, dictionary-encoded columns.
+
+    partition_by_band=True writes a hive-style directory
+    (output_path/lexile_band=.../part-0.parquet) instead of a single file.
+    Returns the number of rows written.
+    """
+    _require_pyarrow()
+    if partition_by_band and columns and PARQUET_PARTITION not in columns:
+        columns = [PARQUET_PARTITION] + list(columns)
+    schema = arrow_schema(columns)
+    count = 0
+
+    def counted(batches):
+        nonlocal count
+        for batch in batches:
+            count += batch.num_rows
+            yield batch
+
+    batches = counted(iter_record_batches(
+        conn, schema.names, band_filter, genre_filter, batch_size
+    ))
+
+    if partition_by_band:
+        pa_ds.write_dataset(
+            batches, output_path, schema=schema, format="parquet",
+            partitioning=pa_ds.partitioning(
+                pa.schema([schema.field(PARQUET_PARTITION)]), flavor="hive"
+            ),
+            file_options=pa_ds.ParquetFileFormat().make_write_options(compression=compression),
+            existing_data_behavior="overwrite_or_ignore",
+        )
+    else:
+        with pq.ParquetWriter(output_path, schema, compression=compression) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+
+    return count
+
+
+def import_parquet(path, conn=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """Import a Parquet file or hive-partitioned directory via upsert_texts.
+
+    Values arrive already typed, so no CSV re-parsing is needed.
+    """
+    _require_pyarrow()
+    dataset = pa_ds.dataset(path, format="parquet", partitioning="hive")
+    columns = [c for c in dataset.schema.names if c in TEXT_COLUMNS]
+
+    def rows():
+        for batch in dataset.to_batches(columns=columns, batch_size=chunk_size):
+            yield from batch.to_pylist()
+
+    return upsert_texts(rows(), conn, chunk_size)
+
+
+# ==================== Question bank I/O ====================
+
+_QUESTION_INSERT_SQL = (
+    f"INSERT OR REPLACE INTO question_bank ({', '.join(QUESTION_BANK_COLUMNS)}) "
+    f"VALUES ({', '.join(['?'] * len(QUESTION_BANK_COLUMNS))})"
+)
+
+
+def question_id_prefix(text_id, question_type):
+    """Q-<text_id>-<question_type>; 뒤의 순번(-001)은 id_sequences에서 할당"""
+    return f"Q-{text_id}-{question_type}"
+
+
+def question_type_codes(conn):
+    """{label: code} for generated items: codes, config_question_types names
+    and ITEM_TYPE_CODES. Look labels up with question_type_code()."""
+    codes = {}
+    for code, name in conn.execute("SELECT code, name FROM config_question_types"):
+        codes[code] = code
+        codes[name.replace(" ", "")] = code
+    codes.update(ITEM_TYPE_CODES)
+    return codes
+
+
+def question_type_code(label, codes):
+    """Canonical code for an item label ("빈칸 추론" -> "IF-02"), else the label."""
+    return codes.get(label.replace(" ", ""), label)
+
+
+def question_record(data, text_id=None):
+    """Normalize one question into a dict over QUESTION_BANK_COLUMNS.
+
+    Accepts the QuestionGenerator JSON reply (choices as a list of
+    {number, text, is_correct}) as well as flat QUESTION_BANK rows
+    (choice_1..choice_5, e.g. from a sheet export). Blank strings become
+    NULL and correct_answer falls back to the choice marked is_correct.
+    """
+    record = {col: _blank(data.get(col)) for col in QUESTION_BANK_COLUMNS}
+    record["source_text_id"] = record["source_text_id"] or text_id
+
+    choices = data.get("choices")
+    if isinstance(choices, list):
+        for n, choice in enumerate(choices[:QUESTION_CHOICES], 1):
+            is_dict = isinstance(choice, dict)
+            record[f"choice_{n}"] = choice.get("text") if is_dict else choice
+            if is_dict and choice.get("is_correct") and record["correct_answer"] is None:
+                record["correct_answer"] = choice.get("number", n)
+
+    if record["correct_answer"] is not None:
+        record["correct_answer"] = int(record["correct_answer"])
+    if record["modified_passage"] == "null":
+        record["modified_passage"] = None
+    record["created_date"] = record["created_date"] or datetime.now().strftime("%Y-%m-%d")
+    if not record["source_text_id"] or not record["question_type"]:
+        raise ValueError("question needs source_text_id and question_type")
+    return record
+
+
+def _known_text_ids(conn, text_ids):
+    known = set()
+    text_ids = list(text_ids)
+    for i in range(0, len(text_ids), 500):
+        part = text_ids[i:i + 500]
+        known.update(row[0] for row in conn.execute(
+            f"SELECT text_id FROM reading_text WHERE text_id IN ({', '.join('?' * len(part))})",
+            part,
+        ))
+    return known
+
+
+def insert_questions(questions, conn=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """Bulk insert into question_bank, chunked like bulk_insert() (see write_chunk()).
+
+    Questions without a question_id get Q-<text_id>-<type>-NNN from the
+    id_sequences counters; rows that carry one replace the stored row.
+    Questions whose source_text_id is not in reading_text are skipped
+    and reported in "errors". Returns a stats dict (inserted, failed,
+    chunks, errors, elapsed, rows_per_sec).
+    """
+    stats = {"inserted": 0, "failed": 0, "chunks": 0, "errors": []}
+    allocator = BulkTextIdAllocator()
+    started = time.perf_counter()
+
+    def write(chunk):
+        records = [question_record(q) for q in chunk]
+        known = _known_text_ids(conn, {r["source_text_id"] for r in records})
+        missing = sorted({r["source_text_id"] for r in records} - known)
+        records = [r for r in records if r["source_text_id"] in known]
+        for r in records:
+            if r["question_id"]:
+                allocator.reserve(r["question_id"], conn)
+            else:
+                r["question_id"] = allocator.next_prefixed(
+                    question_id_prefix(r["source_text_id"], r["question_type"]), conn
+                )
+        conn.executemany(
+            _QUESTION_INSERT_SQL,
+            [[r[col] for col in QUESTION_BANK_COLUMNS] for r in records],
+        )
+        if missing:
+            stats["errors"].append({
+                "chunk": stats["chunks"],
+                "rows": len(chunk) - len(records),
+                "message": f"unknown source_text_id: {', '.join(missing[:5])}"
+                           + (" ..." if len(missing) > 5 else ""),
+            })
+        return {"inserted": len(records), "failed": len(chunk) - len(records)}
+
+    with connection(conn) as conn, import_transaction(conn):
+        for chunk in chunked(questions, chunk_size):
+            write_chunk(conn, chunk, write, stats)
+        allocator.flush(conn)
+
+    stats["elapsed"] = time.perf_counter() - started
+    stats["rows_per_sec"] = stats["inserted"] / stats["elapsed"] if stats["elapsed"] else 0.0
+    return stats
+
+
+def import_question_bank_csv(csv_path, conn=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """Load a QUESTION_BANK sheet export (CSV) into question_bank."""
+    with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
+        return insert_questions(csv.DictReader(f), conn, chunk_size)
+
+
+def questions_query(text_id=None, question_type=None, band=None, genre=None,
+                    difficulty=None, limit=None, offset=0):
+    """(sql, params) for query_questions()."""
+    query = "SELECT q.* FROM question_bank q"
+    where = []
+    params = []
+    if band or genre:
+        query += " JOIN reading_text r ON r.text_id = q.source_text_id"
+        if band:
+            where.append("r.lexile_band = ?")
+            params.append(band)
+        if genre:
+            where.append("r.genre = ?")
+            params.append(genre)
+    if text_id:
+        where.append("q.source_text_id = ?")
+        params.append(text_id)
+    if question_type:
+        types = [question_type] if isinstance(question_type, str) else list(question_type)
+        where.append(f"q.question_type IN ({', '.join('?' * len(types))})")
+        params.extend(types)
+    if difficulty:
+        where.append("q.difficulty = ?")
+        params.append(difficulty)
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    query += " ORDER BY q.question_id"
+    if limit:
+        query += " LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+    return query, params
+
+
+def query_questions(text_id=None, question_type=None, band=None, genre=None,
+                    difficulty=None, limit=None, offset=0, conn=None):
+    """question_bank rows, filtered; band / genre join reading_text.
+
+    question_type may be a single code or a list of codes.
+    """
+    query, params = questions_query(text_id, question_type, band, genre, difficulty, limit, offset)
+    with connection(conn) as conn:
+        return conn.execute(query, params).fetchall()
+
+
+def get_question_counts(conn=None):
+    """{question_type: count} from the question_type index."""
+    with connection(conn) as conn:
+        return dict(conn.execute(
+            "SELECT question_type, COUNT(*) FROM question_bank GROUP BY question_type"
+        ).fetchall())
+
+
+# CROSS JOIN은 SQLite에서 조인 순서를 고정한다: 작은 매트릭스에서 시작해
+# reading_text (lexile_band, genre, length_type) 인덱스로 찾아 들어감
+_ELIGIBLE_JOIN = (
+    "FROM question_eligibility e CROSS JOIN reading_text r "
+    "ON r.lexile_band = e.lexile_band AND r.genre = e.genre AND r.length_type = e.length_type"
+)
+
+
+def get_eligible_types(band, genre, length_type, conn=None):
+    """Question type codes for a band x genre x length_type cell."""
+    with connection(conn) as conn:
+        return [row[0] for row in conn.execute(
+            "SELECT question_type FROM question_eligibility "
+            "WHERE lexile_band = ? AND genre = ? AND length_type = ? ORDER BY question_type",
+            (band, genre, length_type),
+        )]
+
+
+def _eligible_filters(question_types, band, genre, with_body):
+    where, params = [], []
+    if question_types:
+        types = [question_types] if isinstance(question_types, str) else list(question_types)
+        where.append(f"e.question_type IN ({', '.join('?' * len(types))})")
+        params.extend(types)
+    if band:
+        where.append("e.lexile_band = ?")
+        params.append(band)
+    if genre:
+        where.append("e.genre = ?")
+        params.append(genre)
+    if with_body:
+        where.append("r.text_body IS NOT NULL AND r.text_body != ''")
+    return (" WHERE " + " AND ".join(where)) if where else "", params
+
+
+def eligible_texts_query(question_type, band=None, genre=None, with_body=True, limit=None):
+    """(sql, params) for get_eligible_texts()."""
+    where, params = _eligible_filters(question_type, band, genre, with_body)
+    query = f"SELECT r.* {_ELIGIBLE_JOIN}{where} ORDER BY r.text_id"
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    return query, params
+
+
+def get_eligible_texts(question_type, band=None, genre=None, with_body=True, limit=None,
+                       conn=None):
+    """reading_text rows that can support question_type (e.g. "IF-03")."""
+    query, params = eligible_texts_query(question_type, band, genre, with_body, limit)
+    with connection(conn) as conn:
+        return conn.execute(query, params).fetchall()
+
+
+def get_eligibility_counts(band=None, with_body=True, conn=None):
+    """{question_type: number of passages that can support it}."""
+    where, params = _eligible_filters(None, band, None, with_body)
+    with connection(conn) as conn:
+        return dict(conn.execute(
+            f"SELECT e.question_type, COUNT(*) {_ELIGIBLE_JOIN}{where} "
+            "GROUP BY e.question_type ORDER BY e.question_type",
+            params,
+        ).fetchall())
+
 
-    columns = rows[0].keys()
-    with open(output_path, "w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=columns)
-        writer.writeheader()
-        for row in rows:
-            writer.writerow(dict(row))
+def plan_questions(question_types=None, band=None, genre=None, skip_existing=True, conn=None):
+    """Work list for a batch question run as (text_id, question_type) pairs.
 
-    return len(rows)
+    One query over the eligibility matrix; with skip_existing, pairs that
+    already have a question in question_bank are left out.
+    """
+    where, params = _eligible_filters(question_types, band, genre, True)
+    if skip_existing:
+        where += (" AND NOT EXISTS (SELECT 1 FROM question_bank q "
+                  "WHERE q.source_text_id = r.text_id AND q.question_type = e.question_type)")
+    with connection(conn) as conn:
+        return [tuple(row) for row in conn.execute(
+            f"SELECT r.text_id, e.question_type {_ELIGIBLE_JOIN}{where} "
+            "ORDER BY r.text_id, e.question_type",
+            params,
+        )]
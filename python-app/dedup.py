@@ -0,0 +1,380 @@
+"""
+Lexile Reading Text DB - Near-duplicate Detection
+지문 본문을 단어 5-gram shingle로 나누어 MinHash 서명을 만들고, LSH 버킷으로
+후보를 좁혀 완전 중복(정규화 본문 해시 일치)과 유사 중복을 찾는다.
+서명/버킷은 passage_signatures, lsh_buckets 테이블에 저장된다. database의
+insert/upsert 경로가 행을 쓸 때 같은 트랜잭션에서 index_passages()로 바로
+인덱싱하고, 그 이전에 들어온 행은 DuplicateIndex.sync()가 채운다.
+
+Usage:
+    python dedup.py                 # 인덱스 동기화 후 중복 클러스터 출력
+    python dedup.py --threshold 0.9
+"""
+import argparse
+import hashlib
+import random
+import sys
+import zlib
+from array import array
+
+import text_stats
+
+try:
+    import numpy as np
+except ImportError:  # numpy가 없으면 순수 파이썬으로 서명 계산
+    np = None
+
+NUM_PERM = 64
+LSH_BANDS = 16                     # band당 4개 값 -> 유사도 ~0.5부터 후보
+LSH_ROWS = NUM_PERM // LSH_BANDS
+SHINGLE_SIZE = 5
+SIMILARITY_THRESHOLD = 0.8
+
+_MASK64 = (1 << 64) - 1
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# 서명이 DB에 저장되므로 해시 계수는 고정 시드로 생성
+_rng = random.Random(20260203)
+_PERM_A = [_rng.randrange(1, _PRIME) for _ in range(NUM_PERM)]
+_PERM_B = [_rng.randrange(0, _PRIME) for _ in range(NUM_PERM)]
+_EMPTY_SIGNATURE = (_MAX_HASH,) * NUM_PERM
+
+
+def shingles(text_body, size=SHINGLE_SIZE):
+    """crc32 hashes of the word n-grams of the normalized passage."""
+    words = text_stats.normalize_text(text_body).split()
+    if not words:
+        return set()
+    if len(words) <= size:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))}
+    return {
+        zlib.crc32(" ".join(words[i:i + size]).encode("utf-8"))
+        for i in range(len(words) - size + 1)
+    }
+
+
+def minhash(text_body):
+    """MinHash signature (tuple of NUM_PERM uint32) of a passage.
+
+    h(x) = ((a*x + b) mod 2^64) mod (2^61-1), truncated to 32 bits; the
+    numpy and pure-python paths produce identical values.
+    """
+    hashes = shingles(text_body)
+    if not hashes:
+        return _EMPTY_SIGNATURE
+
+    if np is not None:
+        values = np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+        a = np.array(_PERM_A, dtype=np.uint64)[:, None]
+        b = np.array(_PERM_B, dtype=np.uint64)[:, None]
+        with np.errstate(over="ignore"):
+            permuted = (a * values + b) % np.uint64(_PRIME) & np.uint64(_MAX_HASH)
+        return tuple(int(v) for v in permuted.min(axis=1))
+
+    return tuple(
+        min((((a * x + b) & _MASK64) % _PRIME) & _MAX_HASH for x in hashes)
+        for a, b in zip(_PERM_A, _PERM_B)
+    )
+
+
+def similarity(sig1, sig2):
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(x == y for x, y in zip(sig1, sig2)) / NUM_PERM
+
+
+def band_keys(signature):
+    """One signed 64-bit bucket key per LSH band (fits SQLite INTEGER)."""
+    keys = []
+    for band in range(LSH_BANDS):
+        chunk = array("I", signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]).tobytes()
+        digest = hashlib.blake2b(chunk, digest_size=8).digest()
+        keys.append((band, int.from_bytes(digest, "big", signed=True)))
+    return keys
+
+
+def _pack(signature):
+    return array("I", signature).tobytes()
+
+
+def _unpack(blob):
+    return tuple(array("I", blob))
+
+
+def store_signatures(conn, entries):
+    """Write (text_id, content_hash, signature) entries; no commit."""
+    entries = list(entries)
+    conn.executemany(
+        "INSERT OR REPLACE INTO passage_signatures (text_id, content_hash, signature) "
+        "VALUES (?, ?, ?)",
+        [(text_id, chash, _pack(signature)) for text_id, chash, signature in entries],
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO lsh_buckets (band, bucket, text_id) VALUES (?, ?, ?)",
+        [(band, key, text_id) for text_id, _, signature in entries
+         for band, key in band_keys(signature)],
+    )
+    return len(entries)
+
+
+def index_passages(conn, passages):
+    """Index (text_id, text_body) pairs as they are written; empty bodies are skipped.
+
+    Called by the database insert paths inside their transaction, so a
+    rolled-back chunk takes its signatures with it.
+    """
+    return store_signatures(conn, (
+        (text_id, text_stats.content_hash(body), minhash(body))
+        for text_id, body in passages if body
+    ))
+
+
+class DuplicateIndex:
+    """MinHash/LSH index over reading_text, persisted in SQLite.
+
+    The database insert paths index rows as they write them
+    (index_passages); the first query()/check()/clusters() call runs
+    sync() once to catch up on rows stored before that, e.g. in a DB
+    created before the index existed.
+
+    check(row) looks a passage up against the stored index and against
+    rows checked earlier in the same run (pending), so two identical files
+    imported together are caught too. After the rows are inserted,
+    flush() makes sure the pending ones that actually made it into
+    reading_text are indexed.
+
+    Nothing here commits: the caller's transaction owns the writes.
+    """
+
+    def __init__(self, conn, threshold=SIMILARITY_THRESHOLD):
+        self.conn = conn
+        self.threshold = threshold
+        self._pending = []            # (row, content_hash, signature)
+        self._pending_buckets = {}    # (band, key) -> [pending index]
+        self._pending_hashes = {}     # content_hash -> pending index
+        self._synced = False
+
+    def sync(self):
+        """Index reading_text rows that have no signature yet; returns the count."""
+        self._synced = True
+        rows = self.conn.execute("""
+            SELECT r.text_id, r.text_body FROM reading_text r
+            LEFT JOIN passage_signatures s ON s.text_id = r.text_id
+            WHERE s.text_id IS NULL AND r.text_body IS NOT NULL AND r.text_body != ''
+        """).fetchall()
+        return index_passages(self.conn, rows)
+
+    def query(self, text_body, content_hash=None, signature=None):
+        """Matches for a passage: list of (text_id, similarity, exact), best first.
+
+        Pending rows without a text_id yet are reported by their topic.
+        """
+        if not self._synced:
+            self.sync()
+        content_hash = content_hash or text_stats.content_hash(text_body)
+        signature = signature or minhash(text_body)
+        keys = band_keys(signature)
+        matches = {}
+
+        for text_id, chash, blob in self.conn.execute(
+            "SELECT s.text_id, s.content_hash, s.signature FROM passage_signatures s "
+            "WHERE s.content_hash = ? OR s.text_id IN (SELECT text_id FROM lsh_buckets "
+            f"WHERE {' OR '.join(['(band = ? AND bucket = ?)'] * len(keys))})",
+            [content_hash] + [v for key in keys for v in key],
+        ):
+            exact = chash == content_hash
+            score = 1.0 if exact else similarity(signature, _unpack(blob))
+            if score >= self.threshold:
+                matches[text_id] = (text_id, score, exact)
+
+        candidates = {i for key in keys for i in self._pending_buckets.get(key, ())}
+        if content_hash in self._pending_hashes:
+            candidates.add(self._pending_hashes[content_hash])
+        for i in candidates:
+            row, chash, sig = self._pending[i]
+            label = row.get("text_id") or f"(pending) {row.get('topic') or ''}".strip()
+            exact = chash == content_hash
+            score = 1.0 if exact else similarity(signature, sig)
+            if score >= self.threshold:
+                matches.setdefault(label, (label, score, exact))
+
+        return sorted(matches.values(), key=lambda m: (-m[1], m[0]))
+
+    def check(self, row):
+        """Look up row["text_body"]; register it as pending if it is unique."""
+        text_body = row.get("text_body")
+        if not text_body:
+            return []
+        content_hash = text_stats.content_hash(text_body)
+        signature = minhash(text_body)
+        matches = self.query(text_body, content_hash, signature)
+        if not matches:
+            i = len(self._pending)
+            self._pending.append((row, content_hash, signature))
+            self._pending_hashes[content_hash] = i
+            for key in band_keys(signature):
+                self._pending_buckets.setdefault(key, []).append(i)
+        return matches
+
+    def flush(self):
+        """Index pending rows that were inserted but have no signature yet
+        (rolled-back chunks are skipped); clears the pending set."""
+        missing = []
+        for row, content_hash, signature in self._pending:
+            text_id = row.get("text_id")
+            if text_id and self.conn.execute(
+                "SELECT 1 FROM reading_text r WHERE r.text_id = ? AND NOT EXISTS "
+                "(SELECT 1 FROM passage_signatures s WHERE s.text_id = r.text_id)",
+                (text_id,),
+            ).fetchone():
+                missing.append((text_id, content_hash, signature))
+        self._pending, self._pending_buckets, self._pending_hashes = [], {}, {}
+        return store_signatures(self.conn, missing)
+
+    def clusters(self):
+        """Groups of duplicate passages among indexed rows.
+
+        Candidate pairs come from shared LSH buckets (no all-pairs
+        comparison) and are verified against the threshold. Returns a list
+        of {"text_ids", "exact"} sorted by size, largest first.
+        """
+        if not self._synced:
+            self.sync()
+        signatures = {}
+        hashes = {}
+        for text_id, chash, blob in self.conn.execute(
+            "SELECT text_id, content_hash, signature FROM passage_signatures"
+        ):
+            signatures[text_id] = _unpack(blob)
+            hashes[text_id] = chash
+
+        parent = {text_id: text_id for text_id in signatures}
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        def union(x, y):
+            rx, ry = find(x), find(y)
+            if rx != ry:
+                parent[max(rx, ry)] = min(rx, ry)
+
+        by_hash = {}
+        for text_id, chash in hashes.items():
+            by_hash.setdefault(chash, []).append(text_id)
+        for ids in by_hash.values():
+            for other in ids[1:]:
+                union(ids[0], other)
+
+        checked = set()
+        for (members,) in self.conn.execute(
+            "SELECT group_concat(text_id, char(31)) FROM lsh_buckets "
+            "GROUP BY band, bucket HAVING COUNT(*) > 1"
+        ):
+            ids = sorted(members.split("\x1f"))
+            for i, a in enumerate(ids):
+                for b in ids[i + 1:]:
+                    if (a, b) in checked or find(a) == find(b):
+                        continue
+                    checked.add((a, b))
+                    if similarity(signatures[a], signatures[b]) >= self.threshold:
+                        union(a, b)
+
+        groups = {}
+        for text_id in parent:
+            groups.setdefault(find(text_id), []).append(text_id)
+        result = [
+            {
+                "text_ids": sorted(ids),
+                "exact": len({hashes[t] for t in ids}) == 1,
+            }
+            for ids in groups.values() if len(ids) > 1
+        ]
+        return sorted(result, key=lambda c: (-len(c["text_ids"]), c["text_ids"][0]))
+
+
+# 같은 지문인지 비교할 때 제외하는 필드 (database.UPSERT_IGNORE와 동일)
+_IDENTITY_FIELDS = {"text_id", "content_hash", "created_date"}
+
+
+def _same_values(row, stored):
+    """Every column the row carries equals the stored value ('' counts as NULL)."""
+    columns = set(stored.keys()) - _IDENTITY_FIELDS
+    for col, value in row.items():
+        if col not in columns:
+            continue
+        value = None if value == "" else value
+        if (value is None) != (stored[col] is None):
+            return False
+        if value is not None and str(value) != str(stored[col]):
+            return False
+    return True
+
+
+def is_reimport(row, matches, conn):
+    """True when row is a stored passage coming back: an exact match that
+    carries the same text_id, or whose fields all equal the stored row."""
+    exact = [text_id for text_id, _, is_exact in matches if is_exact]
+    if row.get("text_id") and row["text_id"] in exact:
+        return True
+    for text_id in exact:
+        stored = conn.execute("SELECT * FROM reading_text WHERE text_id = ?", (text_id,)).fetchone()
+        if stored is not None and _same_values(row, stored):
+            return True
+    return False
+
+
+def filter_duplicates(rows, index, mode="reject", on_duplicate=None):
+    """Pipeline stage: drop ("reject") or annotate ("flag") duplicate rows.
+
+    Exact copies are handled like near-duplicates unless the row is a
+    re-import of the stored passage (see is_reimport), which falls through
+    to the upsert. Flagged rows keep their data and get "Duplicate of <id>"
+    appended to notes; flagged exact copies also get "duplicate_of", so
+    the upsert inserts them as new rows instead of matching the original
+    by content_hash. on_duplicate: callback(row, matches).
+    """
+    if mode not in ("reject", "flag"):
+        raise ValueError(f"Unknown duplicate mode: {mode}")
+    for row in rows:
+        matches = index.check(row)
+        if matches and not is_reimport(row, matches, index.conn):
+            if on_duplicate:
+                on_duplicate(row, matches)
+            if mode == "reject":
+                continue
+            best, score, exact = matches[0]
+            note = f"Duplicate of {best} ({score:.2f})"
+            row["notes"] = f"{row['notes']} | {note}" if row.get("notes") else note
+            if exact:
+                row["duplicate_of"] = best
+        yield row
+
+
+def main():
+    import database as db
+
+    parser = argparse.ArgumentParser(description="Report duplicate passages in reading_text")
+    parser.add_argument("--threshold", type=float, default=SIMILARITY_THRESHOLD,
+                        help=f"minimum estimated Jaccard similarity (default: {SIMILARITY_THRESHOLD})")
+    args = parser.parse_args()
+
+    sys.stdout.reconfigure(encoding="utf-8")
+    db.init_db()
+    with db.connection() as conn:
+        index = DuplicateIndex(conn, args.threshold)
+        print(f"Indexed {index.sync()} new passages")
+        conn.commit()
+        clusters = index.clusters()
+
+    exact = sum(1 for c in clusters if c["exact"])
+    print(f"{len(clusters)} duplicate clusters ({exact} exact, {len(clusters) - exact} near)")
+    for cluster in clusters:
+        kind = "EXACT" if cluster["exact"] else "NEAR "
+        print(f"  [{kind}] {', '.join(cluster['text_ids'])}")
+
+
+if __name__ == "__main__":
+    main()
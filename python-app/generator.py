@@ -1,8 +1,31 @@
 """
 Lexile Reading Text DB - AI Text Generator Module (Claude API)
 """
+import hashlib
 import json
 import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+MODEL = "claude-sonnet-4-20250514"
+MAX_TOKENS = 1024
+
+# 배치 생성 기본값
+BATCH_WORKERS = 4
+REQUESTS_PER_MINUTE = 50
+TOKENS_PER_MINUTE = 40000
+MAX_RETRIES = 4
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+RETRY_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+# 응답 캐시 (프롬프트 + 모델 해시 -> 생성 결과)
+CACHE_PATH = os.path.join(os.path.dirname(__file__), "generation_cache.db")
+CACHE_TTL = 30 * 24 * 3600  # seconds
+CACHE_MAX_ENTRIES = 5000
 
 LENGTH_TARGETS = {
     "Micro": {"words": 50, "range": "40-60"},
@@ -74,8 +97,12 @@ OUTPUT FORMAT (JSON only, no markdown code blocks):
 {{"text_body": "The full reading passage text here...", "sentence_count": <number>, "word_count": <number>, "vocabulary_notes": "Brief note on key vocabulary used", "lexile_estimate": <estimated Lexile score as number>}}"""
 
 
-def generate_text(genre, length_type, lexile_band, topic, age_group, vocabulary_band=None, api_key=None):
-    """Generate a reading text using Claude API."""
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_key=None):
+    """Return a shared anthropic client for the API key (created once)."""
     try:
         import anthropic
     except ImportError:
@@ -87,15 +114,27 @@ def generate_text(genre, length_type, lexile_band, topic, age_group, vocabulary_
             "API 키가 필요합니다. ANTHROPIC_API_KEY 환경변수를 설정하거나 api_key 파라미터를 전달하세요."
         )
 
-    if not topic:
-        topic = get_default_topic(genre, age_group)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = anthropic.Anthropic(api_key=key)
+        return _clients[key]
 
-    prompt = build_prompt(genre, length_type, lexile_band, topic, age_group, vocabulary_band)
 
-    client = anthropic.Anthropic(api_key=key)
+def slot_prompt(slot):
+    """Build the generation prompt for a slot dict (default topic filled in)."""
+    age_group = slot.get("age_group") or "Middle School"
+    topic = slot.get("topic") or get_default_topic(slot["genre"], age_group)
+    return build_prompt(
+        slot["genre"], slot["length_type"], slot["lexile_band"],
+        topic, age_group, slot.get("vocabulary_band"),
+    )
+
+
+def call_model(client, prompt, model=MODEL, max_tokens=MAX_TOKENS):
+    """Send one prompt and parse the JSON reply."""
     message = client.messages.create(
-        model="claude-sonnet-4-20250514",
-        max_tokens=1024,
+        model=model,
+        max_tokens=max_tokens,
         messages=[{"role": "user", "content": prompt}],
     )
 
@@ -104,32 +143,326 @@ def generate_text(genre, length_type, lexile_band, topic, age_group, vocabulary_
     return json.loads(cleaned)
 
 
-def batch_generate(slots, api_key=None, on_progress=None):
-    """Generate texts for multiple slots.
-    slots: list of dicts with genre, length_type, lexile_band, topic, age_group, vocabulary_band
-    on_progress: callback(index, total, result_or_error)
-    Returns list of (slot, result_or_none, error_or_none)
+# ==================== Response cache ====================
+
+class ResponseCache:
+    """On-disk cache of model replies keyed by sha256(model + prompt).
+
+    Entries expire after `ttl` seconds; beyond `max_entries` the least
+    recently used are evicted. Thread-safe.
     """
-    results = []
-    total = len(slots)
 
-    for i, slot in enumerate(slots):
-        try:
-            result = generate_text(
-                genre=slot["genre"],
-                length_type=slot["length_type"],
-                lexile_band=slot["lexile_band"],
-                topic=slot.get("topic"),
-                age_group=slot.get("age_group", "Middle School"),
-                vocabulary_band=slot.get("vocabulary_band"),
-                api_key=api_key,
+    EVICT_EVERY = 100
+
+    def __init__(self, path=None, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES):
+        self.path = path or CACHE_PATH
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS response_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_response_cache_last_used ON response_cache (last_used)"
+        )
+        self._conn.commit()
+        self.evict()
+
+    @staticmethod
+    def key(prompt, model=MODEL):
+        return hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def get(self, prompt, model=MODEL):
+        key = self.key(prompt, model)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row and now - row[1] <= self.ttl:
+                self._conn.execute(
+                    "UPDATE response_cache SET last_used = ? WHERE key = ?", (now, key)
+                )
+                self._conn.commit()
+                self.hits += 1
+                return json.loads(row[0])
+            if row:
+                self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                self._conn.commit()
+            self.misses += 1
+            return None
+
+    def put(self, prompt, result, model=MODEL):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?, ?, ?)",
+                (self.key(prompt, model), model, json.dumps(result, ensure_ascii=False), now, now),
             )
-            results.append((slot, result, None))
-            if on_progress:
-                on_progress(i + 1, total, result)
+            self._conn.commit()
+            self._puts += 1
+            due = self._puts % self.EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    def evict(self):
+        """Drop expired entries and trim to max_entries (LRU). Returns rows removed."""
+        with self._lock:
+            removed = self._conn.execute(
+                "DELETE FROM response_cache WHERE created_at < ?", (time.time() - self.ttl,)
+            ).rowcount
+            removed += self._conn.execute(
+                """DELETE FROM response_cache WHERE key IN (
+                       SELECT key FROM response_cache
+                       ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                   )""",
+                (self.max_entries,),
+            ).rowcount
+            self._conn.commit()
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache")
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
+
+
+def generate_text(genre, length_type, lexile_band, topic, age_group, vocabulary_band=None,
+                  api_key=None, client=None, use_cache=False):
+    """Generate a reading text using Claude API.
+
+    Every call asks the model, so regenerating the same slot gives a new
+    text. use_cache=True serves and stores replies through the on-disk
+    response cache, as the batch paths do.
+    """
+    prompt = slot_prompt({
+        "genre": genre,
+        "length_type": length_type,
+        "lexile_band": lexile_band,
+        "topic": topic,
+        "age_group": age_group,
+        "vocabulary_band": vocabulary_band,
+    })
+
+    cache = get_cache() if use_cache else None
+    if cache:
+        cached = cache.get(prompt)
+        if cached is not None:
+            return cached
+
+    result = call_model(client or get_client(api_key), prompt)
+    if cache:
+        cache.put(prompt, result)
+    return result
+
+
+# ==================== Batch generation ====================
+
+class RateLimiter:
+    """Token-bucket limiter for requests/minute and tokens/minute.
+
+    Both buckets start full and refill continuously; acquire() blocks
+    until one request and `tokens` tokens are available. Thread-safe.
+    """
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.rpm = requests_per_minute
+        self.tpm = tokens_per_minute
+        self.clock = clock
+        self.sleep = sleep
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60.0)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60.0)
+
+    def acquire(self, tokens=0):
+        tokens = min(tokens, self.tpm)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+                wait = max(
+                    (1 - self._requests) * 60.0 / self.rpm,
+                    (tokens - self._tokens) * 60.0 / self.tpm,
+                )
+            self.sleep(max(wait, 0.01))
+
+
+def estimate_tokens(prompt, max_tokens=MAX_TOKENS):
+    # 대략 4글자 = 1토큰, 응답 최대 토큰까지 예약
+    return len(prompt) // 4 + max_tokens
+
+
+def is_retryable(error):
+    """429 / 5xx / connection errors are worth retrying."""
+    if getattr(error, "status_code", None) in RETRY_STATUS_CODES:
+        return True
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+def retry_delay(error, attempt):
+    """Full-jitter exponential backoff, honouring a retry-after header."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return min(float(retry_after), RETRY_MAX_DELAY)
+        except ValueError:
+            pass
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+
+def generate_with_retry(client, prompt, limiter=None, max_retries=MAX_RETRIES, sleep=time.sleep):
+    attempt = 0
+    while True:
+        if limiter:
+            limiter.acquire(estimate_tokens(prompt))
+        try:
+            return call_model(client, prompt)
         except Exception as e:
-            results.append((slot, None, str(e)))
-            if on_progress:
-                on_progress(i + 1, total, str(e))
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            sleep(retry_delay(e, attempt))
+            attempt += 1
+
+
+def iter_generate(slots, api_key=None, client=None, max_workers=BATCH_WORKERS,
+                  requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE,
+                  max_retries=MAX_RETRIES, use_cache=True):
+    """Generate slots concurrently, yielding (index, slot, result, error)
+    in completion order. Each worker builds its slot's prompt, so a bad
+    slot or a missing client only fails that slot. Cached slots return
+    without touching the rate limiter or the API. Closing the iterator
+    early cancels the slots that have not started yet.
+    """
+    cache = get_cache() if use_cache else None
+    limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+    client_lock = threading.Lock()
+
+    def shared_client():
+        nonlocal client
+        with client_lock:
+            if client is None:
+                client = get_client(api_key)
+            return client
+
+    def run(slot):
+        prompt = slot_prompt(slot)
+        cached = cache.get(prompt) if cache else None
+        if cached is not None:
+            return cached
+        result = generate_with_retry(shared_client(), prompt, limiter, max_retries)
+        if cache:
+            cache.put(prompt, result)
+        return result
+
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {pool.submit(run, slot): i for i, slot in enumerate(slots)}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                yield i, slots[i], future.result(), None
+            except Exception as e:
+                yield i, slots[i], None, str(e)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def batch_generate(slots, api_key=None, on_progress=None, client=None, max_workers=BATCH_WORKERS,
+                   requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE,
+                   max_retries=MAX_RETRIES, use_cache=True):
+    """Generate texts for multiple slots concurrently.
+    slots: list of dicts with genre, length_type, lexile_band, topic, age_group, vocabulary_band
+    on_progress: callback(index, total, result_or_error), called from the
+        calling thread as each slot finishes (index = 1-based slot position)
+    client: any object with messages.create() (e.g. a fake client in tests);
+        defaults to the shared anthropic client
+    use_cache: serve and store replies via the response cache; cached slots
+        return immediately without touching the rate limiter or the API
+    Returns list of (slot, result_or_none, error_or_none) in slot order
+    """
+    total = len(slots)
+    results = [None] * total
+
+    completed = iter_generate(
+        slots, api_key, client, max_workers, requests_per_minute,
+        tokens_per_minute, max_retries, use_cache,
+    )
+    for i, slot, result, error in completed:
+        results[i] = (slot, result, error)
+        if on_progress:
+            on_progress(i + 1, total, result if error is None else error)
 
     return results
+
+
+def build_text_record(slot, result):
+    """Turn a slot + generation result into a reading_text row dict."""
+    age_group = slot.get("age_group") or "Middle School"
+    lo, hi = slot["lexile_band"].split("-")
+    score = result.get("lexile_estimate") or (int(lo) + int(hi)) // 2
+    word_count = result["word_count"]
+    sentence_count = result["sentence_count"]
+
+    return {
+        "lexile_band": slot["lexile_band"],
+        "lexile_score": score,
+        "age_group": age_group,
+        "genre": slot["genre"],
+        "topic": slot.get("topic") or get_default_topic(slot["genre"], age_group),
+        "word_count": word_count,
+        "length_type": slot["length_type"],
+        "text_body": result["text_body"],
+        "sentence_count": sentence_count,
+        "avg_sentence_length": round(word_count / max(sentence_count, 1), 1),
+        "vocabulary_band": slot.get("vocabulary_band"),
+        "intended_use": slot.get("intended_use", "수업"),
+    }
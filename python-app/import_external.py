@@ -3,13 +3,24 @@ External CSV Importer
 reading_2000.csv, reading_3000.csv, reading_5000.csv를
 READING_TEXT_MASTER 스키마로 변환하여 DB에 임포트
 """
+import argparse
 import csv
 import os
 import re
 import sys
+import time
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import ahocorasick
+except ImportError:  # pyahocorasick이 없으면 str.find() 기반으로 동작
+    ahocorasick = None
 
 sys.path.insert(0, os.path.dirname(__file__))
 import database as db
+import text_stats
 
 # ==================== Genre 자동 분류 ====================
 
@@ -45,49 +56,170 @@ GENRE_KEYWORDS = {
 }
 
 
+# 제목에 포함되면 가산점을 주는 단어 (장르, 단어 목록, 가산점)
+TITLE_HINTS = [
+    ("Argumentative", ["should", "banned", "worth", "deserve", "fair"], 3),
+    ("Procedural", ["how to", "steps", "guide"], 3),
+    ("Expository", ["what is", "how does", "how do", "how can", "why do", "why is", "why are"], 2),
+]
+
+NARRATIVE_PATTERN = re.compile(r'[A-Z][a-z]+\s(said|asked|smiled|looked|felt|walked)')
+
+_BATCH_SEP = "\x00"
+
+
+def _lower_head(text, size):
+    # ASCII면 앞부분만 소문자화 (전체 lower() 후 자르는 것과 결과 동일)
+    head = text[:size + 1]
+    if head.isascii():
+        return head[:size].lower()
+    return text.lower()[:size]
+
+
+def _build_automaton(words):
+    """Aho-Corasick automaton over `words` (None if pyahocorasick is missing)."""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for word in words:
+        automaton.add_word(word, word)
+    automaton.make_automaton()
+    return automaton
+
+
+def _find_presence(texts, words, automaton=None):
+    """For each word, the set of indexes of the texts that contain it.
+
+    With an Aho-Corasick automaton every text is scanned once for all
+    words (overlapping matches included). Without it the batch is joined
+    into one buffer and each word is located with str.find(), jumping to
+    the next text after a hit.
+    """
+    presence = {word: set() for word in words}
+
+    if automaton is not None:
+        for i, text in enumerate(texts):
+            for _, word in automaton.iter(text):
+                presence[word].add(i)
+        return presence
+
+    buf = _BATCH_SEP.join(texts) + _BATCH_SEP
+    starts = []
+    pos = 0
+    for text in texts:
+        starts.append(pos)
+        pos += len(text) + 1
+    starts.append(pos)
+
+    for word in words:
+        pos = buf.find(word)
+        while pos != -1:
+            i = bisect_right(starts, pos) - 1
+            presence[word].add(i)
+            pos = buf.find(word, starts[i + 1])
+    return presence
+
+
+class GenreMatcher:
+    """Precompiled batch classifier behind classify_genre().
+
+    Built once from GENRE_KEYWORDS / TITLE_HINTS: keyword -> genres maps
+    (shared keywords such as "process" merged) compiled into Aho-Corasick
+    automata, so classify_batch() scores every genre with a single scan
+    per passage. Without pyahocorasick it falls back to one str.find()
+    sweep per keyword over the batch. Results match the original
+    per-passage loop exactly (bench_classify.py checks this).
+    """
+
+    def __init__(self, genre_keywords=None, title_hints=None):
+        genre_keywords = genre_keywords or GENRE_KEYWORDS
+        self.title_hints = title_hints or TITLE_HINTS
+        self.genres = list(genre_keywords)
+
+        self.keyword_genres = {}
+        for genre, keywords in genre_keywords.items():
+            for kw in keywords:
+                self.keyword_genres.setdefault(kw, []).append(genre)
+
+        self.hint_words = {w for _, words, _ in self.title_hints for w in words}
+
+        self.keyword_automaton = _build_automaton(self.keyword_genres)
+        self.hint_automaton = _build_automaton(self.hint_words)
+
+    def score_batch(self, items):
+        """items: list of (title, passage) -> list of genre score dicts"""
+        titles = [title.lower() for title, _ in items]
+        combined = [
+            t + " " + _lower_head(passage, 500)  # 앞부분만 분석
+            for t, (_, passage) in zip(titles, items)
+        ]
+        scores = [dict.fromkeys(self.genres, 0) for _ in items]
+
+        for kw, hits in _find_presence(
+            combined, self.keyword_genres, self.keyword_automaton
+        ).items():
+            genres = self.keyword_genres[kw]
+            for i in hits:
+                for genre in genres:
+                    scores[i][genre] += 1
+
+        # Title-based hints
+        title_hits = _find_presence(titles, self.hint_words, self.hint_automaton)
+        for genre, words, bonus in self.title_hints:
+            hinted = set()
+            for w in words:
+                hinted.update(title_hits[w])
+            for i in hinted:
+                scores[i][genre] += bonus
+
+        # Narrative detection: dialogue or character names
+        for i, (_, passage) in enumerate(items):
+            if NARRATIVE_PATTERN.search(passage[:300]):
+                scores[i]["Narrative"] += 3
+            if '"' in passage[:200]:
+                scores[i]["Narrative"] += 1
+        return scores
+
+    def classify_batch(self, items):
+        """items: iterable of (title, passage) -> list of genres"""
+        results = []
+        for scores in self.score_batch(list(items)):
+            best = max(scores, key=scores.get)
+            results.append(best if scores[best] > 0 else "Expository")  # default
+        return results
+
+    def classify(self, title, passage):
+        return self.classify_batch([(title, passage)])[0]
+
+
+_matcher = None
+
+
+def get_genre_matcher():
+    global _matcher
+    if _matcher is None:
+        _matcher = GenreMatcher()
+    return _matcher
+
+
 def classify_genre(title, passage):
-    title_lower = title.lower()
-    passage_lower = passage.lower()[:500]  # 앞부분만 분석
-    combined = title_lower + " " + passage_lower
-
-    scores = {}
-    for genre, keywords in GENRE_KEYWORDS.items():
-        score = sum(1 for kw in keywords if kw in combined)
-        scores[genre] = score
-
-    # Title-based hints
-    if any(w in title_lower for w in ["should", "banned", "worth", "deserve", "fair"]):
-        scores["Argumentative"] += 3
-    if any(w in title_lower for w in ["how to", "steps", "guide"]):
-        scores["Procedural"] += 3
-    if any(w in title_lower for w in ["what is", "how does", "how do", "how can", "why do", "why is", "why are"]):
-        scores["Expository"] += 2
-
-    # Narrative detection: dialogue or character names
-    if re.search(r'[A-Z][a-z]+\s(said|asked|smiled|looked|felt|walked)', passage[:300]):
-        scores["Narrative"] += 3
-    if '""' in passage[:200] or '"' in passage[:200]:
-        scores["Narrative"] += 1
-
-    best = max(scores, key=scores.get)
-    if scores[best] == 0:
-        return "Expository"  # default
-    return best
+    return get_genre_matcher().classify(title, passage)
+
+
+def classify_genres(items):
+    """(title, passage) 목록을 한 번에 분류"""
+    return get_genre_matcher().classify_batch(items)
 
 
 # ==================== Lexile 추정 ====================
 
-def estimate_lexile(passage, file_level):
+def estimate_lexile(passage, file_level, stats=None):
     """파일 레벨과 텍스트 특성으로 Lexile 추정"""
-    words = passage.strip().split()
-    word_count = len(words)
-    sentences = [s.strip() for s in re.split(r'[.!?]+', passage) if s.strip()]
-    sent_count = max(len(sentences), 1)
-    avg_sent_len = word_count / sent_count
+    stats = stats or text_stats.analyze(passage)
+    return lexile_from_stats(stats["avg_sentence_length"], stats["avg_word_length"], file_level)
 
-    # 평균 단어 길이
-    avg_word_len = sum(len(w) for w in words) / max(len(words), 1)
 
+def lexile_from_stats(avg_sent_len, avg_word_len, file_level):
     if file_level == 2000:
         base = 350
         score = base + (avg_sent_len - 10) * 8 + (avg_word_len - 4) * 15
@@ -164,79 +296,168 @@ def get_vocab_band(lexile_score):
 
 
 def get_length_type(word_count):
-    if word_count <= 60:
-        return "Micro"
-    elif word_count <= 120:
-        return "Short"
-    elif word_count <= 230:
-        return "Medium"
-    elif word_count <= 420:
-        return "Long"
-    else:
-        return "Extra Long"
+    return db.get_length_type(word_count)
 
 
 # ==================== 메인 변환 ====================
 
-def convert_file(csv_path, file_level, source_label):
-    """외부 CSV를 DB 스키마로 변환하여 임포트"""
-    rows_imported = 0
-    conn = db.get_connection()
+def convert_row(row, file_level, source_label, stats=None, genre=None):
+    """외부 CSV 한 행을 DB 스키마 dict로 변환 (본문이 없으면 None)
+    stats / genre: 미리 계산한 text_stats 결과와 장르 (없으면 여기서 계산)"""
+    topic_num = row.get("topic", "")
+    title = row.get("title", "")
+    passage = row.get("passage", "")
+
+    if not passage.strip():
+        return None
+
+    stats = stats or text_stats.analyze(passage)
+
+    # 자동 분류
+    genre = genre or classify_genre(title, passage)
+    lexile_score = estimate_lexile(passage, file_level, stats)
+    band = get_band(lexile_score)
+
+    # 텍스트 통계
+    wc, sc, avg = text_stats.db_stats(stats)
+    length_type = get_length_type(wc)
+
+    # intended_use 결정
+    if wc <= 60:
+        intended_use = "워밍업"
+    elif wc <= 230:
+        intended_use = "수업"
+    else:
+        intended_use = "다독"
+
+    return {
+        "lexile_band": band,
+        "lexile_score": lexile_score,
+        "age_group": get_age_group(band),
+        "grade_hint": get_grade_hint(band),
+        "genre": genre,
+        "topic": title,
+        "word_count": wc,
+        "length_type": length_type,
+        "text_body": passage,
+        "sentence_count": sc,
+        "avg_sentence_length": avg,
+        "vocabulary_band": get_vocab_band(lexile_score),
+        "intended_use": intended_use,
+        "created_date": "2026-02-03",
+        "notes": f"Source: {source_label} (Topic {topic_num})",
+    }
+
+
+def convert_rows(rows, file_level, source_label):
+    """여러 행을 변환: 지문 통계와 장르 분류는 한 번에 계산 (본문 없는 행은 제외)"""
+    rows = [r for r in rows if r.get("passage", "").strip()]
+    columns = text_stats.analyze_batch([r["passage"] for r in rows])
+    genres = classify_genres((r.get("title", ""), r["passage"]) for r in rows)
+    return [
+        convert_row(r, file_level, source_label, text_stats.row(columns, i), genres[i])
+        for i, r in enumerate(rows)
+    ]
+
+
+def read_external_rows(csv_path, file_level, source_label, chunk_size=db.IMPORT_CHUNK_SIZE):
+    with open(csv_path, "r", encoding="utf-8-sig") as f:
+        for chunk in db.chunked(csv.DictReader(f), chunk_size):
+            yield from convert_rows(chunk, file_level, source_label)
+
+
+def convert_file(csv_path, file_level, source_label, chunk_size=db.IMPORT_CHUNK_SIZE,
+                 duplicates=None):
+    """외부 CSV를 DB 스키마로 변환하여 단일 트랜잭션으로 일괄 임포트
+
+    duplicates: None | "reject" | "flag" (MinHash 중복 검사, dedup 참고)
+    """
+    rows = read_external_rows(csv_path, file_level, source_label, chunk_size)
+    if duplicates is None:
+        stats = db.upsert_texts(rows, chunk_size=chunk_size)
+    else:
+        stats = db.upsert_checked(rows, duplicates, chunk_size=chunk_size)
+    print(f"  {stats['inserted']} inserted, {stats['updated']} updated, "
+          f"{stats['skipped']} unchanged in {stats['elapsed']:.2f}s "
+          f"({stats['rows_per_sec']:.0f} rows/s, {stats['chunks']} chunks)")
+    if duplicates is not None:
+        print(f"  {stats['duplicates']} duplicates {'rejected' if duplicates == 'reject' else 'flagged'}")
+    for err in stats["errors"]:
+        print(f"  [FAILED] chunk {err['chunk']} row {err.get('row', '-')}: {err['message']}")
+    return stats["inserted"]
+
+
+# ==================== 병렬 임포트 ====================
+
+IMPORT_WORKERS = os.cpu_count() or 1
+
+
+def _enrich_chunk(args):
+    """Worker: CPU 작업(장르 분류, Lexile 추정, 통계)만 수행하고 행을 돌려준다."""
+    rows, file_level, source_label = args
+    return convert_rows(rows, file_level, source_label)
 
+
+def _enriched_rows(pool, csv_path, file_level, source_label, chunk_size, max_pending):
+    """Feed raw CSV chunks to the pool and yield enriched rows in file order.
+
+    At most `max_pending` chunks are in flight, so memory stays bounded
+    and text_ids are assigned in the same order as a sequential import.
+    """
+    pending = deque()
     with open(csv_path, "r", encoding="utf-8-sig") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            topic_num = row.get("topic", "")
-            title = row.get("title", "")
-            passage = row.get("passage", "")
-
-            if not passage.strip():
-                continue
-
-            # 자동 분류
-            genre = classify_genre(title, passage)
-            lexile_score = estimate_lexile(passage, file_level)
-            band = get_band(lexile_score)
-
-            # 텍스트 통계
-            wc, sc, avg = db.calculate_text_stats(passage)
-            length_type = get_length_type(wc)
-
-            # intended_use 결정
-            if wc <= 60:
-                intended_use = "워밍업"
-            elif wc <= 230:
-                intended_use = "수업"
+        for chunk in db.chunked(csv.DictReader(f), chunk_size):
+            pending.append(pool.submit(_enrich_chunk, (chunk, file_level, source_label)))
+            if len(pending) >= max_pending:
+                yield from pending.popleft().result()
+    while pending:
+        yield from pending.popleft().result()
+
+
+def parallel_import(files, workers=IMPORT_WORKERS, chunk_size=db.IMPORT_CHUNK_SIZE,
+                    duplicates=None):
+    """Import external CSVs with a process pool doing the enrichment.
+
+    files: list of (csv_path, file_level, source_label)
+    Workers classify/estimate/analyze row chunks; this process is the
+    single writer, streaming their output into db.upsert_texts() (one
+    transaction per file). duplicates ("reject" / "flag") checks every row
+    against the MinHash index, including rows from earlier files in the
+    same run. Returns a summary dict with per-file stats.
+    """
+    summary = {"files": [], "inserted": 0, "updated": 0, "skipped": 0, "failed": 0,
+               "duplicates": 0, "workers": workers}
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for csv_path, file_level, source_label in files:
+            rows = _enriched_rows(pool, csv_path, file_level, source_label, chunk_size, workers * 2)
+            if duplicates is None:
+                stats = db.upsert_texts(rows, chunk_size=chunk_size)
             else:
-                intended_use = "다독"
-
-            data = {
-                "lexile_band": band,
-                "lexile_score": lexile_score,
-                "age_group": get_age_group(band),
-                "grade_hint": get_grade_hint(band),
-                "genre": genre,
-                "topic": title,
-                "word_count": wc,
-                "length_type": length_type,
-                "text_body": passage,
-                "sentence_count": sc,
-                "avg_sentence_length": avg,
-                "vocabulary_band": get_vocab_band(lexile_score),
-                "intended_use": intended_use,
-                "created_date": "2026-02-03",
-                "notes": f"Source: {source_label} (Topic {topic_num})",
-            }
-
-            text_id = db.insert_text(data, conn)
-            rows_imported += 1
-            print(f"  [{rows_imported:3d}] {text_id} | {band} | {genre:<15} | {length_type:<6} | {wc}w | {title[:40]}")
+                stats = db.upsert_checked(rows, duplicates, chunk_size=chunk_size)
+                summary["duplicates"] += stats["duplicates"]
+            stats["file"] = os.path.basename(csv_path)
+            summary["files"].append(stats)
+            for key in ("inserted", "updated", "skipped", "failed"):
+                summary[key] += stats[key]
 
-    conn.close()
-    return rows_imported
+    summary["elapsed"] = time.perf_counter() - started
+    processed = summary["inserted"] + summary["updated"] + summary["skipped"]
+    summary["rows_per_sec"] = processed / summary["elapsed"] if summary["elapsed"] else 0.0
+    return summary
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Import external reading CSVs")
+    parser.add_argument("--workers", type=int, default=IMPORT_WORKERS,
+                        help=f"enrichment processes (default: {IMPORT_WORKERS})")
+    parser.add_argument("--chunk-size", type=int, default=db.IMPORT_CHUNK_SIZE,
+                        help=f"rows per chunk (default: {db.IMPORT_CHUNK_SIZE})")
+    parser.add_argument("--duplicates", choices=["reject", "flag"],
+                        help="check passages against the near-duplicate index")
+    args = parser.parse_args()
+
     sys.stdout.reconfigure(encoding="utf-8")
     db.init_db()
 
@@ -247,41 +468,46 @@ def main():
         ("reading_5000.csv", 5000, "reading_5000"),
     ]
 
-    total = 0
+    jobs = []
     for filename, level, label in files:
         filepath = os.path.join(base_dir, filename)
         if not os.path.exists(filepath):
             print(f"[SKIP] {filename} not found")
             continue
+        jobs.append((filepath, level, label))
 
-        print(f"\n{'='*70}")
-        print(f"Importing {filename} (Level {level})")
-        print(f"{'='*70}")
-        count = convert_file(filepath, level, label)
-        print(f"  => {count} texts imported from {filename}")
-        total += count
+    summary = parallel_import(jobs, workers=args.workers, chunk_size=args.chunk_size,
+                              duplicates=args.duplicates)
 
     print(f"\n{'='*70}")
-    print(f"TOTAL: {total} texts imported")
+    for stats in summary["files"]:
+        print(f"  {stats['file']:<20} {stats['inserted']:>6} new | {stats['updated']:>5} upd "
+              f"| {stats['skipped']:>5} same | {stats['elapsed']:.2f}s "
+              f"| {stats['rows_per_sec']:,.0f} rows/s")
+        for err in stats["errors"]:
+            print(f"    [FAILED] chunk {err['chunk']} row {err.get('row', '-')}: {err['message']}")
+    print(f"{'='*70}")
+    print(f"TOTAL: {summary['inserted']} inserted, {summary['updated']} updated, "
+          f"{summary['skipped']} unchanged ({summary['failed']} failed)")
+    if args.duplicates:
+        action = "rejected" if args.duplicates == "reject" else "flagged"
+        print(f"Duplicates {action}: {summary['duplicates']}")
+    print(f"Throughput: {summary['rows_per_sec']:,.0f} rows/s "
+          f"({summary['elapsed']:.2f}s, {summary['workers']} workers)")
     print(f"DB total: {db.get_text_count()} texts")
     print(f"{'='*70}")
 
     # Coverage summary
+    coverage = db.get_coverage_summary()
     print("\n=== Coverage by Band ===")
-    conn = db.get_connection()
-    bands = conn.execute(
-        "SELECT lexile_band, COUNT(*) as cnt FROM reading_text GROUP BY lexile_band ORDER BY lexile_band"
-    ).fetchall()
-    for b in bands:
-        print(f"  {b['lexile_band']}: {b['cnt']} texts")
+    for band, cnt in coverage["bands"]:
+        print(f"  {band}: {cnt} texts")
 
     print("\n=== Coverage by Genre ===")
-    genres = conn.execute(
-        "SELECT genre, COUNT(*) as cnt FROM reading_text GROUP BY genre ORDER BY cnt DESC"
-    ).fetchall()
-    for g in genres:
-        print(f"  {g['genre']}: {g['cnt']} texts")
+    for genre, cnt in coverage["genres"]:
+        print(f"  {genre}: {cnt} texts")
 
+    conn = db.get_connection()
     print("\n=== Coverage by Source ===")
     sources = conn.execute(
         "SELECT SUBSTR(notes, 1, 30) as src, COUNT(*) as cnt FROM reading_text GROUP BY src ORDER BY cnt DESC"
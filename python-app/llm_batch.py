@@ -0,0 +1,409 @@
+"""
+Offline Batch Prompt Processing
+llm_toolkit 프롬프트를 provider 배치 작업(Message Batches) 형식으로 묶어 제출하고,
+완료될 때까지 폴링한 뒤 응답 원문은 llm_batch_requests.reply에, 파싱한 문항은
+question_bank(batch_id 포함)에 기록한다. 배치와 요청 목록이 먼저 저장되므로
+프로세스가 중간에 끝나도 나중에 collect로 결과를 회수할 수 있다.
+
+Usage:
+    python llm_batch.py run --task comprehension --band 700-900 [--stub]
+    python llm_batch.py list
+    python llm_batch.py collect <batch_id>
+    python llm_batch.py questions <text_id>
+
+Client interface (duck-typed):
+    submit(requests) -> batch_id
+    status(batch_id) -> "in_progress" | "ended" | ...
+    results(batch_id) -> iterable of (custom_id, reply_text, error)
+"""
+import argparse
+import itertools
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(__file__))
+import database as db
+import generator as gen
+import llm_toolkit as lt
+
+MAX_TOKENS = 2048
+MAX_BATCH_REQUESTS = 10000     # 배치당 요청 수 (provider 한도보다 작게)
+POLL_INTERVAL = 30.0           # seconds
+POLL_TIMEOUT = 24 * 3600       # provider 배치 만료 시간
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+# ==================== Clients ====================
+
+class AnthropicBatchClient:
+    """Message Batches API behind the batch client interface."""
+
+    provider = "anthropic"
+
+    def __init__(self, api_key=None, client=None):
+        self.client = client or gen.get_client(api_key)
+
+    def submit(self, requests):
+        return self.client.messages.batches.create(requests=requests).id
+
+    def status(self, batch_id):
+        return self.client.messages.batches.retrieve(batch_id).processing_status
+
+    def results(self, batch_id):
+        for entry in self.client.messages.batches.results(batch_id):
+            result = entry.result
+            if result.type == "succeeded":
+                yield entry.custom_id, result.message.content[0].text, None
+            elif result.type == "errored":
+                yield entry.custom_id, None, str(result.error)
+            else:  # canceled / expired
+                yield entry.custom_id, None, result.type
+
+
+def stub_reply(request):
+    """Canned reply in the comprehension/csat_style JSON shape."""
+    return json.dumps({
+        "questions": [
+            {
+                "number": n,
+                "type": "factual",
+                "question": f"Stub question {n} ({request['custom_id']})",
+                "choices": {"A": "one", "B": "two", "C": "three", "D": "four"},
+                "answer": "A",
+                "explanation": "Generated by StubBatchClient",
+            }
+            for n in (1, 2)
+        ]
+    })
+
+
+class StubBatchClient:
+    """Local stand-in for a provider batch API (no network).
+
+    A batch reports "in_progress" for `polls` status calls, then "ended".
+    responder(request) -> reply text; raise to report that request as errored.
+    """
+
+    provider = "stub"
+
+    def __init__(self, responder=stub_reply, polls=1):
+        self.responder = responder
+        self.polls = polls
+        self._batches = {}
+
+    def submit(self, requests):
+        batch_id = f"stub_{uuid.uuid4().hex[:16]}"
+        self._batches[batch_id] = {"requests": list(requests), "polls": 0}
+        return batch_id
+
+    def status(self, batch_id):
+        batch = self._batches[batch_id]
+        batch["polls"] += 1
+        return "ended" if batch["polls"] > self.polls else "in_progress"
+
+    def results(self, batch_id):
+        for request in self._batches[batch_id]["requests"]:
+            try:
+                yield request["custom_id"], self.responder(request), None
+            except Exception as e:
+                yield request["custom_id"], None, str(e)
+
+
+def get_batch_client(stub=False, api_key=None):
+    return StubBatchClient() if stub else AnthropicBatchClient(api_key)
+
+
+# ==================== Requests ====================
+
+CUSTOM_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+def custom_id(text_id, task_type):
+    """Request id: provider ids allow only [A-Za-z0-9_-], up to 64 chars."""
+    cid = f"{text_id}__{task_type}"
+    if not CUSTOM_ID_PATTERN.fullmatch(cid):
+        raise ValueError(f"Invalid batch custom_id: {cid!r}")
+    return cid
+
+
+def build_requests(rows, task_types, model=gen.MODEL, max_tokens=MAX_TOKENS, **kwargs):
+    """Yield (request, text_id, task_type) for every row x task type.
+
+    A (text_id, task_type) pair is requested once even if rows repeat it.
+    """
+    seen = set()
+    for chunk in db.chunked(rows, db.IMPORT_CHUNK_SIZE):
+        for task_type in task_types:
+            for row, prompt in zip(chunk, lt.render_batch(chunk, task_type, **kwargs)):
+                cid = custom_id(row["text_id"], task_type)
+                if cid in seen:
+                    continue
+                seen.add(cid)
+                request = {
+                    "custom_id": cid,
+                    "params": {
+                        "model": model,
+                        "max_tokens": max_tokens,
+                        "messages": [{"role": "user", "content": prompt}],
+                    },
+                }
+                yield request, row["text_id"], task_type
+
+
+def submit_batches(rows, task_types, client, model=gen.MODEL, max_tokens=MAX_TOKENS,
+                   batch_size=MAX_BATCH_REQUESTS, conn=None, **kwargs):
+    """Submit prompts for rows x task_types; returns the new batch ids.
+
+    Requests are split into batches of batch_size. custom_ids are checked
+    and deduplicated before anything is sent. Each batch is submitted
+    inside the write transaction that records it with its request ->
+    (text_id, task_type) mapping, so the lock is taken before the paid
+    call; if the insert still fails, the error names the provider batch.
+    """
+    if isinstance(task_types, str):
+        task_types = [task_types]
+    batch_ids = []
+    requests = build_requests(rows, task_types, model, max_tokens, **kwargs)
+    with db.connection(conn) as conn:
+        for chunk in db.chunked(requests, batch_size):
+            with db.import_transaction(conn):
+                batch_id = client.submit([request for request, _, _ in chunk])
+                now = _now()
+                try:
+                    conn.execute(
+                        "INSERT INTO llm_batches (batch_id, provider, model, status, total, "
+                        "created_at, updated_at) VALUES (?, ?, ?, 'in_progress', ?, ?, ?)",
+                        (batch_id, getattr(client, "provider", type(client).__name__), model,
+                         len(chunk), now, now),
+                    )
+                    conn.executemany(
+                        "INSERT INTO llm_batch_requests (batch_id, custom_id, text_id, task_type) "
+                        "VALUES (?, ?, ?, ?)",
+                        [(batch_id, request["custom_id"], text_id, task_type)
+                         for request, text_id, task_type in chunk],
+                    )
+                except sqlite3.Error as e:
+                    raise RuntimeError(f"Batch {batch_id} was submitted but not recorded: {e}") from e
+            batch_ids.append(batch_id)
+    return batch_ids
+
+
+def wait_for_batch(batch_id, client, interval=POLL_INTERVAL, timeout=POLL_TIMEOUT,
+                   sleep=time.sleep, on_poll=None):
+    """Poll until the provider reports the batch ended; returns the last status."""
+    started = time.monotonic()
+    while True:
+        status = client.status(batch_id)
+        if on_poll:
+            on_poll(batch_id, status)
+        if status == "ended":
+            return status
+        if time.monotonic() - started > timeout:
+            raise RuntimeError(f"Batch {batch_id} still {status} after {timeout:.0f}s")
+        sleep(interval)
+
+
+# ==================== Results ====================
+
+def parse_reply(text):
+    """Reply text -> JSON value (code fences stripped), or the raw text."""
+    cleaned = text.replace("```json", "").replace("```", "").strip()
+    try:
+        return json.loads(cleaned)
+    except ValueError:
+        return cleaned
+
+
+# 보기 번호 표기 -> correct_answer (1-based)
+ANSWER_MARKS = {mark: n for marks in ("ABCDE", "①②③④⑤", "12345") for n, mark in enumerate(marks, 1)}
+
+
+def answer_number(answer):
+    """"B" / "②" / "2" / 2 -> 2; anything else -> None."""
+    if isinstance(answer, int):
+        return answer
+    answer = str(answer or "").strip()
+    return ANSWER_MARKS.get(answer[:1].upper()) if answer else None
+
+
+def question_records(text_id, task_type, reply, batch_id, type_codes):
+    """question_bank inputs for the items of a reply's "questions" array.
+
+    The item's "type" becomes question_type_name and its canonical code
+    (db.question_type_code) the question_type; task_type if absent.
+    Replies without a questions array yield nothing.
+    """
+    items = reply.get("questions") if isinstance(reply, dict) else None
+    if not isinstance(items, list):
+        return []
+
+    records = []
+    for item in items:
+        if not isinstance(item, dict):
+            item = {"question": str(item)}
+        label = str(item.get("type") or task_type)
+        choices = item.get("choices")
+        if isinstance(choices, dict):
+            choices = list(choices.values())
+        records.append({
+            "source_text_id": text_id,
+            "question_type": db.question_type_code(label, type_codes),
+            "question_type_name": label,
+            "question_stem": item.get("question"),
+            "choices": choices if isinstance(choices, list) else None,
+            "correct_answer": answer_number(item.get("answer")),
+            "explanation": item.get("explanation"),
+            "batch_id": batch_id,
+        })
+    return records
+
+
+def collect_results(batch_id, client, conn=None):
+    """Fetch an ended batch's results into llm_batch_requests and question_bank.
+
+    Collecting a batch again replaces its questions; questions from other
+    batches are kept (plan_questions() skips texts that already have one).
+    Returns {"succeeded", "errored", "questions"}.
+    """
+    stats = {"succeeded": 0, "errored": 0, "questions": 0}
+    with db.connection(conn) as conn:
+        mapping = {
+            row["custom_id"]: (row["text_id"], row["task_type"])
+            for row in conn.execute(
+                "SELECT custom_id, text_id, task_type FROM llm_batch_requests WHERE batch_id = ?",
+                (batch_id,),
+            )
+        }
+        if not mapping:
+            raise ValueError(f"Unknown batch: {batch_id}")
+
+        type_codes = db.question_type_codes(conn)
+        # 같은 배치를 다시 collect해도 문항이 중복되지 않도록
+        conn.execute("DELETE FROM question_bank WHERE batch_id = ?", (batch_id,))
+        for chunk in db.chunked(client.results(batch_id), db.IMPORT_CHUNK_SIZE):
+            records = []
+            for cid, text, error in chunk:
+                if cid not in mapping:
+                    continue
+                text_id, task_type = mapping[cid]
+                if error is None:
+                    records.extend(question_records(text_id, task_type, parse_reply(text),
+                                                    batch_id, type_codes))
+                    stats["succeeded"] += 1
+                else:
+                    stats["errored"] += 1
+                conn.execute(
+                    "UPDATE llm_batch_requests SET status = ?, error = ?, reply = ? "
+                    "WHERE batch_id = ? AND custom_id = ?",
+                    ("succeeded" if error is None else "errored", error, text, batch_id, cid),
+                )
+            stats["questions"] += db.insert_questions(records, conn)["inserted"]
+            conn.commit()
+
+        conn.execute(
+            "UPDATE llm_batches SET status = 'collected', updated_at = ? WHERE batch_id = ?",
+            (_now(), batch_id),
+        )
+        conn.commit()
+    return stats
+
+
+def run_batches(rows, task_types, client, interval=POLL_INTERVAL, timeout=POLL_TIMEOUT,
+                sleep=time.sleep, on_poll=None, **options):
+    """submit -> poll -> collect for rows x task_types; returns summed stats."""
+    batch_ids = submit_batches(rows, task_types, client, **options)
+    summary = {"batches": batch_ids, "succeeded": 0, "errored": 0, "questions": 0}
+    for batch_id in batch_ids:
+        wait_for_batch(batch_id, client, interval, timeout, sleep, on_poll)
+        stats = collect_results(batch_id, client)
+        for key in ("succeeded", "errored", "questions"):
+            summary[key] += stats[key]
+    return summary
+
+
+def list_batches(conn=None):
+    with db.connection(conn) as conn:
+        return conn.execute("SELECT * FROM llm_batches ORDER BY created_at DESC").fetchall()
+
+
+def get_questions(text_id, task_type=None, conn=None):
+    """question_bank rows generated by batches for text_id (optionally one task)."""
+    query = "SELECT * FROM question_bank WHERE source_text_id = ? AND batch_id IS NOT NULL"
+    params = [text_id]
+    if task_type:
+        query += (" AND batch_id IN (SELECT batch_id FROM llm_batch_requests "
+                  "WHERE text_id = ? AND task_type = ?)")
+        params.extend([text_id, task_type])
+    query += " ORDER BY question_id"
+    with db.connection(conn) as conn:
+        return conn.execute(query, params).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Submit llm_toolkit prompts as provider batch jobs")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="프롬프트 생성 -> 배치 제출 -> 폴링 -> 결과 저장")
+    p_run.add_argument("--task", action="append", choices=list(lt.PROMPT_TEMPLATES),
+                       help="task type (repeatable, default: comprehension)")
+    p_run.add_argument("--band")
+    p_run.add_argument("--genre")
+    p_run.add_argument("--length-type")
+    p_run.add_argument("--limit", type=int)
+    p_run.add_argument("--interval", type=float, default=POLL_INTERVAL)
+    p_run.add_argument("--stub", action="store_true", help="로컬 stub 클라이언트 사용 (네트워크 없음)")
+
+    sub.add_parser("list", help="배치 목록")
+
+    p_collect = sub.add_parser("collect", help="제출된 배치 결과 회수 (프로세스 재시작 후)")
+    p_collect.add_argument("batch_id")
+    p_collect.add_argument("--interval", type=float, default=POLL_INTERVAL)
+
+    p_questions = sub.add_parser("questions", help="지문별 저장된 문항 보기")
+    p_questions.add_argument("text_id")
+
+    args = parser.parse_args()
+    sys.stdout.reconfigure(encoding="utf-8")
+    db.init_db()
+
+    if args.command == "list":
+        for b in list_batches():
+            print(f"  {b['batch_id']:<40} {b['provider']:<10} {b['status']:<12} "
+                  f"{b['total']:>6} requests | {b['updated_at']}")
+        return
+
+    if args.command == "questions":
+        for q in get_questions(args.text_id):
+            print(f"  [{q['question_id']}] {q['question_type_name']}: {q['question_stem']}")
+        return
+
+    client = get_batch_client(getattr(args, "stub", False))
+
+    def on_poll(batch_id, status):
+        print(f"  {batch_id}: {status}")
+
+    if args.command == "collect":
+        wait_for_batch(args.batch_id, client, args.interval, on_poll=on_poll)
+        print(collect_results(args.batch_id, client))
+        return
+
+    rows = lt.export_rows(args.band, args.genre, args.length_type)
+    if args.limit:
+        rows = itertools.islice(rows, args.limit)
+    summary = run_batches(rows, args.task or ["comprehension"], client,
+                          interval=args.interval, on_poll=on_poll)
+    print(f"{len(summary['batches'])} batches | succeeded {summary['succeeded']} | "
+          f"errored {summary['errored']} | questions {summary['questions']}")
+
+
+if __name__ == "__main__":
+    main()
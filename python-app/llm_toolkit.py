@@ -4,16 +4,23 @@ for comprehension questions, lesson plans, vocabulary exercises, and more.
 
 Usage:
     python llm_toolkit.py
+    python llm_toolkit.py export prompts.jsonl [--task comprehension --task csat_style] [--band 700-900]
 
 This module provides:
 1. Text retrieval by criteria (band, genre, length, topic keyword)
 2. Ready-to-use LLM prompt generation for 8 task types
-3. Batch prompt export for offline LLM use
+3. Batch prompt export for offline LLM use (single JSONL / zip archive)
 4. Curriculum sequence builder
 """
+import argparse
 import os
+import string
 import sys
 import json
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
 sys.path.insert(0, os.path.dirname(__file__))
 import database as db
@@ -332,64 +339,163 @@ TARGET_WORD_COUNTS = {
     "1300-1500": 350,
 }
 
+DEFAULT_TARGET_BAND = "500-700"
+DEFAULT_AGE_GROUP = "Middle School"
+
+
+# ==================== Template Engine ====================
+
+# 행 컬럼 외에 build_prompt가 채워 주는 값
+DERIVED_FIELDS = {
+    "num_questions", "summary_length",
+    "target_lexile", "target_age_group", "adaptation_rules", "target_word_count",
+}
+TEMPLATE_FIELDS = set(db.TEXT_COLUMNS) | DERIVED_FIELDS
+
+_formatter = string.Formatter()
+
+# render plan의 값 출처
+_CONST, _COLUMN, _SUMMARY = 0, 1, 2
+
+
+def summary_length(row):
+    """Model summary length: a third of the passage, at least 30 words.
+
+    Works for dicts and sqlite3.Row; a missing/empty word_count counts as 100.
+    """
+    word_count = row["word_count"] if "word_count" in row.keys() else None
+    return max((word_count or 100) // 3, 30)
+
+
+class CompiledTemplate:
+    """A prompt template parsed once into literal and field segments.
+
+    segments is a list of literal strings and field names (tuples of one).
+    Only plain {field} placeholders over TEMPLATE_FIELDS are accepted, so a
+    typo fails at import time instead of on the first matching row. The
+    segments are joined into a single %-format string; rendering a row is
+    one tuple of values and one output string.
+    """
+
+    def __init__(self, task_type, template):
+        self.task_type = task_type
+        self.segments = []
+        for literal, field, spec, conversion in _formatter.parse(template):
+            if literal:
+                self.segments.append(literal)
+            if field is None:
+                continue
+            if field not in TEMPLATE_FIELDS:
+                raise ValueError(f"{task_type}: unknown placeholder {{{field}}}")
+            if spec or conversion:
+                raise ValueError(f"{task_type}: format spec not supported in {{{field}}}")
+            self.segments.append((field,))
+
+        self.slots = [s[0] for s in self.segments if isinstance(s, tuple)]
+        self.fields = set(self.slots)
+        self._format = "".join(
+            "%s" if isinstance(s, tuple) else s.replace("%", "%%") for s in self.segments
+        )
+
+    def plan(self, params):
+        """Where each slot's value comes from, given the batch-wide params."""
+        plan = []
+        for field in self.slots:
+            if field in params:
+                plan.append((_CONST, params[field]))
+            elif field == "summary_length":
+                plan.append((_SUMMARY, None))
+            else:
+                plan.append((_COLUMN, field))
+        return plan
+
+    def render(self, row, plan):
+        return self._format % tuple(
+            value if source == _CONST
+            else row[value] if source == _COLUMN
+            else summary_length(row)
+            for source, value in plan
+        )
+
+
+TEMPLATES = {
+    task_type: CompiledTemplate(task_type, info["template"])
+    for task_type, info in PROMPT_TEMPLATES.items()
+}
+
+_age_groups = None
+_age_groups_version = None
+
+
+def band_age_groups(reload=False):
+    """config_bands band -> age_group, reloaded when database.config_version() changes."""
+    global _age_groups, _age_groups_version
+    version = db.config_version()
+    if _age_groups is None or reload or version != _age_groups_version:
+        with db.connection() as conn:
+            _age_groups = dict(conn.execute("SELECT band, age_group FROM config_bands"))
+        _age_groups_version = version
+    return _age_groups
+
+
+def prompt_params(task_type, **kwargs):
+    """Values shared by every row of a batch (kwargs override derived ones)."""
+    params = {"num_questions": 5}
+    if task_type == "graded_reader":
+        target_band = kwargs.get("target_band", DEFAULT_TARGET_BAND)
+        params.update(
+            target_lexile=target_band,
+            target_age_group=band_age_groups().get(target_band) or DEFAULT_AGE_GROUP,
+            adaptation_rules=ADAPTATION_RULES.get(target_band, ""),
+            target_word_count=TARGET_WORD_COUNTS.get(target_band, 200),
+        )
+    params.update(kwargs)
+    return params
+
+
+def render_batch(rows, task_type, **kwargs):
+    """Yield a prompt per row; sqlite3.Row or dict rows are read in place."""
+    template = TEMPLATES.get(task_type)
+    if template is None:
+        raise ValueError(f"Unknown task type: {task_type}")
+    plan = template.plan(prompt_params(task_type, **kwargs))
+    render = template.render
+    for row in rows:
+        yield render(row, plan)
+
 
 # ==================== Core Functions ====================
 
 def search_texts(band=None, genre=None, length_type=None, keyword=None):
-    """Search DB with multiple filters."""
-    conn = db.get_connection()
-    query = "SELECT * FROM reading_text WHERE 1=1"
-    params = []
+    """Search DB with multiple filters.
 
-    if band:
-        query += " AND lexile_band = ?"
-        params.append(band)
-    if genre:
-        query += " AND genre = ?"
-        params.append(genre)
-    if length_type:
-        query += " AND length_type = ?"
-        params.append(length_type)
+    With a keyword the results come from the full-text index, ranked by
+    relevance and carrying a `snippet` column.
+    """
     if keyword:
-        query += " AND (topic LIKE ? OR text_body LIKE ?)"
-        params.extend([f"%{keyword}%", f"%{keyword}%"])
+        return db.fulltext_search(
+            keyword, band=band, genre=genre, length_type=length_type,
+            snippet_markers=("[bold yellow]", "[/bold yellow]"),
+        )
 
-    query += " ORDER BY lexile_score"
-    rows = conn.execute(query, params).fetchall()
-    conn.close()
-    return rows
+    query, params = db.texts_query(band, genre, length_type, order_by="lexile_score")
+    with db.connection() as conn:
+        return conn.execute(query, params).fetchall()
 
 
 def build_prompt(text_row, task_type, **kwargs):
     """Build an LLM prompt from a text row and task type."""
-    template_info = PROMPT_TEMPLATES.get(task_type)
-    if not template_info:
-        raise ValueError(f"Unknown task type: {task_type}")
-
-    row = dict(text_row)
-
-    # Default values
-    row.setdefault("num_questions", kwargs.get("num_questions", 5))
-    row.setdefault("summary_length", max(row.get("word_count", 100) // 3, 30))
-
-    # For graded reader adaptation
-    if task_type == "graded_reader":
-        target_band = kwargs.get("target_band", "500-700")
-        row["target_lexile"] = target_band
-        row["target_age_group"] = db.get_connection().execute(
-            "SELECT age_group FROM config_bands WHERE band = ?", (target_band,)
-        ).fetchone()
-        if row["target_age_group"]:
-            row["target_age_group"] = row["target_age_group"][0]
-        else:
-            row["target_age_group"] = "Middle School"
-        row["adaptation_rules"] = ADAPTATION_RULES.get(target_band, "")
-        row["target_word_count"] = TARGET_WORD_COUNTS.get(target_band, 200)
+    return next(render_batch((text_row,), task_type, **kwargs))
 
-    # Merge extra kwargs
-    row.update(kwargs)
 
-    return template_info["template"].format(**row)
+def _prompt_header(text_row, task_type):
+    return (
+        f"# Task: {PROMPT_TEMPLATES[task_type]['name']}\n"
+        f"# Text ID: {text_row['text_id']}\n"
+        f"# Lexile: {text_row['lexile_score']} ({text_row['lexile_band']})\n"
+        f"# Genre: {text_row['genre']} | Topic: {text_row['topic']}\n"
+        f"# Words: {text_row['word_count']}\n\n"
+    )
 
 
 def export_prompt(text_row, task_type, output_path=None, **kwargs):
@@ -398,11 +504,7 @@ def export_prompt(text_row, task_type, output_path=None, **kwargs):
 
     if output_path:
         with open(output_path, "w", encoding="utf-8") as f:
-            f.write(f"# Task: {PROMPT_TEMPLATES[task_type]['name']}\n")
-            f.write(f"# Text ID: {text_row['text_id']}\n")
-            f.write(f"# Lexile: {text_row['lexile_score']} ({text_row['lexile_band']})\n")
-            f.write(f"# Genre: {text_row['genre']} | Topic: {text_row['topic']}\n")
-            f.write(f"# Words: {text_row['word_count']}\n\n")
+            f.write(_prompt_header(text_row, task_type))
             f.write(prompt)
         return output_path
     return prompt
@@ -410,26 +512,141 @@ def export_prompt(text_row, task_type, output_path=None, **kwargs):
 
 def build_curriculum_sequence(band, num_texts=5):
     """Build a progressive reading sequence within a band."""
-    conn = db.get_connection()
-
     # Get texts in order: Micro -> Short -> Medium -> Long
-    length_order = "'Micro','Short','Medium','Long','Extra Long'"
-    rows = conn.execute(f"""
-        SELECT * FROM reading_text
-        WHERE lexile_band = ?
-        ORDER BY
-            CASE length_type
-                WHEN 'Micro' THEN 1
-                WHEN 'Short' THEN 2
-                WHEN 'Medium' THEN 3
-                WHEN 'Long' THEN 4
-                WHEN 'Extra Long' THEN 5
-            END,
-            lexile_score
-        LIMIT ?
-    """, (band, num_texts)).fetchall()
-    conn.close()
-    return rows
+    with db.connection() as conn:
+        return conn.execute(*db.curriculum_query(band, num_texts)).fetchall()
+
+
+# ==================== Bulk Export ====================
+
+EXPORT_WORKERS = os.cpu_count() or 1
+EXPORT_CHUNK_SIZE = 200
+
+# JSONL 레코드/zip manifest에 함께 기록하는 메타데이터
+RECORD_FIELDS = ["text_id", "lexile_score", "lexile_band", "genre", "length_type",
+                 "word_count", "topic"]
+
+
+def _render_records(args):
+    """Worker: render and serialize every task for a chunk of rows.
+
+    Returns JSONL lines, or (member name, text, manifest line) for zip
+    archives; JSON encoding is the bulk of the cost, so it runs here.
+    """
+    rows, tasks, start, archive = args
+    plans = [(task_type, TEMPLATES[task_type], TEMPLATES[task_type].plan(params))
+             for task_type, params in tasks]
+    out = []
+    for seq, row in enumerate(rows, start):
+        meta = {"seq": seq}
+        meta.update((field, row[field]) for field in RECORD_FIELDS)
+        for task_type, template, plan in plans:
+            record = dict(meta, task_type=task_type)
+            prompt = template.render(row, plan)
+            if archive == "zip":
+                name = record["file"] = f"{task_type}/{row['text_id']}.txt"
+                out.append((name, _prompt_header(row, task_type) + prompt,
+                            json.dumps(record, ensure_ascii=False) + "\n"))
+            else:
+                record["prompt"] = prompt
+                out.append(json.dumps(record, ensure_ascii=False) + "\n")
+    return out
+
+
+def export_rows(band=None, genre=None, length_type=None, conn=None):
+    """Rows with a body as plain dicts (picklable for the worker pool)."""
+    query = "SELECT * FROM reading_text WHERE text_body IS NOT NULL AND text_body != ''"
+    params = []
+    for column, value in (("lexile_band", band), ("genre", genre), ("length_type", length_type)):
+        if value:
+            query += f" AND {column} = ?"
+            params.append(value)
+    query += " ORDER BY lexile_score, text_id"
+    with db.connection(conn) as conn:
+        cursor = conn.execute(query, params)
+        while True:
+            batch = cursor.fetchmany(db.EXPORT_BATCH_SIZE)
+            if not batch:
+                break
+            for row in batch:
+                yield dict(row)
+
+
+def _rendered(chunks, tasks, archive, workers):
+    """Render chunks in order, with at most workers * 2 chunks in flight."""
+    start = 1
+    if workers <= 1:
+        for chunk in chunks:
+            yield from _render_records((chunk, tasks, start, archive))
+            start += len(chunk)
+        return
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk in chunks:
+            pending.append(pool.submit(_render_records, (chunk, tasks, start, archive)))
+            start += len(chunk)
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def export_prompts(output_path, task_types, rows=None, band=None, genre=None,
+                   length_type=None, workers=EXPORT_WORKERS,
+                   chunk_size=EXPORT_CHUNK_SIZE, **kwargs):
+    """Render prompts for many texts and task types into a single archive.
+
+    output_path:
+      *.jsonl (.jsonl.gz / .jsonl.zst) - one JSON record per prompt:
+        metadata (seq, RECORD_FIELDS, task_type) and "prompt"
+      *.zip - <task_type>/<text_id>.txt per prompt (same header as
+        export_prompt) plus manifest.jsonl with the metadata
+    rows: texts to export; defaults to every text with a body matching
+    band / genre / length_type. Per-task values (graded_reader target
+    band etc.) are resolved once here, so workers never touch the DB.
+    Returns {"path", "texts", "records", "elapsed", "records_per_sec"}.
+    """
+    if isinstance(task_types, str):
+        task_types = [task_types]
+    if not task_types:
+        raise ValueError("No task types selected")
+    unknown = [t for t in task_types if t not in TEMPLATES]
+    if unknown:
+        raise ValueError(f"Unknown task type: {', '.join(unknown)}")
+    tasks = [(t, prompt_params(t, **kwargs)) for t in task_types]
+
+    if rows is None:
+        rows = export_rows(band, genre, length_type)
+    else:
+        rows = (dict(r) for r in rows)
+
+    started = time.perf_counter()
+    records = 0
+    archive = "zip" if output_path.lower().endswith(".zip") else "jsonl"
+    rendered = _rendered(db.chunked(rows, chunk_size), tasks, archive, workers)
+
+    if archive == "zip":
+        manifest = []
+        with zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as zf:
+            for name, text, line in rendered:
+                zf.writestr(name, text)
+                manifest.append(line)
+                records += 1
+            zf.writestr("manifest.jsonl", "".join(manifest))
+    else:
+        with db.open_export(output_path) as f:
+            for line in rendered:
+                f.write(line)
+                records += 1
+
+    elapsed = time.perf_counter() - started
+    return {
+        "path": output_path,
+        "texts": records // len(tasks),
+        "records": records,
+        "elapsed": elapsed,
+        "records_per_sec": records / elapsed if elapsed else 0.0,
+    }
 
 
 # ==================== Interactive CLI ====================
@@ -451,7 +668,7 @@ def select_text():
     console.print("[bold]Filter texts:[/bold]")
     band = Prompt.ask("Lexile Band (e.g. 700-900, Enter=all)", default="")
     genre = Prompt.ask("Genre (e.g. Narrative, Enter=all)", default="")
-    keyword = Prompt.ask("Topic keyword (Enter=none)", default="")
+    keyword = Prompt.ask('Keyword ("phrase", prefix*, Enter=none)', default="")
 
     rows = search_texts(
         band=band or None,
@@ -483,6 +700,11 @@ def select_text():
     if len(rows) > 20:
         console.print(f"[dim]... and {len(rows) - 20} more[/dim]")
 
+    if keyword:
+        for i, r in enumerate(rows[:5]):
+            if r["snippet"]:
+                console.print(f"[dim]{i + 1}.[/dim] {r['snippet']}")
+
     choice = Prompt.ask("Select # (or 0 to cancel)", default="1")
     idx = int(choice) - 1
     if 0 <= idx < len(rows):
@@ -547,25 +769,57 @@ def interactive_generate():
             console.print("[yellow]pyperclip not installed. pip install pyperclip[/yellow]")
 
 
+def select_task_types():
+    """Interactive selection of one or more task types."""
+    console.print("\n[bold]Available Task Types:[/bold]")
+    tasks = list(PROMPT_TEMPLATES.keys())
+    for i, key in enumerate(tasks):
+        info = PROMPT_TEMPLATES[key]
+        console.print(f"  [{i+1}] {info['name']} - {info['description']}")
+
+    choice = Prompt.ask("Select task #s (comma-separated, or 'all')", default="1")
+    if choice.strip().lower() == "all":
+        return tasks
+    selected = []
+    for part in choice.split(","):
+        idx = int(part) - 1 if part.strip().isdigit() else -1
+        if 0 <= idx < len(tasks) and tasks[idx] not in selected:
+            selected.append(tasks[idx])
+    return selected or tasks[:1]
+
+
 def batch_export():
     """Export prompts for multiple texts."""
     band = Prompt.ask("Lexile Band", default="700-900")
-    task_type = select_task_type()
-
-    rows = search_texts(band=band)
-    if not rows:
-        console.print("[yellow]No texts found.[/yellow]")
-        return
+    task_types = select_task_types()
+    fmt = Prompt.ask("Output format", choices=["jsonl", "zip", "txt"], default="jsonl")
 
     output_dir = os.path.join(os.path.dirname(__file__), "prompts_export")
     os.makedirs(output_dir, exist_ok=True)
 
-    for r in rows:
-        filename = f"{r['text_id']}_{task_type}.txt"
-        filepath = os.path.join(output_dir, filename)
-        export_prompt(r, task_type, filepath)
+    if fmt == "txt":
+        rows = search_texts(band=band)
+        if not rows:
+            console.print("[yellow]No texts found.[/yellow]")
+            return
+        for r in rows:
+            for task_type in task_types:
+                filename = f"{r['text_id']}_{task_type}.txt"
+                filepath = os.path.join(output_dir, filename)
+                export_prompt(r, task_type, filepath)
+        console.print(f"[green]{len(rows) * len(task_types)} prompts exported to {output_dir}/[/green]")
+        return
 
-    console.print(f"[green]{len(rows)} prompts exported to {output_dir}/[/green]")
+    filepath = os.path.join(output_dir, f"prompts_{band}.{fmt}")
+    with console.status("Rendering prompts..."):
+        stats = export_prompts(filepath, task_types, band=band)
+    if not stats["records"]:
+        console.print("[yellow]No texts found.[/yellow]")
+        return
+    console.print(
+        f"[green]{stats['records']} prompts ({stats['texts']} texts x {len(task_types)} tasks) "
+        f"exported to {filepath}[/green] [dim]{stats['records_per_sec']:,.0f} prompts/s[/dim]"
+    )
 
 
 def curriculum_builder():
@@ -604,12 +858,8 @@ def quick_generate():
     band = Prompt.ask("Lexile Band", default="700-900")
     task_type = select_task_type()
 
-    conn = db.get_connection()
-    row = conn.execute(
-        "SELECT * FROM reading_text WHERE lexile_band = ? AND text_body IS NOT NULL ORDER BY RANDOM() LIMIT 1",
-        (band,)
-    ).fetchone()
-    conn.close()
+    with db.connection() as conn:
+        row = conn.execute(*db.random_text_query(band)).fetchone()
 
     if not row:
         console.print("[yellow]No texts found.[/yellow]")
@@ -620,9 +870,38 @@ def quick_generate():
     console.print(Panel(prompt, title=PROMPT_TEMPLATES[task_type]["name"], box=box.ROUNDED))
 
 
+def export_main(argv):
+    """Non-interactive bulk export: python llm_toolkit.py export <path> ..."""
+    parser = argparse.ArgumentParser(prog="llm_toolkit.py export",
+                                     description="Render prompts into a single JSONL/zip archive")
+    parser.add_argument("path", help="*.jsonl, *.jsonl.gz, *.jsonl.zst or *.zip")
+    parser.add_argument("--task", action="append", choices=list(PROMPT_TEMPLATES),
+                        help="task type (repeatable, default: all)")
+    parser.add_argument("--band")
+    parser.add_argument("--genre")
+    parser.add_argument("--length-type")
+    parser.add_argument("--target-band", help="graded_reader target band")
+    parser.add_argument("--workers", type=int, default=EXPORT_WORKERS,
+                        help=f"render processes (default: {EXPORT_WORKERS})")
+    args = parser.parse_args(argv)
+
+    kwargs = {"target_band": args.target_band} if args.target_band else {}
+    stats = export_prompts(
+        args.path, args.task or list(PROMPT_TEMPLATES),
+        band=args.band, genre=args.genre, length_type=args.length_type,
+        workers=args.workers, **kwargs,
+    )
+    print(f"{stats['records']} prompts ({stats['texts']} texts) -> {stats['path']} "
+          f"in {stats['elapsed']:.2f}s ({stats['records_per_sec']:,.0f} prompts/s)")
+
+
 def main():
     db.init_db()
 
+    if len(sys.argv) > 1 and sys.argv[1] == "export":
+        export_main(sys.argv[2:])
+        return
+
     console.print(Panel(
         "[bold cyan]LLM Toolkit[/bold cyan]\n"
         "Reading Text DB → LLM Prompt Generator",
@@ -0,0 +1,213 @@
+"""
+Streaming Import/Export Pipeline
+reader -> transform stages -> sink 형태로 제너레이터를 연결한다.
+각 단계는 행을 하나씩(필요하면 배치 단위로) 끌어오므로 코퍼스 크기와 상관없이
+메모리 사용량이 일정하고, sink가 느리면 reader도 그만큼 천천히 읽는다.
+
+Usage:
+    python pipeline.py import sample.csv [--dedupe] [--classify] [--validate drop|keep]
+    python pipeline.py import-external reading_5000.csv 5000 [--dedupe]
+    python pipeline.py export out.csv
+
+Stage = rows(iterable of dict) -> rows(iterable of dict)
+    rows = pipe(read_csv(path), dedupe(), classify(), validate())
+    stats = to_db(rows)
+"""
+import argparse
+import csv
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+import database as db
+import import_external as ie
+import validation as val
+
+BATCH_SIZE = db.IMPORT_CHUNK_SIZE
+EXPORT_BATCH_SIZE = db.EXPORT_BATCH_SIZE
+
+
+def pipe(source, *stages):
+    """Chain stages onto a source; nothing runs until the result is consumed."""
+    rows = source
+    for stage in stages:
+        rows = stage(rows)
+    return rows
+
+
+def batched(rows, size=BATCH_SIZE):
+    return db.chunked(rows, size)
+
+
+# ==================== Sources ====================
+
+def read_csv(path, encoding="utf-8"):
+    """Yield CSV rows as dicts, one at a time."""
+    with open(path, "r", encoding=encoding, newline="") as f:
+        yield from csv.DictReader(f)
+
+
+def read_table(query="SELECT * FROM reading_text ORDER BY text_id", params=(),
+               batch_size=EXPORT_BATCH_SIZE, conn=None):
+    """Yield rows of a query via fetchmany(), holding one batch at a time."""
+    with db.connection(conn) as conn:
+        cursor = conn.execute(query, params)
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            yield from batch
+
+
+# ==================== Stages ====================
+
+def external_to_schema(file_level, source_label, batch_size=BATCH_SIZE):
+    """External CSV rows (topic/title/passage) -> reading_text rows."""
+    def stage(rows):
+        for batch in batched(rows, batch_size):
+            yield from ie.convert_rows(batch, file_level, source_label)
+    return stage
+
+
+def dedupe(key=None, on_duplicate=None):
+    """Drop rows whose key was already seen (default: normalized body hash).
+
+    Only the hashes are kept, so memory grows with the number of distinct
+    passages, not their size. Rows whose key is None (empty slots under
+    the default key) are never treated as duplicates.
+    on_duplicate: callback(row).
+    """
+    key = key or (lambda row: db.body_hash(row.get("text_body")))
+
+    def stage(rows):
+        seen = set()
+        for row in rows:
+            k = key(row)
+            if k is None:
+                yield row
+                continue
+            if k in seen:
+                if on_duplicate:
+                    on_duplicate(row)
+                continue
+            seen.add(k)
+            yield row
+    return stage
+
+
+def classify(batch_size=BATCH_SIZE, overwrite=False):
+    """Fill in genre with the batch genre classifier (topic used as title)."""
+    def stage(rows):
+        for batch in batched(rows, batch_size):
+            todo = [r for r in batch if overwrite or not r.get("genre")]
+            if todo:
+                genres = ie.classify_genres(
+                    (r.get("topic") or "", r.get("text_body") or "") for r in todo
+                )
+                for r, genre in zip(todo, genres):
+                    r["genre"] = genre
+            yield from batch
+    return stage
+
+
+def validate(mode="drop", on_invalid=None):
+    """Run validation.validate_row on each row.
+
+    mode="drop" skips rows with errors, "keep" passes them through.
+    on_invalid: callback(row, errors).
+    """
+    def stage(rows):
+        for row in rows:
+            errors = val.validate_row(row)
+            if errors:
+                if on_invalid:
+                    on_invalid(row, errors)
+                if mode == "drop":
+                    continue
+            yield row
+    return stage
+
+
+# ==================== Sinks ====================
+
+def to_db(rows, conn=None, chunk_size=BATCH_SIZE):
+    """Stream rows into reading_text via db.upsert_texts (chunked savepoints)."""
+    return db.upsert_texts(rows, conn, chunk_size)
+
+
+def to_csv(rows, path, columns=None):
+    """Write rows to CSV as they arrive; returns the row count."""
+    count = 0
+    writer = None
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for row in rows:
+            if writer is None:
+                fieldnames = columns or list(row.keys())
+                writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
+                writer.writeheader()
+            writer.writerow(dict(row))
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming import/export for reading_text")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_import = sub.add_parser("import", help="reading_text 스키마 CSV 임포트")
+    p_import.add_argument("path")
+
+    p_ext = sub.add_parser("import-external", help="외부 CSV (topic,title,passage) 임포트")
+    p_ext.add_argument("path")
+    p_ext.add_argument("level", type=int, choices=[2000, 3000, 5000])
+
+    for p in (p_import, p_ext):
+        p.add_argument("--dedupe", action="store_true", help="본문 중복 제거")
+        p.add_argument("--classify", action="store_true", help="장르가 빈 행을 분류기로 채움")
+        p.add_argument("--validate", choices=["drop", "keep"], help="검증 실패 행 처리")
+        p.add_argument("--chunk-size", type=int, default=BATCH_SIZE)
+
+    p_export = sub.add_parser("export", help="reading_text를 CSV로 내보내기")
+    p_export.add_argument("path")
+
+    args = parser.parse_args()
+    sys.stdout.reconfigure(encoding="utf-8")
+    db.init_db()
+
+    if args.command == "export":
+        count = to_csv(read_table(), args.path)
+        print(f"{count} rows -> {args.path}")
+        return
+
+    counts = {"duplicates": 0, "invalid": 0}
+
+    def on_duplicate(row):
+        counts["duplicates"] += 1
+
+    def on_invalid(row, errors):
+        counts["invalid"] += 1
+
+    if args.command == "import":
+        stages = []
+        source = read_csv(args.path)
+    else:
+        label = os.path.splitext(os.path.basename(args.path))[0]
+        stages = [external_to_schema(args.level, label, args.chunk_size)]
+        source = read_csv(args.path, encoding="utf-8-sig")
+
+    if args.dedupe:
+        stages.append(dedupe(on_duplicate=on_duplicate))
+    if args.classify:
+        stages.append(classify(args.chunk_size))
+    if args.validate:
+        stages.append(validate(args.validate, on_invalid))
+
+    stats = to_db(pipe(source, *stages), chunk_size=args.chunk_size)
+    print(f"inserted {stats['inserted']} | updated {stats['updated']} | "
+          f"unchanged {stats['skipped']} | failed {stats['failed']} | "
+          f"duplicates {counts['duplicates']} | invalid {counts['invalid']} | "
+          f"{stats['rows_per_sec']:,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
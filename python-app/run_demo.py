@@ -18,15 +18,9 @@ console.print(f"[dim]DB: {db.DB_PATH}[/dim]")
 console.print(f"[dim]Total texts: {db.get_text_count()}[/dim]\n")
 
 # === 1. DB Stats ===
-conn = db.get_connection()
-total = conn.execute("SELECT COUNT(*) FROM reading_text").fetchone()[0]
-with_text = conn.execute(
-    "SELECT COUNT(*) FROM reading_text WHERE text_body IS NOT NULL AND text_body <> ''"
-).fetchone()[0]
-genres = conn.execute(
-    "SELECT genre, COUNT(*) as cnt FROM reading_text GROUP BY genre ORDER BY cnt DESC"
-).fetchall()
-conn.close()
+summary = db.get_coverage_summary()
+total, with_text = summary["total"], summary["with_body"]
+genres = summary["genres"]
 
 console.print(Panel(
     f"[bold]Total texts:[/bold] {total}\n"
@@ -39,8 +33,8 @@ console.print(Panel(
 gt = Table(title="Genre Summary", box=box.SIMPLE)
 gt.add_column("Genre", width=16)
 gt.add_column("Count", justify="right", width=8)
-for g in genres:
-    gt.add_row(g["genre"], str(g["cnt"]))
+for genre, cnt in genres:
+    gt.add_row(genre, str(cnt))
 console.print(gt)
 
 # === 2. Full Text List ===
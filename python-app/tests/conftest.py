@@ -0,0 +1,50 @@
+import json
+import os
+import re
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+import database as db
+
+
+@pytest.fixture
+def tmp_db(tmp_path, monkeypatch):
+    """Empty schema in a throwaway DB file; the shared pool follows DB_PATH."""
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "test.db"))
+    db.init_db()
+    yield db
+    db.get_pool().close_all()
+
+
+def make_text(**fields):
+    data = {
+        "lexile_band": db.LEXILE_BANDS[2][0],
+        "lexile_score": 600,
+        "age_group": "Middle School",
+        "genre": "Narrative",
+        "topic": "A rainy day",
+        "length_type": "Short",
+    }
+    data.update(fields)
+    return data
+
+
+class FakeClient:
+    """Stands in for anthropic.Anthropic: the reply body names the prompt's topic."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.messages = self
+        self.calls = 0
+
+    def create(self, model, max_tokens, messages):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        topic = re.search(r"\*\*Topic\*\*: (.*)", messages[0]["content"]).group(1)
+        body = f"This passage is about {topic}. It has two sentences."
+        reply = {"text_body": body, "word_count": len(body.split()), "sentence_count": 2}
+        return SimpleNamespace(content=[SimpleNamespace(text=json.dumps(reply))])
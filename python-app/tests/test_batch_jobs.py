@@ -0,0 +1,34 @@
+import batch_jobs
+from conftest import FakeClient, make_text
+
+
+def empty_slot(db):
+    return db.insert_text(make_text(grade_hint="중1", notes="교재 3단원", created_date="2024-03-01"))
+
+
+def test_retry_requeues_failed_slots(tmp_db):
+    db = tmp_db
+    text_id = empty_slot(db)
+    job_id = batch_jobs.create_job_from_empty_slots()
+
+    counts = batch_jobs.run_job(job_id, client=FakeClient(fail=True), max_attempts=1,
+                                use_cache=False)
+    assert counts == {"failed": 1}
+
+    assert batch_jobs.retry_failed(job_id) == 1
+    counts = batch_jobs.run_job(job_id, client=FakeClient(), max_attempts=1, use_cache=False)
+    assert counts == {"done": 1}
+    assert db.get_text(text_id)["text_body"].startswith("This passage is about A rainy day.")
+
+
+def test_filled_slot_keeps_metadata(tmp_db):
+    db = tmp_db
+    text_id = empty_slot(db)
+    job_id = batch_jobs.create_job_from_empty_slots()
+    batch_jobs.run_job(job_id, client=FakeClient(), use_cache=False)
+
+    row = db.get_text(text_id)
+    assert row["text_body"]
+    assert row["word_count"] and row["content_hash"]
+    assert (row["grade_hint"], row["notes"], row["created_date"]) == ("중1", "교재 3단원", "2024-03-01")
+    assert db.get_text_count() == 1
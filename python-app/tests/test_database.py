@@ -0,0 +1,323 @@
+import csv
+import gzip
+import io
+import threading
+
+import pytest
+
+from conftest import make_text
+
+BODY = "The rain fell all day. We stayed inside and read books. Nobody minded at all."
+
+
+def count(db):
+    with db.connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM reading_text").fetchone()[0]
+
+
+def test_insert_same_body_keeps_existing_row(tmp_db):
+    db = tmp_db
+    first = db.insert_text(make_text(text_body=BODY))
+    with pytest.raises(ValueError, match=first):
+        db.insert_text(make_text(text_body=BODY, topic="Copy"))
+    assert count(db) == 1
+    assert db.get_text(first)["text_body"] == BODY
+
+
+def test_insert_existing_id_updates_in_place(tmp_db):
+    db = tmp_db
+    text_id = db.insert_text(make_text(text_body=BODY))
+    db.insert_text(make_text(text_id=text_id, text_body=BODY, topic="Renamed"))
+    assert count(db) == 1
+    assert db.get_text(text_id)["topic"] == "Renamed"
+
+
+def test_insert_same_body_keeps_dependent_questions(tmp_db):
+    db = tmp_db
+    text_id = db.insert_text(make_text(text_body=BODY))
+    db.insert_questions([{
+        "source_text_id": text_id, "question_type": "MI-01",
+        "question_stem": "What is the passage about?",
+        "choices": ["Rain", "Sun", "Snow", "Wind", "Fog"], "correct_answer": 1,
+    }])
+    with pytest.raises(ValueError):
+        db.insert_text(make_text(text_body=BODY, topic="Copy"))
+    assert db.get_question_counts() == {"MI-01": 1}
+
+
+def test_bulk_insert_reports_duplicate_body(tmp_db):
+    db = tmp_db
+    db.insert_text(make_text(text_body=BODY))
+    stats = db.bulk_insert([make_text(text_body=BODY, topic="Copy")])
+    assert stats["failed"] == 1
+    assert "UNIQUE" in stats["errors"][0]["message"]
+    assert count(db) == 1
+
+
+def test_bulk_insert_keeps_good_rows_of_failed_chunk(tmp_db):
+    db = tmp_db
+    db.insert_text(make_text(text_body=BODY))
+    rows = [make_text(text_body=f"Passage {n}. It is short.") for n in range(3)]
+    rows.insert(1, make_text(text_body=BODY, topic="Copy"))
+    stats = db.bulk_insert(rows)
+    assert (stats["inserted"], stats["failed"]) == (3, 1)
+    assert stats["errors"][0]["row"] == 2
+    assert count(db) == 4
+
+
+def test_import_csv_returns_stats(tmp_db, tmp_path):
+    db = tmp_db
+    db.insert_text(make_text(text_body=BODY))
+    path = tmp_path / "in.csv"
+    rows = [make_text(text_body=BODY), make_text(text_body="Bad score. Oops.", lexile_score="n/a"),
+            make_text(text_body="Other text. Fine.")]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=rows[0].keys())
+        writer.writeheader()
+        writer.writerows(rows)
+    stats = db.import_csv(str(path))
+    assert (stats["inserted"], stats["skipped"], stats["failed"]) == (1, 1, 1)
+    assert stats["errors"][0]["row"] == 2
+
+
+def reference_export_csv(db, path):
+    """export_csv() as it was before streaming (DictWriter over SELECT *)."""
+    with db.connection() as conn:
+        rows = conn.execute("SELECT * FROM reading_text ORDER BY text_id").fetchall()
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=rows[0].keys())
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(dict(row))
+
+
+def test_export_csv_matches_reference(tmp_db, tmp_path):
+    db = tmp_db
+    db.insert_text(make_text(text_body=BODY, notes='says "hi", twice'))
+    db.insert_text(make_text(genre="Expository", topic=None))
+    reference_export_csv(db, tmp_path / "ref.csv")
+    assert db.export_csv(str(tmp_path / "out.csv"), batch_size=1) == 2
+    assert (tmp_path / "out.csv").read_bytes() == (tmp_path / "ref.csv").read_bytes()
+
+
+@pytest.mark.parametrize("suffix", [".gz", ".zst"])
+def test_compressed_export_round_trips(tmp_db, tmp_path, monkeypatch, suffix):
+    db = tmp_db
+    if suffix == ".gz":
+        decompress = gzip.decompress
+    else:
+        decompress = pytest.importorskip("zstandard").ZstdDecompressor().decompressobj().decompress
+    db.insert_text(make_text(text_body=BODY, topic="Rain, again"))
+    db.insert_text(make_text(genre="Expository", topic="한글 주제"))
+    assert db.export_csv(str(tmp_path / "plain.csv")) == 2
+    # 파일이 닫혀야 압축 스트림 끝(footer/frame)이 기록된다
+    assert db.export_csv(str(tmp_path / f"out.csv{suffix}"), batch_size=1) == 2
+    plain = (tmp_path / "plain.csv").read_bytes()
+    assert decompress((tmp_path / f"out.csv{suffix}").read_bytes()) == plain
+
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "copy.db"))
+    db.init_db()
+    with io.StringIO(plain.decode("utf-8"), newline="") as f:
+        assert db.upsert_texts(csv.DictReader(f))["inserted"] == 2
+    assert db.export_csv(str(tmp_path / "again.csv")) == 2
+    assert (tmp_path / "again.csv").read_bytes() == plain
+
+
+@pytest.mark.parametrize("partition_by_band", [False, True])
+def test_parquet_round_trip(tmp_db, tmp_path, monkeypatch, partition_by_band):
+    pytest.importorskip("pyarrow")
+    db = tmp_db
+    db.insert_text(make_text(text_body=BODY, notes="첫 행"))
+    db.insert_text(make_text(lexile_band="900-1100", lexile_score=950, genre="Expository",
+                             text_body="Tides rise twice a day. The moon pulls the sea."))
+    db.insert_text(make_text(topic="Empty slot"))
+
+    def stored():
+        with db.connection() as conn:
+            return [dict(row) for row in conn.execute("SELECT * FROM reading_text ORDER BY text_id")]
+
+    before = stored()
+    path = str(tmp_path / "texts.parquet")
+    assert db.export_parquet(path, partition_by_band=partition_by_band, batch_size=2) == 3
+
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "copy.db"))
+    db.init_db()
+    assert db.import_parquet(path)["inserted"] == 3
+    assert stored() == before
+
+
+def test_export_csv_without_rows_writes_nothing(tmp_db, tmp_path):
+    assert tmp_db.export_csv(str(tmp_path / "out.csv")) == 0
+    assert not (tmp_path / "out.csv").exists()
+
+
+def test_plan_questions_skips_existing(tmp_db):
+    db = tmp_db
+    text_id = db.insert_text(make_text(lexile_band="700-900", lexile_score=800,
+                                       genre="Expository", text_body=BODY))
+    planned = {qtype for _, qtype in db.plan_questions(["MI-03", "MI-04", "DT-01"])}
+    assert planned == {"MI-03", "MI-04", "DT-01"}
+
+    db.insert_questions([{"source_text_id": text_id, "question_type": "MI-04",
+                          "question_stem": "Best title?"}])
+    assert {qtype for _, qtype in db.plan_questions(["MI-03", "MI-04", "DT-01"])} == {"MI-03", "DT-01"}
+    assert len(db.plan_questions(["MI-03", "MI-04"], skip_existing=False)) == 2
+
+
+def test_insert_questions_reports_bad_rows(tmp_db):
+    db = tmp_db
+    text_id = db.insert_text(make_text(text_body=BODY))
+    good = {"source_text_id": text_id, "question_type": "DT-01", "question_stem": "True?"}
+    stats = db.insert_questions([good, {"source_text_id": "NOPE", "question_type": "DT-01"}])
+    assert (stats["inserted"], stats["failed"]) == (1, 1)
+    assert "NOPE" in stats["errors"][0]["message"]
+
+    stats = db.insert_questions([good, {"source_text_id": text_id, "question_type": "DT-01",
+                                        "correct_answer": "B"}], chunk_size=1)
+    assert (stats["inserted"], stats["failed"]) == (1, 1)
+
+
+def test_question_bank_rows_follow_their_passage(tmp_db):
+    db = tmp_db
+    text_id = db.insert_text(make_text(text_body=BODY))
+    db.insert_questions([{"source_text_id": text_id, "question_type": "DT-01"}])
+    with db.connection() as conn:
+        conn.execute("DELETE FROM reading_text WHERE text_id = ?", (text_id,))
+        conn.commit()
+    assert db.get_question_counts() == {}
+
+
+def test_bulk_insert_leaves_caller_transaction_open(tmp_db):
+    db = tmp_db
+    with db.connection() as conn:
+        conn.execute("INSERT INTO config_genres VALUES ('DRA', 'Drama', '희곡')")
+        stats = db.bulk_insert([make_text(text_body=BODY)], conn)
+        assert stats["inserted"] == 1
+        assert conn.in_transaction
+        conn.rollback()
+    assert count(db) == 0
+
+    assert db.upsert_texts([make_text(text_body=BODY)])["inserted"] == 1
+    assert count(db) == 1
+
+
+def test_hot_queries_use_indexes(tmp_db):
+    db = tmp_db
+    scans = {entry["name"]: entry["plan"] for entry in db.query_plan_report() if entry["full_scan"]}
+    assert scans == {}
+
+
+def test_pool_reuses_per_thread_and_caps_idle(tmp_db, tmp_path):
+    pool = tmp_db.ConnectionPool(str(tmp_path / "pool.db"), max_idle=2)
+    with pool.connection() as outer, pool.connection() as inner:
+        assert inner is outer
+    with pool.connection() as again:
+        assert again is outer
+    assert (pool.opened, pool.reused) == (1, 2)
+
+    barrier = threading.Barrier(3)
+    held = []
+
+    def borrow():
+        with pool.connection() as conn:
+            held.append(conn)
+            barrier.wait()
+
+    threads = [threading.Thread(target=borrow) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len({id(conn) for conn in held}) == 3
+    assert pool.stats()["idle"] == 2 and pool.closed == 1
+    pool.close_all()
+
+
+def test_text_ids_unique_under_concurrent_writers(tmp_db):
+    db = tmp_db
+    # 단어 수가 같아야 같은 prefix(L500-NAR-005)를 두고 경쟁한다
+    bodies = iter(f"Passage number {n} ends here." for n in range(60))
+    batches = [[make_text(text_body=next(bodies)) for _ in range(15)] for _ in range(4)]
+
+    def single(rows):
+        for row in rows:
+            db.insert_text(row)
+
+    def bulk(rows):
+        assert db.bulk_insert(rows, chunk_size=5)["inserted"] == len(rows)
+
+    threads = [threading.Thread(target=single if n % 2 else bulk, args=(rows,))
+               for n, rows in enumerate(batches)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    with db.connection() as conn:
+        ids = [row[0] for row in conn.execute("SELECT text_id FROM reading_text")]
+        next_seq = conn.execute("SELECT next_seq FROM id_sequences").fetchall()
+    assert sorted(ids) == [f"L500-NAR-005-{n:03d}" for n in range(1, 61)]
+    assert [tuple(row) for row in next_seq] == [(61,)]
+
+
+def test_fulltext_index_follows_insert_update_delete(tmp_db):
+    db = tmp_db
+    with db.connection() as conn:
+        if not db.fulltext_available(conn):
+            pytest.skip("SQLite built without FTS5")
+
+    def found(word):
+        return [row["text_id"] for row in db.fulltext_search(word)]
+
+    text_id = db.insert_text(make_text(topic="Garden bees", text_body="Honeybees visit clover."))
+    assert found("honeybees") == [text_id] and found("garden") == [text_id]
+
+    db.insert_text(make_text(text_id=text_id, topic="Night sky", text_body="Owls hunt at dusk."))
+    assert found("honeybees") == [] and found("garden") == []
+    assert found("owls") == [text_id] and found("night") == [text_id]
+
+    db.fill_text_body(text_id, {"text_body": "Comets cross the dark sky."})
+    assert found("owls") == [] and found("comets") == [text_id]
+
+    with db.connection() as conn:
+        conn.execute("DELETE FROM reading_text WHERE text_id = ?", (text_id,))
+        conn.execute(f"INSERT INTO {db.FTS_TABLE} ({db.FTS_TABLE}) VALUES ('integrity-check')")
+        conn.commit()
+    assert found("comets") == [] and found("night") == []
+
+
+def test_coverage_counts_follow_writes(tmp_db):
+    db = tmp_db
+
+    def check():
+        with db.connection() as conn:
+            counts = conn.execute(
+                "SELECT lexile_band, genre, length_type, count, with_body_count "
+                "FROM coverage_counts ORDER BY 1, 2, 3"
+            ).fetchall()
+            expected = conn.execute(
+                "SELECT lexile_band, genre, length_type, COUNT(*), "
+                "SUM(text_body IS NOT NULL AND text_body != '') "
+                "FROM reading_text GROUP BY 1, 2, 3 ORDER BY 1, 2, 3"
+            ).fetchall()
+        assert [tuple(row) for row in counts] == [tuple(row) for row in expected]
+
+    slot = db.insert_text(make_text(topic="Empty slot"))
+    text_id = db.insert_text(make_text(text_body=BODY))
+    check()
+    assert (db.get_text_count(), db.get_empty_slot_count()) == (2, 1)
+
+    stats = db.upsert_texts([make_text(text_id=text_id, text_body=BODY, genre="Expository",
+                                       length_type="Medium")])
+    assert stats["updated"] == 1
+    check()
+
+    db.fill_text_body(slot, {"text_body": "The slot is filled now. It has a body."})
+    check()
+    assert db.get_empty_slot_count() == 0
+
+    with db.connection() as conn:
+        conn.execute("DELETE FROM reading_text WHERE text_id = ?", (text_id,))
+        conn.commit()
+    check()
+    assert db.get_text_count() == 1
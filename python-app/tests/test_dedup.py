@@ -0,0 +1,152 @@
+import csv
+
+import dedup
+import import_external as ie
+from conftest import make_text
+
+BODY = ("Every spring the river behind our school floods the low field, and the "
+        "whole class walks down to watch the water rise over the old stone wall.")
+
+
+OTHER = ("Plants need light, water and air to grow. Their green leaves turn sunlight into "
+         "food, and their roots pull water up from the soil after the rain.")
+
+
+def signature_ids(db):
+    with db.connection() as conn:
+        return sorted(row[0] for row in conn.execute("SELECT text_id FROM passage_signatures"))
+
+
+def test_insert_paths_write_signatures(tmp_db):
+    db = tmp_db
+    first = db.insert_text(make_text(text_body=BODY))
+    slot = db.insert_text(make_text(topic="Empty slot"))
+    assert signature_ids(db) == [first]
+    db.fill_text_body(slot, {"text_body": OTHER})
+    stats = db.bulk_insert([make_text(text_body=OTHER + " More.")])
+    assert stats["inserted"] == 1
+    assert len(signature_ids(db)) == 3
+
+
+def test_check_catches_up_on_unindexed_rows(tmp_db):
+    db = tmp_db
+    text_id = db.insert_text(make_text(text_body=BODY))
+    with db.connection() as conn:
+        conn.execute("DELETE FROM passage_signatures")
+        conn.execute("DELETE FROM lsh_buckets")
+        conn.commit()
+        index = dedup.DuplicateIndex(conn)
+        matches = index.check({"text_body": BODY.replace("Every spring", "Each spring")})
+    assert [m[0] for m in matches] == [text_id]
+
+
+def test_query_scores_exact_near_and_pending(tmp_db):
+    db = tmp_db
+    text_id = db.insert_text(make_text(text_body=BODY))
+    with db.connection() as conn:
+        index = dedup.DuplicateIndex(conn)
+        assert index.query(BODY.upper()) == [(text_id, 1.0, True)]
+        (match_id, score, exact), = index.query(BODY + " It happens every year.")
+        assert match_id == text_id and index.threshold <= score < 1.0 and not exact
+        assert index.query(OTHER) == []
+
+        assert index.check({"topic": "Plants", "text_body": OTHER}) == []
+        assert index.check({"text_body": OTHER}) == [("(pending) Plants", 1.0, True)]
+
+
+def test_flush_skips_rows_that_were_not_inserted(tmp_db):
+    db = tmp_db
+    with db.connection() as conn:
+        index = dedup.DuplicateIndex(conn)
+        index.check({"text_id": "GHOST-001", "text_body": OTHER})
+        assert index.flush() == 0
+        assert index.query(OTHER) == []
+    assert signature_ids(db) == []
+
+
+def test_rolled_back_chunk_leaves_no_signatures(tmp_db):
+    db = tmp_db
+    good = make_text(text_body=BODY)
+    bad = make_text(text_body=OTHER, lexile_score="not a number")
+    stats = db.upsert_checked([good, bad], chunk_size=1)
+    assert (stats["inserted"], stats["failed"]) == (1, 1)
+    assert signature_ids(db) == [good["text_id"]]
+    with db.connection() as conn:
+        assert dedup.DuplicateIndex(conn).query(OTHER) == []
+
+
+def test_checked_import_leaves_caller_transaction_open(tmp_db):
+    db = tmp_db
+    with db.connection() as conn:
+        conn.execute("INSERT INTO config_genres VALUES ('DRA', 'Drama', '희곡')")
+        stats = db.upsert_checked([make_text(text_body=BODY)], conn=conn)
+        assert stats["inserted"] == 1 and conn.in_transaction
+        conn.rollback()
+    assert db.get_text_count() == 0
+    assert signature_ids(db) == []
+
+
+def test_clusters_find_near_duplicates(tmp_db):
+    db = tmp_db
+    first = db.insert_text(make_text(text_body=BODY))
+    second = db.insert_text(make_text(text_body=BODY + " It happens every year."))
+    db.insert_text(make_text(text_body=OTHER))
+    with db.connection() as conn:
+        clusters = dedup.DuplicateIndex(conn).clusters()
+    assert clusters == [{"text_ids": sorted([first, second]), "exact": False}]
+
+
+def write_external_csv(path, passages):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["topic", "title", "passage"])
+        for i, passage in enumerate(passages, 1):
+            writer.writerow([i, f"Title {i}", passage])
+
+
+PASSAGES = [BODY, OTHER]
+
+
+def import_two_copies(db, tmp_path, mode):
+    first, second = tmp_path / "reading_5000.csv", tmp_path / "copy.csv"
+    write_external_csv(first, PASSAGES)
+    write_external_csv(second, PASSAGES)
+    ie.parallel_import([(str(first), 5000, "reading_5000")], workers=1)
+    return ie.parallel_import([(str(second), 5000, "copy")], workers=1, duplicates=mode)
+
+
+def notes(db):
+    with db.connection() as conn:
+        return sorted(row[0] for row in conn.execute("SELECT notes FROM reading_text"))
+
+
+def test_exact_copy_from_other_source_is_rejected(tmp_db, tmp_path):
+    db = tmp_db
+    summary = import_two_copies(db, tmp_path, "reject")
+    assert (summary["inserted"], summary["updated"], summary["duplicates"]) == (0, 0, 2)
+    assert all(note.startswith("Source: reading_5000") for note in notes(db))
+
+
+def test_exact_copy_from_other_source_is_flagged_as_new_row(tmp_db, tmp_path):
+    db = tmp_db
+    summary = import_two_copies(db, tmp_path, "flag")
+    assert (summary["inserted"], summary["updated"], summary["duplicates"]) == (2, 0, 2)
+    flagged = [note for note in notes(db) if "Duplicate of" in note]
+    assert len(flagged) == 2 and all(note.startswith("Source: copy") for note in flagged)
+
+
+def test_reimport_of_same_file_is_unchanged(tmp_db, tmp_path):
+    db = tmp_db
+    path = tmp_path / "reading_5000.csv"
+    write_external_csv(path, PASSAGES)
+    ie.parallel_import([(str(path), 5000, "reading_5000")], workers=1)
+    summary = ie.parallel_import([(str(path), 5000, "reading_5000")], workers=1, duplicates="reject")
+    assert (summary["skipped"], summary["duplicates"]) == (2, 0)
+
+
+def test_reimport_with_text_id_updates_in_place(tmp_db):
+    db = tmp_db
+    text_id = db.insert_text(make_text(text_body=BODY))
+    stats = db.upsert_checked([make_text(text_id=text_id, text_body=BODY, topic="Renamed")])
+    assert (stats["updated"], stats["duplicates"]) == (1, 0)
+    assert db.get_text(text_id)["topic"] == "Renamed"
@@ -0,0 +1,152 @@
+from types import SimpleNamespace
+
+import pytest
+
+import generator as gen
+from conftest import FakeClient
+
+
+def test_missing_age_group_uses_default():
+    slot = {"genre": "Narrative", "length_type": "Short", "lexile_band": "500-700",
+            "topic": None, "age_group": None}
+    assert "Middle School" in gen.slot_prompt(slot)
+    record = gen.build_text_record(slot, {"text_body": "A short body.", "word_count": 3,
+                                          "sentence_count": 1})
+    assert record["age_group"] == "Middle School"
+
+
+def slots(n):
+    return [{"genre": "Narrative", "length_type": "Short", "lexile_band": "500-700",
+             "topic": f"Topic {i}"} for i in range(n)]
+
+
+def test_progress_reports_slot_index():
+    seen = {}
+    results = gen.batch_generate(
+        slots(6), client=FakeClient(), use_cache=False, max_workers=3,
+        on_progress=lambda i, total, outcome: seen.setdefault(i, outcome),
+    )
+    assert sorted(seen) == [1, 2, 3, 4, 5, 6]
+    for i, (slot, result, error) in enumerate(results, start=1):
+        assert error is None
+        assert seen[i] is result
+        assert slot["topic"] in result["text_body"]
+
+
+def test_bad_slot_fails_alone():
+    batch = slots(3)
+    del batch[1]["genre"]
+    results = gen.batch_generate(batch, client=FakeClient(), use_cache=False)
+    assert [error is None for _, _, error in results] == [True, False, True]
+    assert "genre" in results[1][2]
+
+
+def test_client_error_reported_per_slot(monkeypatch):
+    def no_client(api_key=None):
+        raise RuntimeError("API 키가 필요합니다.")
+
+    monkeypatch.setattr(gen, "get_client", no_client)
+    outcomes = []
+    results = gen.batch_generate(slots(2), use_cache=False,
+                                 on_progress=lambda i, total, outcome: outcomes.append(outcome))
+    assert [error for _, _, error in results] == ["API 키가 필요합니다."] * 2
+    assert outcomes == ["API 키가 필요합니다."] * 2
+
+
+def test_failing_client_reports_error():
+    results = gen.batch_generate(slots(2), client=FakeClient(fail=True), use_cache=False)
+    assert all(result is None and error == "model unavailable" for _, result, error in results)
+
+
+def test_generate_text_skips_cache_unless_asked(tmp_path, monkeypatch):
+    monkeypatch.setattr(gen, "_cache", gen.ResponseCache(str(tmp_path / "cache.db")))
+    client = FakeClient()
+    args = ("Narrative", "Short", "500-700", "A rainy day", "Middle School")
+    gen.generate_text(*args, client=client)
+    gen.generate_text(*args, client=client)
+    assert client.calls == 2
+
+    gen.generate_text(*args, client=client, use_cache=True)
+    gen.generate_text(*args, client=client, use_cache=True)
+    assert client.calls == 3
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_rate_limiter_waits_for_requests_and_tokens():
+    clock = FakeClock()
+    limiter = gen.RateLimiter(requests_per_minute=2, tokens_per_minute=1000,
+                              clock=clock, sleep=clock.sleep)
+    limiter.acquire(100)
+    limiter.acquire(100)
+    assert clock.sleeps == []
+    limiter.acquire(100)  # 요청 버킷이 비어 1개가 찰 때까지 (30s)
+    assert clock.now == 30.0
+
+    limiter = gen.RateLimiter(requests_per_minute=100, tokens_per_minute=1000,
+                              clock=clock, sleep=clock.sleep)
+    start = clock.now
+    limiter.acquire(600)
+    limiter.acquire(600)  # 토큰 200개 부족 -> 12s
+    assert clock.now - start == 12.0
+
+
+class ApiError(Exception):
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        headers = {"retry-after": retry_after} if retry_after else {}
+        self.response = SimpleNamespace(headers=headers)
+
+
+class FlakyClient(FakeClient):
+    def __init__(self, errors):
+        super().__init__()
+        self.errors = list(errors)
+
+    def create(self, model, max_tokens, messages):
+        if self.errors:
+            self.calls += 1
+            raise self.errors.pop(0)
+        return super().create(model, max_tokens, messages)
+
+
+def test_retry_backs_off_then_succeeds():
+    prompt = gen.slot_prompt(slots(1)[0])
+    client = FlakyClient([ApiError(429, retry_after="7"), ApiError(503)])
+    delays = []
+    result = gen.generate_with_retry(client, prompt, max_retries=3, sleep=delays.append)
+    assert "Topic 0" in result["text_body"]
+    assert client.calls == 3
+    assert delays[0] == 7.0
+    assert 0 <= delays[1] <= gen.RETRY_BASE_DELAY * 2
+
+
+def test_retry_gives_up_on_client_errors_and_after_max_retries():
+    prompt = gen.slot_prompt(slots(1)[0])
+    delays = []
+    with pytest.raises(ApiError, match="400"):
+        gen.generate_with_retry(FlakyClient([ApiError(400)]), prompt, sleep=delays.append)
+    assert delays == []
+
+    client = FlakyClient([ApiError(500)] * 3)
+    with pytest.raises(ApiError, match="500"):
+        gen.generate_with_retry(client, prompt, max_retries=2, sleep=delays.append)
+    assert client.calls == 3 and len(delays) == 2
+
+
+def test_retry_delay_is_capped():
+    for attempt in range(12):
+        assert 0 <= gen.retry_delay(ApiError(500), attempt) <= gen.RETRY_MAX_DELAY
+    assert gen.retry_delay(ApiError(429, retry_after="9999"), 0) == gen.RETRY_MAX_DELAY
@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+import llm_batch
+from conftest import make_text
+
+BODY = "Bees carry pollen from flower to flower. Without them many fruits would not grow."
+
+
+def test_questions_are_deleted_with_their_passage(tmp_db):
+    db = tmp_db
+    text_id = db.insert_text(make_text(text_body=BODY))
+    rows = [db.get_text(text_id)]
+    summary = llm_batch.run_batches(rows, ["comprehension"], llm_batch.StubBatchClient(),
+                                    sleep=lambda seconds: None)
+    assert summary["succeeded"] == 1
+    assert llm_batch.get_questions(text_id)
+
+    with db.connection() as conn:
+        conn.execute("DELETE FROM reading_text WHERE text_id = ?", (text_id,))
+        conn.commit()
+    assert llm_batch.get_questions(text_id) == []
+
+
+def csat_reply(request):
+    return json.dumps({"questions": [
+        {"type": "주제", "question": "What is the main topic?",
+         "choices": ["①a", "②b", "③c", "④d", "⑤e"], "answer": "③", "explanation": "..."},
+    ]})
+
+
+def test_batch_questions_go_to_question_bank(tmp_db):
+    db = tmp_db
+    text_id = db.insert_text(make_text(lexile_band="700-900", lexile_score=800,
+                                       genre="Expository", text_body=BODY))
+    client = llm_batch.StubBatchClient(csat_reply)
+    batch_id, = llm_batch.submit_batches([db.get_text(text_id)], ["csat_style"], client)
+    for _ in range(2):  # 다시 collect해도 문항은 그대로
+        llm_batch.wait_for_batch(batch_id, client, sleep=lambda seconds: None)
+        assert llm_batch.collect_results(batch_id, client)["questions"] == 1
+
+    question, = db.query_questions(text_id)
+    assert (question["question_type"], question["question_type_name"]) == ("MI-03", "주제")
+    assert (question["choice_3"], question["correct_answer"]) == ("③c", 3)
+    assert question["batch_id"] == batch_id
+    assert (text_id, "MI-03") not in db.plan_questions(["MI-03", "MI-04"])
+
+
+def test_submit_batches_dedupes_requests(tmp_db):
+    db = tmp_db
+    row = db.get_text(db.insert_text(make_text(text_body=BODY)))
+    client = llm_batch.StubBatchClient()
+    batch_id, = llm_batch.submit_batches([row, row], ["comprehension"], client)
+    assert len(client._batches[batch_id]["requests"]) == 1
+    with db.connection() as conn:
+        assert conn.execute("SELECT total FROM llm_batches").fetchone()[0] == 1
+
+
+def test_submit_batches_checks_custom_id_before_submit(tmp_db):
+    db = tmp_db
+    row = db.get_text(db.insert_text(make_text(text_body=BODY)))
+    row = {**dict(row), "text_id": "bad id/" + "x" * 64}
+    client = llm_batch.StubBatchClient()
+    with pytest.raises(ValueError, match="custom_id"):
+        llm_batch.submit_batches([row], ["comprehension"], client)
+    assert client._batches == {}
+
+
+def test_csat_labels_map_to_type_codes(tmp_db):
+    db = tmp_db
+    text_id = db.insert_text(make_text(lexile_band="900-1100", lexile_score=1000, genre="Expository",
+                                       length_type="Medium", text_body=BODY))
+    assert {"IF-02", "ST-03"} <= {qtype for _, qtype in db.plan_questions()}
+
+    def reply(request):
+        return json.dumps({"questions": [
+            {"type": "빈칸추론", "question": "Fill in the blank.", "answer": "②"},
+            {"type": "순서 배열", "question": "Order the sentences.", "answer": "⑤"},
+            {"type": "요지", "question": "Main point?", "answer": "①"},
+        ]})
+
+    llm_batch.run_batches([db.get_text(text_id)], ["csat_style"], llm_batch.StubBatchClient(reply),
+                          sleep=lambda seconds: None)
+    assert db.get_question_counts() == {"IF-02": 1, "ST-03": 1, "MI-02": 1}
+    planned = {qtype for _, qtype in db.plan_questions()}
+    assert planned.isdisjoint({"IF-02", "ST-03", "MI-02"}) and planned
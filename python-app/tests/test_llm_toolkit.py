@@ -0,0 +1,31 @@
+import sqlite3
+
+import llm_toolkit as lt
+
+ROW = {"text_id": "T1", "lexile_score": 650, "lexile_band": "500-700", "genre": "Narrative",
+       "topic": "A rainy day", "text_body": "It rained.", "vocabulary_band": "A2",
+       "age_group": "Middle School", "length_type": "Short"}
+
+
+def test_summary_without_word_count_column():
+    prompt = lt.build_prompt(ROW, "summary", word_count=90)
+    assert "about 33 words" in prompt
+
+
+def test_summary_length_from_sqlite_row():
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    row = conn.execute("SELECT 150 AS word_count").fetchone()
+    assert lt.summary_length(row) == 50
+    assert lt.summary_length({"word_count": None}) == 33
+    assert lt.summary_length({}) == 33
+
+
+def test_band_age_groups_follow_config_version(tmp_db):
+    db = tmp_db
+    assert lt.band_age_groups()["900-1100"] == "Upper Secondary"
+    with db.connection() as conn:
+        conn.execute("UPDATE config_bands SET age_group = 'Grade 9' WHERE band = '900-1100'")
+        conn.commit()
+    db.config_changed()
+    assert lt.band_age_groups()["900-1100"] == "Grade 9"
@@ -0,0 +1,27 @@
+import pipeline
+
+
+def test_dedupe_passes_empty_bodies_through():
+    rows = [
+        {"text_id": "A", "text_body": "Same words here."},
+        {"text_id": "B", "text_body": "same  words here."},
+        {"text_id": "C", "text_body": ""},
+        {"text_id": "D", "text_body": None},
+        {"text_id": "E"},
+    ]
+    dropped = []
+    kept = pipeline.pipe(rows, pipeline.dedupe(on_duplicate=dropped.append))
+    assert [r["text_id"] for r in kept] == ["A", "C", "D", "E"]
+    assert [r["text_id"] for r in dropped] == ["B"]
+
+
+def test_classify_fills_missing_genre_only():
+    rows = [
+        {"topic": "My trip", "text_body": "Yesterday I went to the beach with my family.",
+         "genre": ""},
+        {"topic": "Volcanoes", "text_body": "A volcano is an opening in the crust.",
+         "genre": "Expository"},
+    ]
+    out = list(pipeline.pipe(rows, pipeline.classify()))
+    assert out[0]["genre"]
+    assert out[1]["genre"] == "Expository"
@@ -0,0 +1,26 @@
+import text_stats
+
+PASSAGES = [
+    "The cat sat. The dog ran! Did the bird sing?",
+    "",
+    None,
+    "Reading makes a table stable",
+    "One sentence without a stop",
+]
+
+
+def test_batch_matches_single_passages():
+    columns = text_stats.analyze_batch(PASSAGES)
+    for i, passage in enumerate(PASSAGES):
+        words = (passage or "").split()
+        stats = text_stats.row(columns, i)
+        assert stats["word_count"] == len(words)
+        assert stats["char_count"] == sum(len(w) for w in words)
+        assert stats["syllable_count"] == sum(text_stats.count_syllables(w) for w in words)
+    assert list(columns["sentence_count"]) == [3, 0, 0, 1, 1]
+
+
+def test_list_fallback_matches_numpy(monkeypatch):
+    expected = {k: list(v) for k, v in text_stats.analyze_batch(PASSAGES).items()}
+    monkeypatch.setattr(text_stats, "np", None)
+    assert text_stats.analyze_batch(PASSAGES) == expected
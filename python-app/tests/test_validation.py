@@ -0,0 +1,57 @@
+import validation as val
+from conftest import make_text
+
+
+def test_validate_row_without_database(tmp_path, monkeypatch):
+    monkeypatch.setattr(val.db, "DB_PATH", str(tmp_path / "missing.db"))
+    assert val.get_config() == val.default_config()
+    errors = val.validate_row(make_text(genre="Poetry", lexile_score=1200))
+    assert {e["type"] for e in errors} >= {"INVALID_GENRE", "SCORE_OUT_OF_BAND"}
+
+
+def test_config_reloaded_after_changes(tmp_db):
+    db = tmp_db
+    assert "Drama" not in val.get_config()["genres"]
+    with db.connection() as conn:
+        conn.execute("INSERT INTO config_genres VALUES ('DRA', 'Drama', '희곡')")
+        conn.commit()
+    db.config_changed()
+    assert "Drama" in val.get_config()["genres"]
+    assert val.validate_row(make_text(genre="Drama")) == []
+
+
+def test_incremental_revalidates_rows_changed_behind_triggers(tmp_db):
+    db = tmp_db
+    text_id = db.insert_text(make_text(genre="Poetry"))
+    db.insert_text(make_text(topic="Clean"))
+    first = val.validate_incremental()
+    assert first["validated"] == 2
+    assert [e["type"] for e in first["results"][text_id]] == ["INVALID_GENRE"]
+
+    with db.connection() as conn:
+        conn.execute("DROP TRIGGER validation_state_au")
+        conn.execute("UPDATE reading_text SET genre = 'Narrative' WHERE text_id = ?", (text_id,))
+        conn.commit()
+
+    second = val.validate_incremental()
+    assert (second["validated"], second["cached"]) == (1, 1)
+    assert second["results"] == {}
+    assert val.validate_incremental()["validated"] == 0
+
+
+def test_validate_all_consumes_rows_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(val.db, "DB_PATH", str(tmp_path / "missing.db"))
+    rows = (make_text(text_id=f"T{i}", genre="Poetry" if i % 3 == 0 else "Narrative")
+            for i in range(10))
+    errors = val.validate_all(rows, batch_size=4)
+    assert sorted(errors) == ["T0", "T3", "T6", "T9"]
+
+
+def test_rules_hash_tracks_registry_not_source(tmp_db, monkeypatch):
+    before = val.rules_hash()
+    assert val.rules_hash() == before
+    monkeypatch.setattr(val.RULES[0], "severity", "warning")
+    changed = val.rules_hash()
+    assert changed != before
+    monkeypatch.setattr(val, "RULES_VERSION", val.RULES_VERSION + 1)
+    assert val.rules_hash() != changed
@@ -0,0 +1,138 @@
+"""
+Lexile Reading Text DB - Text Statistics Module
+지문을 한 번만 토큰화하여 단어 수, 문장 수, 평균 문장 길이, 평균 단어 길이,
+음절 추정치를 계산한다. 여러 지문을 한 번에 처리하면 열(column) 단위 결과를 돌려준다.
+
+importer(import_external), inserter(database), validator(validation)가
+모두 이 모듈의 결과를 사용한다.
+"""
+import hashlib
+import re
+
+try:
+    import numpy as np
+except ImportError:  # numpy가 없으면 list 기반으로 동작
+    np = None
+
+# 구분자(. ! ?) 사이에 공백이 아닌 글자가 있는 구간 = 문장 1개
+_SENTENCE_RE = re.compile(r"[^.!?\s][^.!?]*")
+_VOWEL_GROUP_RE = re.compile(r"[aeiouy]+")
+_NON_ALPHA_RE = re.compile(r"[^a-z]")
+
+COLUMNS = [
+    "word_count",
+    "sentence_count",
+    "char_count",
+    "syllable_count",
+    "avg_sentence_length",
+    "avg_word_length",
+    "avg_syllables_per_word",
+]
+
+
+def count_syllables(word):
+    """Vowel-group estimate: 'reading' -> 2, 'make' -> 1 (silent e)."""
+    word = _NON_ALPHA_RE.sub("", word.lower())
+    if not word:
+        return 0
+    count = len(_VOWEL_GROUP_RE.findall(word))
+    if word.endswith("e") and not word.endswith("le") and count > 1:
+        count -= 1
+    return max(count, 1)
+
+
+def count_words(text_body):
+    """Whitespace word count (same definition as analyze()["word_count"])."""
+    return len(text_body.split()) if text_body else 0
+
+
+def _syllable_table(words):
+    """count_syllables() once per distinct word of the batch."""
+    return {w: count_syllables(w) for w in set(words)}
+
+
+def analyze_batch(passages):
+    """Compute statistics for many passages at once.
+
+    Every passage is split once into one flat token list for the whole
+    batch; syllables are estimated once per distinct word, and the
+    per-passage char/syllable totals are segment sums over the token
+    arrays (np.bincount). Sentences are counted with one regex pass per
+    passage. Returns a dict of columns (numpy arrays when numpy is
+    installed, lists otherwise), one entry per passage, keyed by COLUMNS.
+    Averages guard against empty passages by dividing by max(count, 1).
+    """
+    passages = [p or "" for p in passages]
+    tokens = [p.split() for p in passages]
+    sentences = [len(_SENTENCE_RE.findall(p)) if p else 0 for p in passages]
+    flat = [w for words in tokens for w in words]
+    syllable_table = _syllable_table(flat)
+
+    if np is not None:
+        n = len(passages)
+        words = np.fromiter(map(len, tokens), dtype=np.int64, count=n)
+        owner = np.repeat(np.arange(n), words)
+        lengths = np.fromiter(map(len, flat), dtype=np.int64, count=len(flat))
+        per_word = np.fromiter(map(syllable_table.__getitem__, flat), dtype=np.int64,
+                               count=len(flat))
+        chars = np.bincount(owner, weights=lengths, minlength=n).astype(np.int64)
+        syllables = np.bincount(owner, weights=per_word, minlength=n).astype(np.int64)
+        sentences = np.array(sentences, dtype=np.int64)
+        word_div = np.maximum(words, 1)
+        return {
+            "word_count": words,
+            "sentence_count": sentences,
+            "char_count": chars,
+            "syllable_count": syllables,
+            "avg_sentence_length": words / np.maximum(sentences, 1),
+            "avg_word_length": chars / word_div,
+            "avg_syllables_per_word": syllables / word_div,
+        }
+
+    words = [len(t) for t in tokens]
+    chars = [sum(map(len, t)) for t in tokens]
+    syllables = [sum(map(syllable_table.__getitem__, t)) for t in tokens]
+    return {
+        "word_count": words,
+        "sentence_count": sentences,
+        "char_count": chars,
+        "syllable_count": syllables,
+        "avg_sentence_length": [w / max(s, 1) for w, s in zip(words, sentences)],
+        "avg_word_length": [c / max(w, 1) for c, w in zip(chars, words)],
+        "avg_syllables_per_word": [s / max(w, 1) for s, w in zip(syllables, words)],
+    }
+
+
+def row(columns, i):
+    """Pull passage i out of an analyze_batch() result as a plain dict."""
+    out = {}
+    for name in COLUMNS:
+        value = columns[name][i]
+        out[name] = value.item() if hasattr(value, "item") else value
+    return out
+
+
+def analyze(text_body):
+    """Statistics for a single passage (dict keyed by COLUMNS)."""
+    return row(analyze_batch([text_body]), 0)
+
+
+def db_stats(stats):
+    """(word_count, sentence_count, avg_sentence_length) as stored in reading_text."""
+    wc = stats["word_count"]
+    sc = stats["sentence_count"]
+    avg = round(stats["avg_sentence_length"], 1) if sc > 0 else 0.0
+    return wc, sc, avg
+
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_text(text_body):
+    """Lowercase and collapse whitespace, so formatting-only edits compare equal."""
+    return _WS_RE.sub(" ", (text_body or "").lower()).strip()
+
+
+def content_hash(text_body):
+    """sha1 of the normalized passage body (hex)."""
+    return hashlib.sha1(normalize_text(text_body).encode("utf-8")).hexdigest()
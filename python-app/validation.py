@@ -1,105 +1,570 @@
 """
 Lexile Reading Text DB - Data Validation Module
+
+검증 규칙은 RULES 레지스트리에 선언한다. 각 규칙은 읽는 컬럼(inputs),
+심각도(severity), 컬럼 단위 검사 함수, 선택적으로 SQL 식을 가진다.
+band/길이 범위와 장르 목록은 config_bands / config_lengths / config_genres
+테이블에서 읽고, compile_plan()이 한 번 묶어 둔 RulePlan으로 실행한다.
 """
+import hashlib
+import json
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 
-BAND_RANGES = {
-    "100-300": (100, 300),
-    "300-500": (300, 500),
-    "500-700": (500, 700),
-    "700-900": (700, 900),
-    "900-1100": (900, 1100),
-    "1100-1300": (1100, 1300),
-    "1300-1500": (1300, 1500),
-}
-
-LENGTH_RANGES = {
-    "Micro": (40, 60),
-    "Short": (80, 120),
-    "Medium": (170, 230),
-    "Long": (280, 420),
-}
-
-VALID_GENRES = ["Narrative", "Expository", "Informational", "Argumentative", "Procedural", "Literary"]
-VALID_LENGTH_TYPES = ["Micro", "Short", "Medium", "Long"]
-
-
-def validate_row(row):
-    """Validate a single row of data. Returns list of error dicts."""
-    errors = []
-
-    band = row.get("lexile_band", "")
-    score = row.get("lexile_score")
-    genre = row.get("genre", "")
-    length_type = row.get("length_type", "")
-    word_count = row.get("word_count")
-    text_body = row.get("text_body", "")
-
-    # Required fields
-    for field in ["lexile_band", "lexile_score", "genre", "length_type"]:
-        val = row.get(field)
-        if not val and val != 0:
-            errors.append({
-                "field": field,
-                "type": "MISSING_REQUIRED",
-                "message": f"{field} 필수 입력",
-            })
+import database as db
+import text_stats
 
-    # Lexile score in band range
-    if band and score and band in BAND_RANGES:
-        lo, hi = BAND_RANGES[band]
-        if not (lo <= int(score) <= hi):
-            errors.append({
-                "field": "lexile_score",
-                "type": "SCORE_OUT_OF_BAND",
-                "message": f"Lexile {score}이 band {band} 범위({lo}-{hi})를 벗어남",
-            })
+try:
+    import numpy as np
+except ImportError:  # numpy가 없으면 list 기반 범위 검사
+    np = None
 
-    # Genre validity
-    if genre and genre not in VALID_GENRES:
-        errors.append({
-            "field": "genre",
-            "type": "INVALID_GENRE",
-            "message": f"유효하지 않은 장르: {genre}",
-        })
-
-    # Length type validity
-    if length_type and length_type not in VALID_LENGTH_TYPES:
-        errors.append({
-            "field": "length_type",
-            "type": "INVALID_LENGTH_TYPE",
-            "message": f"유효하지 않은 길이 유형: {length_type}",
-        })
-
-    # Word count matches length type
-    if word_count and length_type and length_type in LENGTH_RANGES:
-        lo, hi = LENGTH_RANGES[length_type]
-        if not (lo <= int(word_count) <= hi):
-            errors.append({
-                "field": "word_count",
-                "type": "LENGTH_MISMATCH",
-                "message": f"단어 수 {word_count}가 {length_type}({lo}-{hi}) 범위에 맞지 않음",
-            })
+REQUIRED_FIELDS = ["lexile_band", "lexile_score", "genre", "length_type"]
+WORD_COUNT_TOLERANCE = 10
 
-    # Text body word count check
-    if text_body and word_count:
-        actual = len(text_body.strip().split())
-        if abs(actual - int(word_count)) > 10:
-            errors.append({
-                "field": "text_body",
-                "type": "WORD_COUNT_MISMATCH",
-                "message": f"실제 단어 수({actual})와 word_count({word_count}) 불일치",
-            })
+VALIDATION_WORKERS = 1
+# 규칙의 검사 로직을 바꾸면 올린다 (validation_state 캐시 무효화, rules_hash 참고)
+RULES_VERSION = 1
+_PARALLEL_MIN_BODIES = 2000  # 이보다 적으면 프로세스 풀 오버헤드가 더 큼
+VALIDATION_BATCH_SIZE = 5000  # validate_all()이 한 번에 메모리에 올리는 행 수
+
+
+# ==================== Rule config ====================
+
+def _parse_range(text):
+    """'170-230' -> (170, 230); None if the text isn't a range."""
+    lo, sep, hi = (text or "").partition("-")
+    if not sep or not lo.strip().isdigit() or not hi.strip().isdigit():
+        return None
+    return int(lo), int(hi)
+
+
+def _build_config(bands, lengths, genres):
+    """bands: [band], lengths: [(type, word_range)] by target words, genres: [name]."""
+    band_ranges = {band: _parse_range(band) for band in bands}
+    length_ranges = {kind: _parse_range(word_range) for kind, word_range in lengths}
+    return {
+        "band_ranges": {k: v for k, v in band_ranges.items() if v},
+        "length_ranges": {k: v for k, v in length_ranges.items() if v},
+        "genres": sorted(genres),
+        "length_types": [kind for kind, _ in lengths],
+        "word_count_tolerance": WORD_COUNT_TOLERANCE,
+    }
+
+
+def load_config(conn=None):
+    """Read rule parameters from the config_* tables."""
+    with db.connection(conn) as conn:
+        bands = conn.execute("SELECT band FROM config_bands ORDER BY band").fetchall()
+        lengths = conn.execute(
+            "SELECT type, word_range FROM config_lengths ORDER BY target_words"
+        ).fetchall()
+        genres = conn.execute("SELECT name FROM config_genres ORDER BY code").fetchall()
+
+    return _build_config(
+        [row[0] for row in bands], [(row[0], row[1]) for row in lengths], [row[0] for row in genres]
+    )
+
+
+def default_config():
+    """Rule parameters from the defaults in database.py (what init_db seeds)."""
+    lengths = sorted(db.LENGTH_TYPES, key=lambda length: length[1])
+    return _build_config(
+        sorted(band[0] for band in db.LEXILE_BANDS),
+        [(kind, word_range) for kind, _, word_range, _ in lengths],
+        [genre[1] for genre in db.GENRES],
+    )
+
+
+_config = None
+_config_version = None
+
+
+def get_config(reload=False):
+    """Cached load_config() for callers that validate row by row.
+
+    Reloaded after init_db()/config writes (database.config_version());
+    falls back to default_config() when the DB has no config tables.
+    """
+    global _config, _config_version
+    version = db.config_version()
+    if _config is None or reload or version != _config_version:
+        try:
+            _config = load_config()
+        except sqlite3.Error:
+            _config = default_config()
+        _config_version = version
+    return _config
+
+
+# ==================== Rule registry ====================
+
+class Rule:
+    """A declared validation check.
+
+    check(cols, config) returns the indexes of failing rows; message(record,
+    config) formats the error. inputs are the columns the rule reads -- the
+    plan drops the rule when a batch doesn't carry them. sql(config, params),
+    if given, is an SQL expression that is true for failing rows.
+    """
+
+    def __init__(self, name, error_type, field, inputs, severity, check, message, sql=None):
+        self.name = name
+        self.error_type = error_type
+        self.field = field
+        self.inputs = tuple(inputs)
+        self.severity = severity
+        self.check = check
+        self.message = message
+        self.sql = sql
+
+    def error(self, record, config):
+        return {"field": self.field, "type": self.error_type,
+                "message": self.message(record, config)}
+
+
+RULES = []
+
+
+def rule(name, error_type, field, inputs=(), severity="error", message=None, sql=None):
+    """Decorator: register a column check in RULES (order = report order)."""
+    def register(check):
+        RULES.append(Rule(name, error_type, field, inputs, severity, check, message, sql))
+        return check
+    return register
+
+
+def severity_of(error_type):
+    for r in RULES:
+        if r.error_type == error_type:
+            return r.severity
+    return "error"
+
+
+def _number(value):
+    """int value, or None when absent/zero (0 counts as unset, like the sheet)."""
+    if value in (None, ""):
+        return None
+    return int(value) or None
+
+
+def _out_of_range(values, bounds):
+    """Indexes whose value is set, has known bounds, and falls outside them."""
+    if np is not None:
+        v = np.array([x if x is not None else np.nan for x in values], dtype=float)
+        lo = np.array([b[0] if b else np.nan for b in bounds], dtype=float)
+        hi = np.array([b[1] if b else np.nan for b in bounds], dtype=float)
+        with np.errstate(invalid="ignore"):
+            return set(np.flatnonzero((v < lo) | (v > hi)).tolist())
+    return {
+        i for i, (x, b) in enumerate(zip(values, bounds))
+        if x is not None and b and not (b[0] <= x <= b[1])
+    }
+
+
+def _word_counts(bodies, workers=VALIDATION_WORKERS):
+    """Whitespace word counts, fanned out over a process pool for big batches."""
+    if workers > 1 and len(bodies) >= _PARALLEL_MIN_BODIES:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunk = max(len(bodies) // (workers * 4), 1)
+            return list(pool.map(text_stats.count_words, bodies, chunksize=chunk))
+    return [text_stats.count_words(b) for b in bodies]
+
+
+def _in_case(value, key, ranges, params):
+    """SQL: CASE key WHEN name THEN value NOT BETWEEN lo AND hi ... END."""
+    if not ranges:
+        return "0"
+    whens = []
+    for name, (lo, hi) in ranges.items():
+        whens.append(f"WHEN ? THEN {value} NOT BETWEEN ? AND ?")
+        params.extend([name, lo, hi])
+    return f"CASE {key} {' '.join(whens)} ELSE 0 END"
+
+
+def _not_in(column, values, params):
+    params.extend(values)
+    return f"{column} != '' AND {column} NOT IN ({', '.join('?' * len(values))})"
+
+
+def _register_required(field):
+    rule(
+        f"missing_{field}", "MISSING_REQUIRED", field,
+        message=lambda record, config: f"{field} 필수 입력",
+        sql=lambda config, params: f"({field} IS NULL OR {field} = '')",
+    )(lambda cols, config: {
+        i for i, v in enumerate(cols[field]) if not v and v != 0
+    })
+
+
+# 필수 필드는 컬럼이 없어도(=전부 누락) 검사하므로 inputs 없음
+for _field in REQUIRED_FIELDS:
+    _register_required(_field)
+
+
+@rule(
+    "score_out_of_band", "SCORE_OUT_OF_BAND", "lexile_score",
+    inputs=["lexile_band", "lexile_score"],
+    message=lambda r, c: (
+        f"Lexile {r['lexile_score']}이 band {r['lexile_band']} 범위"
+        f"({c['band_ranges'][r['lexile_band']][0]}-{c['band_ranges'][r['lexile_band']][1]})를 벗어남"
+    ),
+    sql=lambda c, params: (
+        f"lexile_score AND lexile_band != '' AND "
+        f"{_in_case('lexile_score', 'lexile_band', c['band_ranges'], params)}"
+    ),
+)
+def _score_out_of_band(cols, config):
+    ranges = config["band_ranges"]
+    return _out_of_range(cols.numbers("lexile_score"),
+                         [ranges.get(b) if b else None for b in cols["lexile_band"]])
+
+
+@rule(
+    "invalid_genre", "INVALID_GENRE", "genre", inputs=["genre"],
+    message=lambda r, c: f"유효하지 않은 장르: {r['genre']}",
+    sql=lambda c, params: _not_in("genre", c["genres"], params),
+)
+def _invalid_genre(cols, config):
+    valid = set(config["genres"])
+    return {i for i, g in enumerate(cols["genre"]) if g and g not in valid}
+
+
+@rule(
+    "invalid_length_type", "INVALID_LENGTH_TYPE", "length_type", inputs=["length_type"],
+    message=lambda r, c: f"유효하지 않은 길이 유형: {r['length_type']}",
+    sql=lambda c, params: _not_in("length_type", c["length_types"], params),
+)
+def _invalid_length_type(cols, config):
+    valid = set(config["length_types"])
+    return {i for i, lt in enumerate(cols["length_type"]) if lt and lt not in valid}
+
+
+@rule(
+    "length_mismatch", "LENGTH_MISMATCH", "word_count",
+    inputs=["word_count", "length_type"],
+    message=lambda r, c: (
+        f"단어 수 {r['word_count']}가 {r['length_type']}"
+        f"({c['length_ranges'][r['length_type']][0]}-{c['length_ranges'][r['length_type']][1]}) "
+        f"범위에 맞지 않음"
+    ),
+    sql=lambda c, params: (
+        f"word_count AND length_type != '' AND "
+        f"{_in_case('word_count', 'length_type', c['length_ranges'], params)}"
+    ),
+)
+def _length_mismatch(cols, config):
+    ranges = config["length_ranges"]
+    return _out_of_range(cols.numbers("word_count"),
+                         [ranges.get(lt) if lt else None for lt in cols["length_type"]])
 
-    return errors
 
+@rule(
+    "word_count_mismatch", "WORD_COUNT_MISMATCH", "text_body",
+    inputs=["text_body", "word_count"], severity="warning",
+    message=lambda r, c: f"실제 단어 수({r['actual_words']})와 word_count({r['word_count']}) 불일치",
+)
+def _word_count_mismatch(cols, config):
+    """Only rows with both a body and a word_count are tokenized (split only)."""
+    words = cols.numbers("word_count")
+    todo = [i for i, body in enumerate(cols["text_body"]) if body and words[i]]
+    todo_missing = [i for i in todo if "actual_words" not in cols.records[i]]
+    counts = _word_counts([cols.records[i]["text_body"] for i in todo_missing], cols.workers)
+    for i, actual in zip(todo_missing, counts):
+        cols.records[i]["actual_words"] = actual
+    tolerance = config["word_count_tolerance"]
+    return {i for i in todo if abs(cols.records[i]["actual_words"] - words[i]) > tolerance}
+
+
+# ==================== Compiled plan ====================
+
+class Columns:
+    """Lazy column view over a list of record dicts."""
+
+    def __init__(self, records, workers=VALIDATION_WORKERS):
+        self.records = records
+        self.workers = workers
+        self._cache = {}
+
+    def __getitem__(self, name):
+        if name not in self._cache:
+            self._cache[name] = [r.get(name) for r in self.records]
+        return self._cache[name]
+
+    def numbers(self, name):
+        key = ("number", name)
+        if key not in self._cache:
+            self._cache[key] = [_number(v) for v in self[name]]
+        return self._cache[key]
+
+
+class RulePlan:
+    """RULES bound to a config and a set of available columns.
+
+    Rules whose inputs the batch doesn't have are dropped at compile time.
+    timings / failures accumulate per rule across run() calls.
+    """
+
+    def __init__(self, config, columns=None):
+        self.config = config
+        available = set(columns) if columns is not None else None
+        self.rules = [
+            r for r in RULES
+            if available is None or all(col in available for col in r.inputs)
+        ]
+        self.skipped = [r.name for r in RULES if r not in self.rules]
+        self.timings = {r.name: 0.0 for r in self.rules}
+        self.failures = {r.name: 0 for r in self.rules}
+        self.rows = 0
+
+    def _timed(self, r, fn):
+        started = time.perf_counter()
+        result = fn()
+        self.timings[r.name] += time.perf_counter() - started
+        self.failures[r.name] += len(result)
+        return result
+
+    def run(self, records, workers=VALIDATION_WORKERS, presets=None):
+        """{text_id: errors} for records; presets: rule name -> failing indexes
+        already computed elsewhere (SQL pushdown)."""
+        presets = presets or {}
+        cols = Columns(records, workers)
+        flags = {}
+        for r in self.rules:
+            if r.name in presets:
+                flags[r.name] = presets[r.name]
+            else:
+                flags[r.name] = self._timed(r, lambda: r.check(cols, self.config))
+        self.rows += len(records)
+
+        results = {}
+        for i in sorted(set().union(*flags.values())):
+            record = records[i]
+            results[record.get("text_id") or "unknown"] = [
+                r.error(record, self.config) for r in self.rules if i in flags[r.name]
+            ]
+        return results
+
+    def report(self):
+        """Per-rule timing, slowest first: [(name, seconds, failures)]."""
+        return sorted(
+            ((name, self.timings[name], self.failures[name]) for name in self.timings),
+            key=lambda item: -item[1],
+        )
+
+
+def compile_plan(config=None, columns=None):
+    return RulePlan(config or get_config(), columns)
+
+
+# ==================== Entry points ====================
+
+def validate_row(row, stats=None, plan=None):
+    """Validate a single row of data. Returns list of error dicts.
+    stats: precomputed text_stats result for the row's text_body."""
+    record = dict(row)
+    if stats is not None:
+        record["actual_words"] = stats["word_count"]
+    plan = plan or compile_plan()
+    return next(iter(plan.run([record]).values()), [])
+
+
+def validate_batch(rows, workers=VALIDATION_WORKERS, plan=None):
+    """Columnar validation of many rows; returns {text_id: errors}.
+
+    Range/enum checks run as array passes over whole columns; bodies are
+    only split (not fully analyzed) for rows that have a word_count.
+    """
+    records = [dict(row) for row in rows]
+    if not records:
+        return {}
+    plan = plan or compile_plan(columns=set().union(*(r.keys() for r in records)))
+    return plan.run(records, workers)
+
+
+def _table_query(plan, band_filter=None, genre_filter=None):
+    """One SELECT that evaluates every SQL-capable rule inside SQLite.
+
+    Only rows that failed an SQL rule, or that a Python-only rule needs
+    (a body to count), come back.
+    """
+    params = []
+    sql_rules = [r for r in plan.rules if r.sql]
+    flags = ",\n".join(
+        f"COALESCE({r.sql(plan.config, params)}, 0) AS {r.name}" for r in sql_rules
+    )
+
+    where = []
+    if band_filter:
+        where.append("lexile_band = ?")
+        params.append(band_filter)
+    if genre_filter:
+        where.append("genre = ?")
+        params.append(genre_filter)
+
+    query = f"""
+        SELECT * FROM (
+            SELECT text_id, lexile_band, lexile_score, genre, length_type, word_count,
+                   CASE WHEN word_count AND text_body != '' THEN text_body END AS text_body,
+                   {flags}
+            FROM reading_text
+            {"WHERE " + " AND ".join(where) if where else ""}
+        )
+        WHERE text_body IS NOT NULL OR {" OR ".join(r.name for r in sql_rules)}
+        ORDER BY text_id
+    """
+    return query, params, sql_rules
+
+
+def validate_table(conn=None, band_filter=None, genre_filter=None,
+                   workers=VALIDATION_WORKERS, plan=None):
+    """Validate reading_text in place; same result shape as validate_all().
+
+    Rules with an SQL form are pushed down into a single query (timed
+    together as "sql pushdown"), so clean rows without a body never reach
+    Python; the rest run on the returned rows.
+    """
+    with db.connection(conn) as conn:
+        plan = plan or compile_plan(load_config(conn))
+        query, params, sql_rules = _table_query(plan, band_filter, genre_filter)
+        started = time.perf_counter()
+        records = [dict(row) for row in conn.execute(query, params)]
+        plan.timings["sql pushdown"] = plan.timings.get("sql pushdown", 0.0) + (
+            time.perf_counter() - started
+        )
+        plan.failures.setdefault("sql pushdown", 0)
+
+    presets = {
+        r.name: {i for i, record in enumerate(records) if record[r.name]} for r in sql_rules
+    }
+    for r in sql_rules:
+        plan.failures[r.name] += len(presets[r.name])
+    return plan.run(records, workers, presets)
+
+
+def validate_all(rows, workers=VALIDATION_WORKERS, batch_size=VALIDATION_BATCH_SIZE):
+    """Validate all rows. Returns dict of text_id -> errors.
+
+    rows may be any iterable (e.g. a cursor); it is consumed batch_size
+    rows at a time, so only one batch is held in memory.
+    """
+    results = {}
+    for batch in db.chunked(rows, batch_size):
+        results.update(validate_batch(batch, workers))
+    return results
+
+
+# ==================== Incremental validation ====================
+
+def rules_hash(config=None):
+    """Fingerprint of the rule set: RULES_VERSION, the registry (names,
+    inputs, severities), rule parameters and the config tables.
+
+    A different hash invalidates every cached result in validation_state.
+    """
+    registry = [(r.name, r.error_type, r.field, r.inputs, r.severity) for r in RULES]
+    payload = json.dumps(
+        [RULES_VERSION, registry, REQUIRED_FIELDS, WORD_COUNT_TOLERANCE, config or get_config()],
+        sort_keys=True,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _hash_values(*values):
+    joined = "\x1f".join("" if value is None else str(value) for value in values)
+    return hashlib.sha1(joined.encode("utf-8")).hexdigest()
+
+
+def row_hash(row):
+    """Hash of the columns the rules read (database.VALIDATED_COLUMNS)."""
+    return _hash_values(*(row[col] for col in db.VALIDATED_COLUMNS))
+
+
+def validate_incremental(conn=None, workers=VALIDATION_WORKERS, full=False, plan=None):
+    """Validate only rows that changed since their last validation.
+
+    Rows without a validation_state entry (new, or cleared by the update
+    trigger) are validated and their results cached, as are rows whose
+    stored row_hash no longer matches (edited while the triggers were
+    missing, e.g. by another tool). When the rule set
+    hash differs from the cached one -- or full=True -- every row is
+    revalidated. Returns {"results": {text_id: errors} for all rows,
+    "validated": n, "cached": n, "full": bool, "plan": RulePlan}.
+    """
+    with db.connection(conn) as conn:
+        config = load_config(conn)
+        plan = plan or compile_plan(config)
+        current = rules_hash(config)
+        stale = conn.execute(
+            "SELECT 1 FROM validation_state WHERE rules_hash != ? LIMIT 1", (current,)
+        ).fetchone()
+        full = full or stale is not None
+        if full:
+            conn.execute("DELETE FROM validation_state")
+            conn.execute("DELETE FROM validation_errors")
+
+        conn.create_function(
+            "validation_row_hash", len(db.VALIDATED_COLUMNS), _hash_values, deterministic=True
+        )
+        columns = ", ".join(f"r.{col}" for col in db.VALIDATED_COLUMNS)
+        dirty = conn.execute(f"""
+            SELECT r.*, s.text_id IS NOT NULL AS had_state FROM reading_text r
+            LEFT JOIN validation_state s ON s.text_id = r.text_id
+            WHERE s.text_id IS NULL OR s.row_hash != validation_row_hash({columns})
+        """).fetchall()
+        conn.executemany(
+            "DELETE FROM validation_errors WHERE text_id = ?",
+            [(row["text_id"],) for row in dirty if row["had_state"]],
+        )
+        results = plan.run([dict(row) for row in dirty], workers) if dirty else {}
+
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        conn.executemany(
+            "INSERT OR REPLACE INTO validation_state "
+            "(text_id, row_hash, rules_hash, error_count, validated_at) VALUES (?, ?, ?, ?, ?)",
+            [
+                (row["text_id"], row_hash(row), current,
+                 len(results.get(row["text_id"], [])), now)
+                for row in dirty
+            ],
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO validation_errors (text_id, seq, field, type, message) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [
+                (text_id, seq, err["field"], err["type"], err["message"])
+                for text_id, errors in results.items()
+                for seq, err in enumerate(errors)
+            ],
+        )
+        conn.commit()
+        total = conn.execute("SELECT COUNT(*) FROM validation_state").fetchone()[0]
+        cached = get_validation_errors(conn=conn)
+
+    return {
+        "results": cached,
+        "validated": len(dirty),
+        "cached": total - len(dirty),
+        "full": full,
+        "plan": plan,
+    }
+
+
+def get_validation_errors(error_type=None, conn=None):
+    """Cached errors from validation_state, optionally of one type."""
+    query = "SELECT text_id, field, type, message FROM validation_errors"
+    params = []
+    if error_type:
+        query += " WHERE type = ?"
+        params.append(error_type)
+    query += " ORDER BY text_id, seq"
 
-def validate_all(rows):
-    """Validate all rows. Returns dict of text_id -> errors."""
     results = {}
-    for row in rows:
-        row_dict = dict(row) if not isinstance(row, dict) else row
-        errors = validate_row(row_dict)
-        if errors:
-            text_id = row_dict.get("text_id", "unknown")
-            results[text_id] = errors
+    with db.connection(conn) as conn:
+        for row in conn.execute(query, params):
+            results.setdefault(row["text_id"], []).append({
+                "field": row["field"], "type": row["type"], "message": row["message"],
+            })
     return results